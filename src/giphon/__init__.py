@@ -7,7 +7,8 @@ from .__about__ import (
     __title__,
     __version__,
 )
-from .siphon import siphon
+from .report import ElementResult
+from .siphon import Siphoner, SiphonTarget, siphon
 
 __all__ = [
     "__title__",
@@ -17,5 +18,8 @@ __all__ = [
     "__copywrite__",
     "__email__",
     "__status__",
+    "ElementResult",
+    "Siphoner",
+    "SiphonTarget",
     "siphon",
 ]
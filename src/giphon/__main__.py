@@ -2,12 +2,21 @@
 
 from typer import Typer
 
+from .config import run
 from .envvars import source
+from .inventory import ls, query
+from .report import merge_reports
 from .siphon import siphon
+from .watch import watch
 
 if __name__ == "__main__":
     app = Typer(no_args_is_help=True, add_completion=False)
 
     app.command()(siphon)
     app.command(name="source")(source)
+    app.command(name="merge-reports")(merge_reports)
+    app.command()(watch)
+    app.command()(ls)
+    app.command()(query)
+    app.command()(run)
     app()
@@ -0,0 +1,108 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from .disk import parse_size
+
+
+def parse_bandwidth(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a bandwidth, given as `--max-bandwidth`.
+
+    Args:
+        value (Optional[str]): A number of bytes per second, with an optional
+          `K`, `M` or `G` suffix
+
+    Raises:
+        BadParameter: Whether the value is not a positive bandwidth
+
+    Returns:
+        Optional[float]: The bandwidth in bytes per second, None if it is not
+          limited
+    """
+    if value is None:
+        return None
+
+    return parse_size(value)
+
+
+class BandwidthBudget:
+    """
+    Token bucket shared by all git transfers, in bytes.
+
+    Transfers are admitted while the bucket is not in debt, and the bytes
+    they are expected to transfer, when known, are taken from it right away.
+    Concurrent clones of large repositories are thus paced from the start,
+    rather than all admitted on a full bucket. Once done, transfers settle
+    the difference with the bytes they actually transferred. Small transfers
+    run concurrently, while large ones delay the next admissions so that the
+    average throughput stays within the budget.
+    """
+
+    def __init__(
+        self: "BandwidthBudget",
+        rate: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.capacity = rate
+        self.clock = clock
+        self.sleep = sleep
+
+        self._tokens = rate
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self: "BandwidthBudget") -> None:
+        now = self.clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._last) * self.rate
+        )
+        self._last = now
+
+    def acquire(self: "BandwidthBudget", expected: int = 0) -> float:
+        """
+        Wait until a transfer can be admitted, and reserve the bytes it is
+        expected to transfer.
+
+        Args:
+            expected (int): The number of bytes the transfer is expected to
+              transfer, 0 if unknown
+
+        Returns:
+            float: The time spent waiting, in seconds
+        """
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                self._refill()
+
+                if self._tokens >= 0:
+                    self._tokens -= max(expected, 0)
+                    return waited
+
+                delay = -self._tokens / self.rate
+
+            self.sleep(delay)
+            waited += delay
+
+    def consume(
+        self: "BandwidthBudget", amount: int, reserved: int = 0
+    ) -> None:
+        """
+        Take the bytes of a finished transfer from the budget, less the bytes
+        reserved when it was admitted.
+
+        Args:
+            amount (int): The number of transferred bytes
+            reserved (int): The number of bytes reserved by `acquire`
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(
+                self.capacity,
+                self._tokens - max(amount, 0) + max(reserved, 0),
+            )
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from gitlab import Gitlab
+from requests import ConnectionError, PreparedRequest, Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+REDACTED = "[REDACTED]"
+REDACTED_QUERY_PARAMETERS = ("private_token", "job_token", "access_token")
+# CI/CD variables endpoints, of instances, groups and projects, and the
+# fields of their responses that hold secrets
+SECRET_RESPONSE_PATHS = re.compile(
+    r"/api/v4/(admin/ci|(groups|projects)/[^/]+)/variables(/|$)"
+)
+SECRET_RESPONSE_FIELDS = ("value",)
+DROPPED_RESPONSE_HEADERS = (
+    "content-encoding",
+    "content-length",
+    "set-cookie",
+    "transfer-encoding",
+)
+
+
+def get_interaction_key(
+    method: str, url: str, body: Union[None, str, bytes] = None
+) -> str:
+    """
+    Get the key identifying an API request in a cassette.
+
+    The key ignores the host of the instance, so that a cassette can be
+    replayed against any URL, as well as the order of query parameters and
+    the credentials they hold. Requests with a body, such as GraphQL
+    queries, are told apart by its digest.
+
+    Args:
+        method (str): The HTTP method of the request
+        url (str): The URL of the request
+        body (Union[None, str, bytes]): The body of the request
+
+    Returns:
+        str: The key of the request
+    """
+    parsed_url = urlparse(url)
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parsed_url.query, keep_blank_values=True)
+        if name not in REDACTED_QUERY_PARAMETERS
+    )
+
+    key = f"{method.upper()} {parsed_url.path}?{urlencode(query)}"
+
+    if body:
+        if isinstance(body, str):
+            body = body.encode()
+
+        key += f" {hashlib.sha1(body).hexdigest()}"
+
+    return key
+
+
+def get_interaction_path(directory: Path, key: str) -> Path:
+    return directory / f"{hashlib.sha1(key.encode()).hexdigest()}.json"
+
+
+class ApiRecorder:
+    """
+    Recorder of the requests made to the Gitlab API, and their responses,
+    as a directory of JSON cassettes.
+
+    The private token is redacted from everything that is recorded, as
+    are the values of CI/CD variables, so that cassettes can be shared.
+    """
+
+    def __init__(
+        self: "ApiRecorder", directory: Path, private_token: str = ""
+    ) -> None:
+        self.directory = directory
+        self.private_token = private_token
+
+        os.makedirs(directory, exist_ok=True)
+
+    def redact(self: "ApiRecorder", text: str) -> str:
+        if not self.private_token:
+            return text
+
+        return text.replace(self.private_token, REDACTED)
+
+    def redact_body(self: "ApiRecorder", url: str, text: str) -> str:
+        """
+        Redact the private token and the secrets of a response body.
+
+        Args:
+            url (str): The URL of the request
+            text (str): The body of the response
+
+        Returns:
+            str: The redacted body
+        """
+        text = self.redact(text)
+
+        if not SECRET_RESPONSE_PATHS.search(urlparse(url).path):
+            return text
+
+        try:
+            body = json.loads(text)
+        except ValueError:
+            return REDACTED
+
+        items: List[Any] = body if isinstance(body, list) else [body]
+
+        for item in items:
+            if isinstance(item, dict):
+                for field in SECRET_RESPONSE_FIELDS:
+                    if field in item:
+                        item[field] = REDACTED
+
+        return json.dumps(body)
+
+    def record(self: "ApiRecorder", response: Any, *_: Any, **__: Any) -> None:
+        """
+        Record a response, as a `requests` response hook.
+
+        Args:
+            response (Response): The response to record
+        """
+        key = get_interaction_key(
+            response.request.method, response.url, response.request.body
+        )
+        path = get_interaction_path(self.directory, key)
+
+        interaction = {
+            "request": {
+                "method": response.request.method,
+                "url": self.redact(response.url),
+                "key": key,
+            },
+            "response": {
+                "status_code": response.status_code,
+                "headers": {
+                    name: self.redact(value)
+                    for name, value in response.headers.items()
+                    if name.lower() not in DROPPED_RESPONSE_HEADERS
+                },
+                "body": self.redact_body(response.url, response.text),
+            },
+        }
+
+        temporary_path = path.with_name(
+            f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp"
+        )
+
+        with open(temporary_path, "w") as f:
+            json.dump(interaction, f, indent=2, sort_keys=True)
+
+        os.replace(temporary_path, path)
+
+    def track(self: "ApiRecorder", gl: Gitlab) -> None:
+        """
+        Record every call made through a Python Gitlab API instance.
+
+        Args:
+            gl (Gitlab): The Python Gitlab API instance to record
+        """
+        gl.session.hooks["response"].append(self.record)
+
+
+class ApiReplayAdapter(BaseAdapter):
+    """
+    Transport adapter answering requests from recorded cassettes, without
+    any network access.
+    """
+
+    def __init__(
+        self: "ApiReplayAdapter", directory: Path, latency: float = 0.0
+    ) -> None:
+        super().__init__()
+
+        self.directory = directory
+        self.latency = latency
+
+    def send(
+        self: "ApiReplayAdapter",
+        request: PreparedRequest,
+        stream: bool = False,
+        timeout: Union[
+            None, float, Tuple[Optional[float], Optional[float]]
+        ] = None,
+        verify: Union[bool, str] = True,
+        cert: Optional[Union[str, Tuple[str, str]]] = None,
+        proxies: Optional[Mapping[str, str]] = None,
+    ) -> Response:
+        key = get_interaction_key(
+            request.method or "GET",
+            request.url or "",
+            request.body if isinstance(request.body, (str, bytes)) else None,
+        )
+        path = get_interaction_path(self.directory, key)
+
+        try:
+            with open(path) as f:
+                recorded: Dict[str, Any] = json.load(f)["response"]
+        except FileNotFoundError:
+            raise ConnectionError(
+                f"No recorded response for `{key}` in {self.directory}",
+                request=request,
+            )
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        response = Response()
+        response.status_code = recorded["status_code"]
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response._content = recorded["body"].encode()
+        response.encoding = "utf-8"
+        response.url = request.url or ""
+        response.request = request
+        response.elapsed = timedelta(seconds=self.latency)
+        response.reason = "Replayed"
+
+        return response
+
+    def close(self: "ApiReplayAdapter") -> None:
+        pass
+
+    def mount(self: "ApiReplayAdapter", gl: Gitlab) -> None:
+        """
+        Answer every call made through a Python Gitlab API instance from the
+        recorded cassettes.
+
+        Args:
+            gl (Gitlab): The Python Gitlab API instance
+        """
+        gl.session.mount("http://", self)
+        gl.session.mount("https://", self)
@@ -0,0 +1,48 @@
+import functools
+import inspect
+from typing import Any, Callable, Dict, TypeVar, cast
+
+from typer.models import ParameterInfo
+
+Command = TypeVar("Command", bound=Callable[..., Any])
+
+
+def callable_command(command: Command) -> Command:
+    """
+    Let a Typer command be called from Python with only some of its
+    parameters.
+
+    Typer declares the defaults of parameters as `Option` or `Argument`
+    objects, which a direct call would pass along as values. Parameters that
+    are not given are set to the default of their option instead, so that
+    adding an option does not break existing calls.
+
+    Args:
+        command (Callable): The command to wrap
+
+    Returns:
+        Callable: The wrapped command, with the same signature
+    """
+    signature = inspect.signature(command)
+    defaults: Dict[str, Any] = {
+        name: parameter.default.default
+        for name, parameter in signature.parameters.items()
+        if isinstance(parameter.default, ParameterInfo)
+    }
+
+    @functools.wraps(command)
+    def _callable_command(*args: Any, **kwargs: Any) -> Any:
+        arguments = signature.bind_partial(*args, **kwargs).arguments
+
+        for name, default in defaults.items():
+            if name in arguments:
+                continue
+
+            if default is ...:
+                raise TypeError(f"missing a required argument: '{name}'")
+
+            arguments[name] = default
+
+        return command(**arguments)
+
+    return cast(Command, _callable_command)
@@ -0,0 +1,160 @@
+import time
+from typing import Callable, List, Optional
+
+from typer import BadParameter
+
+from .report import ConcurrencyChange
+
+AUTO_JOBS = "auto"
+AUTO_INITIAL_JOBS = 2
+MAX_JOBS = 32
+MIN_WINDOW = 4
+ERROR_RATE_THRESHOLD = 0.1
+THROUGHPUT_TOLERANCE = 0.2
+
+
+def parse_jobs(value: str) -> Optional[int]:
+    """
+    Parse a number of concurrent workers, given as `--jobs`.
+
+    Args:
+        value (str): A positive number, or `auto`
+
+    Raises:
+        BadParameter: Whether the value is neither a positive number nor
+          `auto`
+
+    Returns:
+        Optional[int]: The number of workers, None for `auto`
+    """
+    if value == AUTO_JOBS:
+        return None
+
+    try:
+        jobs = int(value)
+    except ValueError:
+        raise BadParameter(
+            f"Expected a number of jobs or `{AUTO_JOBS}`, got `{value}`"
+        )
+
+    if jobs < 1:
+        raise BadParameter(f"Expected a positive number of jobs, got {jobs}")
+
+    return jobs
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD controller of the number of concurrent workers.
+
+    Over windows of completed operations, the number of workers is increased
+    by one while the throughput holds, and halved when either the error rate
+    rises or the throughput drops, like TCP congestion control.
+
+    The throughput is in bytes per second when the bytes of all the
+    operations of a window are known, as their sizes vary by orders of
+    magnitude, and in operations per second otherwise. Windows are only
+    compared with previous ones in the same unit.
+
+    With `minimum` equal to `maximum`, the number of workers is fixed.
+    """
+
+    def __init__(
+        self: "AdaptiveConcurrency",
+        *,
+        initial: int = AUTO_INITIAL_JOBS,
+        minimum: int = 1,
+        maximum: int = MAX_JOBS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.clock = clock
+
+        self._start = clock()
+        self._window_start = self._start
+        self._completed = 0
+        self._failed = 0
+        self._bytes = 0
+        self._measured = 0
+        self._previous_throughput: Optional[float] = None
+        self._previous_in_bytes = False
+
+        self.history: List[ConcurrencyChange] = [
+            ConcurrencyChange(seconds=0.0, jobs=initial)
+        ]
+
+    @classmethod
+    def from_jobs(cls, jobs: Optional[int]) -> "AdaptiveConcurrency":
+        """
+        Get the controller for a `--jobs` value.
+
+        Args:
+            jobs (Optional[int]): The number of workers, None to tune it
+
+        Returns:
+            AdaptiveConcurrency: The controller
+        """
+        if jobs is None:
+            return cls()
+
+        return cls(initial=jobs, minimum=jobs, maximum=jobs)
+
+    def record(
+        self: "AdaptiveConcurrency",
+        *,
+        failed: bool,
+        bytes: Optional[int] = None,
+    ) -> None:
+        """
+        Record a completed operation, and adjust the number of workers at
+        the end of a window.
+
+        Args:
+            failed (bool): Whether the operation failed
+            bytes (Optional[int], optional): The bytes transferred by the
+              operation, None if not measured. Defaults to None.
+        """
+        self._completed += 1
+        self._failed += failed
+
+        if bytes is not None:
+            self._bytes += max(bytes, 0)
+            self._measured += 1
+
+        if self._completed < max(MIN_WINDOW, 2 * self.limit):
+            return
+
+        now = self.clock()
+        # Windows of up to date repositories transfer nothing
+        in_bytes = self._measured == self._completed and self._bytes > 0
+        throughput = (self._bytes if in_bytes else self._completed) / max(
+            now - self._window_start, 1e-9
+        )
+        error_rate = self._failed / self._completed
+
+        if error_rate > ERROR_RATE_THRESHOLD or (
+            self._previous_throughput is not None
+            and self._previous_in_bytes == in_bytes
+            and throughput
+            < self._previous_throughput * (1 - THROUGHPUT_TOLERANCE)
+        ):
+            limit = max(self.minimum, self.limit // 2)
+            self._previous_throughput = None
+        else:
+            limit = min(self.maximum, self.limit + 1)
+            self._previous_throughput = throughput
+
+        self._previous_in_bytes = in_bytes
+        self._window_start = now
+        self._completed = 0
+        self._failed = 0
+        self._bytes = 0
+        self._measured = 0
+
+        if limit != self.limit:
+            self.limit = limit
+            self.history.append(
+                ConcurrencyChange(seconds=now - self._start, jobs=limit)
+            )
@@ -0,0 +1,326 @@
+import json
+import os
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from typer import Argument, BadParameter, Option
+
+from .commands import callable_command
+from .events import OutputFormat
+from .filters import AccessLevel, ProjectFilters, Visibility
+from .git import LfsStrategy
+from .gitlab import Discovery
+from .profiling import Profiler, profiled
+from .siphon import SiphonTarget, siphon_targets
+from .state import PrunePolicy
+
+# Options of the `siphon` command, by the type of their values
+TARGET_OPTIONS: Dict[str, Any] = {
+    "namespace": str,
+    "output": str,
+    "gitlab_url": str,
+    "gitlab_token": str,
+    "gitlab_token_env": str,
+    "gitlab_username": str,
+    "fetch_repositories": bool,
+    "save_ci_variables": bool,
+    "clone_archived": bool,
+    "include": list,
+    "exclude": list,
+    "topic": list,
+    "visibility": Visibility,
+    "min_access_level": AccessLevel,
+    "last_activity_after": datetime,
+    "exclude_forks": bool,
+    "exclude_empty": bool,
+    "discovery": Discovery,
+    "clone_through_ssh": bool,
+    "prune": PrunePolicy,
+    "inventory": bool,
+    "inventory_sizes": bool,
+}
+RUN_OPTIONS: Dict[str, Any] = {
+    "prefetch_pages": int,
+    "ssh_multiplexing": bool,
+    "jobs": str,
+    "checkout": bool,
+    "sparse_checkout": list,
+    "sparse_checkout_cone": bool,
+    "partial_clone": bool,
+    "checkout_jobs": int,
+    "lfs": LfsStrategy,
+    "lfs_jobs": int,
+    "maintenance": bool,
+    "maintenance_jobs": int,
+    "disk_headroom": str,
+    "max_bandwidth": str,
+    "shard": str,
+}
+
+
+def parse_option(key: str, value: Any, kind: Any) -> Any:
+    """
+    Check the value of an option read from a configuration file.
+
+    Args:
+        key (str): The name of the option
+        value (Any): The JSON value of the option
+        kind (Any): The type of the option: `bool`, `int`, `str`, `list` of
+          strings, `datetime` or an enumeration
+
+    Raises:
+        BadParameter: Whether the value does not fit the option
+
+    Returns:
+        Any: The value of the option
+    """
+    if isinstance(kind, type) and issubclass(kind, Enum):
+        try:
+            return kind(value)
+        except ValueError:
+            choices = ", ".join(f"`{member.value}`" for member in kind)
+            raise BadParameter(
+                f"Expected one of {choices} for `{key}`, got `{value}`"
+            )
+
+    if kind is datetime:
+        try:
+            return datetime.fromisoformat(str(value))
+        except ValueError:
+            raise BadParameter(
+                f"Expected an ISO 8601 date for `{key}`, got `{value}`"
+            )
+
+    if kind is list:
+        values = [value] if isinstance(value, str) else value
+
+        if not isinstance(values, list) or not all(
+            isinstance(item, str) for item in values
+        ):
+            raise BadParameter(
+                f"Expected a list of strings for `{key}`, got `{value}`"
+            )
+
+        return values
+
+    if isinstance(value, bool) and kind is not bool:
+        raise BadParameter(f"Expected a {kind.__name__} for `{key}`")
+
+    if kind is str and isinstance(value, (int, float)):
+        # Such as `"jobs": 4` or `"disk_headroom": 1000000`
+        return str(value)
+
+    if not isinstance(value, kind):
+        raise BadParameter(
+            f"Expected a {kind.__name__} for `{key}`, got `{value}`"
+        )
+
+    return value
+
+
+def _get_target(
+    options: Dict[str, Any],
+    *,
+    directory: Path,
+    gitlab_token: str,
+    gitlab_username: str,
+) -> SiphonTarget:
+    values: Dict[str, Any] = {}
+
+    for key, value in options.items():
+        if key in RUN_OPTIONS:
+            raise BadParameter(
+                f"`{key}` applies to the whole run, not to a single target"
+            )
+
+        if key not in TARGET_OPTIONS:
+            raise BadParameter(f"Unknown option `{key}`")
+
+        values[key] = parse_option(key, value, TARGET_OPTIONS[key])
+
+    for key in ("namespace", "output"):
+        if key not in values:
+            raise BadParameter(f"Every target needs a `{key}`")
+
+    token_envvar = values.pop("gitlab_token_env", None)
+
+    if token_envvar is not None:
+        if token_envvar not in os.environ:
+            raise BadParameter(f"The {token_envvar} variable is not set")
+
+        values["gitlab_token"] = os.environ[token_envvar]
+
+    return SiphonTarget(
+        namespace=Path(values.pop("namespace")),
+        output=directory / Path(values.pop("output")).expanduser(),
+        gitlab_token=values.pop("gitlab_token", gitlab_token),
+        gitlab_username=values.pop("gitlab_username", gitlab_username),
+        filters=ProjectFilters(
+            include=tuple(values.pop("include", ())),
+            exclude=tuple(values.pop("exclude", ())),
+            topics=tuple(values.pop("topic", ())),
+            visibility=values.pop("visibility", None),
+            min_access_level=values.pop("min_access_level", None),
+            last_activity_after=values.pop("last_activity_after", None),
+            exclude_forks=values.pop("exclude_forks", False),
+            exclude_empty=values.pop("exclude_empty", False),
+        ),
+        **values,
+    )
+
+
+def load_config(
+    path: Path, *, gitlab_token: str = "", gitlab_username: str = ""
+) -> Tuple[List[SiphonTarget], Dict[str, Any]]:
+    """
+    Load the targets of a run, and its options, from a JSON configuration
+    file.
+
+    The file holds a `targets` list, whose items take the options of the
+    `siphon` command that are specific to a namespace, such as `namespace`,
+    `output`, `gitlab_url` or `include`. The same options, at the top level,
+    are the defaults of every target. Options that apply to the whole run,
+    such as `jobs` or `max_bandwidth`, can only be set at the top level.
+
+    Relative outputs are relative to the directory of the file. Tokens can be
+    read from the environment variable named by `gitlab_token_env`.
+
+    Args:
+        path (Path): The path of the JSON configuration file
+        gitlab_token (str, optional): The token of targets that do not set
+          one. Defaults to none.
+        gitlab_username (str, optional): The username of targets that do not
+          set one. Defaults to none.
+
+    Raises:
+        BadParameter: Whether the file is not a valid configuration
+
+    Returns:
+        Tuple[List[SiphonTarget], Dict[str, Any]]: The targets, and the
+          options of the run, as keyword arguments of `siphon_targets`
+    """
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        raise BadParameter(f"Cannot read the configuration {path}: {e}")
+
+    if (
+        not isinstance(config, dict)
+        or not isinstance(config.get("targets"), list)
+        or not config["targets"]
+    ):
+        raise BadParameter(
+            f"Expected a JSON object with a list of `targets` in {path}"
+        )
+
+    defaults: Dict[str, Any] = {}
+    options: Dict[str, Any] = {}
+
+    for key, value in config.items():
+        if key in RUN_OPTIONS:
+            options[key] = parse_option(key, value, RUN_OPTIONS[key])
+        elif key in TARGET_OPTIONS:
+            defaults[key] = value
+        elif key != "targets":
+            raise BadParameter(f"Unknown option `{key}`")
+
+    targets = []
+
+    for target in config["targets"]:
+        if not isinstance(target, dict):
+            raise BadParameter(f"Expected targets as objects, got `{target}`")
+
+        targets.append(
+            _get_target(
+                {**defaults, **target},
+                directory=path.parent,
+                gitlab_token=gitlab_token,
+                gitlab_username=gitlab_username,
+            )
+        )
+
+    return targets, options
+
+
+@profiled
+@callable_command
+def run(
+    config: Path = Argument(
+        ...,
+        help="The JSON configuration file listing the namespaces to siphon.",
+    ),
+    gitlab_token: str = Option(
+        "",
+        help="The Personal Access Token of targets that do not set one.",
+        envvar="GITLAB_TOKEN",
+    ),
+    gitlab_username: str = Option(
+        "",
+        help="The Username of targets that do not set one.",
+        envvar="GITLAB_USERNAME",
+    ),
+    report: Optional[Path] = Option(
+        None,
+        help="The path to write a JSON report of all targets to.",
+    ),
+    prometheus_textfile: Optional[Path] = Option(
+        None,
+        help=(
+            "The path to write the run's metrics to, in the Prometheus text "
+            "format."
+        ),
+    ),
+    output_format: OutputFormat = Option(
+        OutputFormat.rich,
+        help=(
+            "How to report progress: a progress display, or one JSON event "
+            "per line on stdout for headless runs (logs then go to stderr)."
+        ),
+    ),
+    profile: Optional[Path] = Option(
+        None,
+        help="The path to write a profile of the run to.",
+    ),
+    profiler: Profiler = Option(
+        Profiler.cprofile,
+        help=(
+            "The profiler to use: cProfile, writing a pstats file, or the "
+            "pyinstrument sampling profiler, writing an HTML report."
+        ),
+    ),
+    trace: Optional[Path] = Option(
+        None,
+        help=(
+            "The path to write a Chrome trace-event file of discovery, "
+            "clones and CI/CD variables downloads to."
+        ),
+    ),
+    verbose: bool = Option(
+        False,
+        "--verbose",
+        "-v",
+        help=("The level of verbosity."),
+    ),
+) -> None:
+    """
+    Siphon several Gitlab namespaces, from one or several instances, listed
+    in a configuration file.
+
+    All namespaces are siphoned in a single run, sharing connections to
+    their instances, workers and limits, and summarized by a single report.
+    """
+    targets, options = load_config(
+        config, gitlab_token=gitlab_token, gitlab_username=gitlab_username
+    )
+
+    siphon_targets(
+        targets,
+        report=report,
+        prometheus_textfile=prometheus_textfile,
+        output_format=output_format,
+        verbose=verbose,
+        **options,
+    )
@@ -0,0 +1,142 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Optional
+
+from typer import BadParameter
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+ESTIMATED_SIZE_FACTOR = 2
+
+
+def parse_size(value: str) -> float:
+    """
+    Parse a number of bytes, with an optional `K`, `M`, `G` or `T` suffix.
+
+    Args:
+        value (str): The size, such as `500K` or `10G`
+
+    Raises:
+        BadParameter: Whether the value is not a positive size
+
+    Returns:
+        float: The size in bytes
+    """
+    number, unit = value.strip(), ""
+
+    if number[-1:].upper() in SIZE_UNITS:
+        number, unit = number[:-1], number[-1:].upper()
+
+    try:
+        size = float(number) * SIZE_UNITS[unit]
+    except ValueError:
+        raise BadParameter(
+            f"Expected a size such as `500K` or `10G`, got `{value}`"
+        )
+
+    if size <= 0:
+        raise BadParameter(f"Expected a positive size, got `{value}`")
+
+    return size
+
+
+def format_size(size: float) -> str:
+    """
+    Format a number of bytes with the largest fitting suffix, such as `1.5G`.
+
+    Args:
+        size (float): The size in bytes
+
+    Returns:
+        str: The formatted size
+    """
+    for unit, factor in reversed(SIZE_UNITS.items()):
+        if size >= factor:
+            return f"{size / factor:.1f}{unit}" if unit else f"{size:.0f}"
+
+    return f"{size:.0f}"
+
+
+class DiskSpaceBudget:
+    """
+    Reservations of free disk space for the clones in flight.
+
+    Before a project is cloned, its estimated size is reserved, and the clone
+    is only admitted if the free space left over, minus every other
+    reservation, stays above the headroom. Reservations are released once
+    clones are done, since their size is then accounted for by the disk.
+    """
+
+    def __init__(
+        self: "DiskSpaceBudget",
+        path: Path,
+        *,
+        headroom: float,
+        size_factor: float = ESTIMATED_SIZE_FACTOR,
+        get_free_space: Optional[Callable[[Path], int]] = None,
+    ) -> None:
+        self.path = path
+        self.headroom = headroom
+        self.size_factor = size_factor
+        self.get_free_space = get_free_space or _get_free_space
+
+        self.reservations: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def reserved(self: "DiskSpaceBudget") -> float:
+        return sum(self.reservations.values())
+
+    def reserve(self: "DiskSpaceBudget", key: Hashable, size: int) -> bool:
+        """
+        Reserve the disk space of a clone.
+
+        Args:
+            key (Hashable): The identifier of the reservation, such as a
+              project id
+            size (int): The size of the repository, in bytes. Working trees
+              are accounted for by `size_factor`.
+
+        Returns:
+            bool: Whether the space was reserved
+        """
+        estimate = size * self.size_factor
+
+        with self._lock:
+            free_space = self.get_free_space(self.path) - self.reserved
+
+            if free_space - estimate < self.headroom:
+                return False
+
+            self.reservations[key] = estimate
+
+            return True
+
+    def release(self: "DiskSpaceBudget", key: Hashable) -> None:
+        with self._lock:
+            self.reservations.pop(key, None)
+
+
+def get_device(path: Path) -> int:
+    """
+    Get the device of the volume a path is, or will be, created on.
+
+    Args:
+        path (Path): The path, which may not exist yet
+
+    Returns:
+        int: The device identifier of its closest existing parent
+    """
+    return os.stat(_get_existing_parent(path)).st_dev
+
+
+def _get_existing_parent(path: Path) -> Path:
+    while not path.exists() and path != path.parent:
+        path = path.parent
+
+    return path
+
+
+def _get_free_space(path: Path) -> int:
+    return shutil.disk_usage(_get_existing_parent(path)).free
@@ -1,15 +1,19 @@
 import re
 import sys
+from functools import lru_cache
 from pathlib import Path
+from typing import Dict, Optional, Pattern, Tuple
 from urllib.parse import unquote_plus
 
 from typer import Argument, Option
 
-REGEX_SPECIAL_CHARACTERS = (
-    "\\.+?^$()[]{}|"  # NOTE: backslash needs to go first as it escapes others
-)
+from .profiling import Profiler, profiled
 
+SCOPE_WILDCARD = "*"
+SCOPE_CACHE_SIZE = 4096
 
+
+@profiled
 def source(
     environment: str = Argument(
         "...",
@@ -19,6 +23,17 @@ def source(
         Path("."),
         help="The path to load the environment variables from.",
     ),
+    profile: Optional[Path] = Option(
+        None,
+        help="The path to write a profile of the command to.",
+    ),
+    profiler: Profiler = Option(
+        Profiler.cprofile,
+        help=(
+            "The profiler to use: cProfile, writing a pstats file, or the "
+            "pyinstrument sampling profiler, writing an HTML report."
+        ),
+    ),
 ) -> None:
     """
     Print sourceable exports of environment, with upwards recursion.
@@ -50,6 +65,8 @@ def _source_specific_path(environment: str, path: Path) -> None:
     variables_path = path / Path(".gitlab/.env")
     env_paths = [path for path in variables_path.glob("*") if path.is_file()]
 
+    selected: Dict[str, Tuple[Tuple[int, int], str, Path]] = {}
+
     for env_path in env_paths:
         try:
             (env_type, env_name, env_escaped_scope) = env_path.name.split(":")
@@ -65,6 +82,16 @@ def _source_specific_path(environment: str, path: Path) -> None:
         ):
             continue
 
+        specificity = _scope_specificity(
+            environment=environment, scope=env_scope
+        )
+
+        if env_name in selected and selected[env_name][0] >= specificity:
+            continue
+
+        selected[env_name] = (specificity, env_type, env_path)
+
+    for env_name, (_, env_type, env_path) in sorted(selected.items()):
         if env_type == "file":
             value = str(env_path.resolve())
 
@@ -82,17 +109,58 @@ def _match_environment_to_scope(environment: str, scope: str) -> bool:
     """
     Check if a given environment string matches a given scope wildcard.
 
-    Allowed wildcards are "*".
+    Allowed wildcards are "*", which match any sequence of characters. The
+    whole environment must match the scope, as GitLab does.
 
     Args:
         environment (string): The environment to match
         scope (string): The target scope
     """
-    scope_regex = scope
+    if scope == SCOPE_WILDCARD or scope == environment:
+        return True
+
+    if SCOPE_WILDCARD not in scope:
+        return False
 
-    for char in REGEX_SPECIAL_CHARACTERS:
-        scope_regex = scope_regex.replace(char, rf"\{char}")
+    return _compile_scope(scope).fullmatch(environment) is not None
+
+
+def _scope_specificity(environment: str, scope: str) -> Tuple[int, int]:
+    """
+    Rank a scope matching an environment, higher being more specific.
 
-    scope_regex = scope_regex.replace("*", ".*")
+    Mirrors GitLab's ordering: an exact match beats any other wildcard, which
+    in turn beats the catch-all "*" scope. Wildcards are then ranked by their
+    number of literal characters.
 
-    return bool(re.match(scope_regex, environment))
+    Args:
+        environment (string): The environment the scope matches
+        scope (string): The matching scope
+
+    Returns:
+        Tuple[int, int]: A sortable specificity key
+    """
+    if scope == environment:
+        return (2, len(scope))
+
+    if scope == SCOPE_WILDCARD:
+        return (0, 0)
+
+    return (1, len(scope) - scope.count(SCOPE_WILDCARD))
+
+
+@lru_cache(maxsize=SCOPE_CACHE_SIZE)
+def _compile_scope(scope: str) -> Pattern[str]:
+    """
+    Compile a scope wildcard into a regular expression, once per scope.
+
+    Args:
+        scope (string): The scope to compile
+
+    Returns:
+        Pattern: The compiled regular expression for `scope`
+    """
+    return re.compile(
+        ".*".join(re.escape(part) for part in scope.split(SCOPE_WILDCARD)),
+        re.DOTALL,
+    )
@@ -0,0 +1,43 @@
+import json
+import sys
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Optional, TextIO
+
+
+class OutputFormat(str, Enum):
+    """
+    How a run reports its progress.
+    """
+
+    rich = "rich"
+    jsonl = "jsonl"
+
+
+class EventStream:
+    """
+    Machine-readable stream of run events, written as JSON lines.
+
+    Every event holds its name and an ISO 8601 UTC timestamp, alongside its
+    own fields.
+    """
+
+    def __init__(self: "EventStream", stream: Optional[TextIO] = None) -> None:
+        self.stream = stream if stream is not None else sys.stdout
+
+    def emit(self: "EventStream", event: str, **fields: Any) -> None:
+        """
+        Write an event.
+
+        Args:
+            event (str): The name of the event
+            **fields (Any): The JSON-serializable fields of the event
+        """
+        record = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "event": event,
+            **fields,
+        }
+
+        self.stream.write(json.dumps(record) + "\n")
+        self.stream.flush()
@@ -0,0 +1,196 @@
+import re
+from datetime import datetime, timezone
+from enum import Enum
+from fnmatch import fnmatchcase
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from gitlab.base import RESTObject
+
+REGEX_PREFIX = "re:"
+
+
+class Visibility(str, Enum):
+    """
+    The visibility of Gitlab projects.
+    """
+
+    private = "private"
+    internal = "internal"
+    public = "public"
+
+
+class AccessLevel(str, Enum):
+    """
+    The Gitlab roles, from the least to the most privileged.
+    """
+
+    guest = "guest"
+    reporter = "reporter"
+    developer = "developer"
+    maintainer = "maintainer"
+    owner = "owner"
+
+    @property
+    def level(self: "AccessLevel") -> int:
+        """
+        The numeric access level used by the Gitlab API.
+        """
+        return {
+            AccessLevel.guest: 10,
+            AccessLevel.reporter: 20,
+            AccessLevel.developer: 30,
+            AccessLevel.maintainer: 40,
+            AccessLevel.owner: 50,
+        }[self]
+
+
+def match_path(path: str, pattern: str) -> bool:
+    """
+    Match a full path against a glob pattern, or a regular expression when
+    prefixed by `re:`.
+
+    Args:
+        path (str): The full path of a group or project
+        pattern (str): The pattern, such as `my-group/*` or `re:.*-infra$`
+
+    Returns:
+        bool: Whether the whole path matches the pattern
+    """
+    if pattern.startswith(REGEX_PREFIX):
+        return (
+            re.fullmatch(pattern.partition(REGEX_PREFIX)[2], path) is not None
+        )
+
+    return fnmatchcase(path, pattern)
+
+
+class ProjectFilters(NamedTuple):
+    """
+    Selection of the projects to siphon.
+
+    Filters supported by the Gitlab API are sent along with project
+    listings, and all of them are checked again on listed projects.
+
+    Attributes:
+        include (Tuple[str, ...]): Patterns of the project paths to siphon,
+          all of them if empty
+        exclude (Tuple[str, ...]): Patterns of the group and project paths
+          not to siphon. Excluded groups are not walked at all.
+        topics (Tuple[str, ...]): Topics projects must all have
+        visibility (Optional[Visibility]): The visibility of projects
+        min_access_level (Optional[AccessLevel]): The minimal role of the
+          user on projects, only checked by the API
+        last_activity_after (Optional[datetime]): The date after which
+          projects must have activity
+        exclude_forks (bool): Whether to exclude forks
+        exclude_empty (bool): Whether to exclude empty repositories
+    """
+
+    include: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()
+    topics: Tuple[str, ...] = ()
+    visibility: Optional[Visibility] = None
+    min_access_level: Optional[AccessLevel] = None
+    last_activity_after: Optional[datetime] = None
+    exclude_forks: bool = False
+    exclude_empty: bool = False
+
+    def get_list_parameters(self: "ProjectFilters") -> Dict[str, Any]:
+        """
+        Get the query parameters of project listings.
+
+        Returns:
+            Dict[str, Any]: The parameters supported by the Gitlab API
+        """
+        parameters: Dict[str, Any] = {}
+
+        if self.topics:
+            parameters["topic"] = ",".join(self.topics)
+
+        if self.visibility is not None:
+            parameters["visibility"] = self.visibility.value
+
+        if self.min_access_level is not None:
+            parameters["min_access_level"] = self.min_access_level.level
+
+        if self.last_activity_after is not None:
+            parameters["last_activity_after"] = (
+                self.last_activity_after.isoformat()
+            )
+
+        return parameters
+
+    def is_excluded(self: "ProjectFilters", full_path: str) -> bool:
+        """
+        Check whether a group or project path is excluded.
+
+        Args:
+            full_path (str): The full path of the group or project
+
+        Returns:
+            bool: Whether the path matches an exclusion pattern
+        """
+        return any(match_path(full_path, pattern) for pattern in self.exclude)
+
+    def matches(self: "ProjectFilters", project: RESTObject) -> bool:
+        """
+        Check whether a listed project is selected.
+
+        Args:
+            project (RESTObject): The project, from a listing
+
+        Returns:
+            bool: Whether the project is to be siphoned
+        """
+        full_path = project.path_with_namespace
+
+        if self.include and not any(
+            match_path(full_path, pattern) for pattern in self.include
+        ):
+            return False
+
+        if self.is_excluded(full_path):
+            return False
+
+        if self.topics and not set(self.topics) <= set(
+            getattr(project, "topics", None) or ()
+        ):
+            return False
+
+        if (
+            self.visibility is not None
+            and getattr(project, "visibility", self.visibility.value)
+            != self.visibility.value
+        ):
+            return False
+
+        last_activity_at = getattr(project, "last_activity_at", None)
+
+        if (
+            self.last_activity_after is not None
+            and last_activity_at is not None
+            and _parse_datetime(last_activity_at)
+            < _as_aware(self.last_activity_after)
+        ):
+            return False
+
+        if self.exclude_forks and getattr(
+            project, "forked_from_project", None
+        ):
+            return False
+
+        if self.exclude_empty and getattr(project, "empty_repo", False):
+            return False
+
+        return True
+
+
+def _parse_datetime(value: str) -> datetime:
+    return _as_aware(datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+
+def _as_aware(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+
+    return value
@@ -1,16 +1,66 @@
+import os
+import shutil
+from enum import Enum
 from logging import Logger
 from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
 
 import git
 
 
+class RepositoryAction(str, Enum):
+    """
+    What was done to a project's repository.
+    """
+
+    cloned = "cloned"
+    fetched = "fetched"
+    skipped = "skipped"
+    failed = "failed"
+    out_of_space = "out_of_space"
+
+
+class LfsStrategy(str, Enum):
+    """
+    How to download the Git LFS objects of repositories.
+    """
+
+    clone = "clone"
+    deferred = "deferred"
+    skip = "skip"
+
+
+class SparseCheckout(NamedTuple):
+    """
+    Patterns of the files to check out.
+
+    Attributes:
+        patterns (Tuple[str, ...]): The directories to check out in cone
+          mode, gitignore-like patterns otherwise
+        cone (bool): Whether the patterns are in cone mode
+    """
+
+    patterns: Tuple[str, ...]
+    cone: bool = True
+
+
+LFS_SKIP_SMUDGE_ENVIRONMENT = {"GIT_LFS_SKIP_SMUDGE": "1"}
+PARTIAL_CLONE_FILTER = "blob:none"
+MAINTENANCE_TASKS = ("loose-objects", "incremental-repack", "commit-graph")
+
+
 def handle_project(
     *,
     repository_path: Path,
     repository_url: str,
     fetch: bool,
     logger: Logger,
-) -> None:
+    previous_repository_path: Optional[Path] = None,
+    checkout: bool = True,
+    lfs_skip_smudge: bool = False,
+    sparse_checkout: Optional[SparseCheckout] = None,
+    partial_clone: bool = False,
+) -> RepositoryAction:
     """
     Clone or fetch remotes for a project.
 
@@ -20,31 +70,237 @@ def handle_project(
         fetch (bool): whether to fetch all remotes if the project already
           exists locally
         logger (Logger): the logger to use to generate logs
+        previous_repository_path (Optional[Path]): the path the project was
+          siphoned to by a previous run, if it was renamed or transferred
+          since. An existing checkout is moved instead of cloned again.
+        checkout (bool): whether to check out the working tree of cloned
+          repositories. Otherwise, only objects are fetched, and the working
+          tree is left to `checkout_repository`.
+        lfs_skip_smudge (bool): whether to check out Git LFS pointers
+          instead of downloading their objects
+        sparse_checkout (Optional[SparseCheckout]): the files to check out,
+          set at clone time and applied again on every fetch
+        partial_clone (bool): whether to clone without blobs, which are then
+          only downloaded for the files that are checked out
 
     Raises:
         git.exc.GitCommandError: Git error when cloning
+
+    Returns:
+        RepositoryAction: What was done to the repository
     """
 
+    if (
+        previous_repository_path is not None
+        and previous_repository_path != repository_path
+        and previous_repository_path.is_dir()
+        and not repository_path.is_dir()
+    ):
+        _relocate_repository(
+            previous_repository_path=previous_repository_path,
+            repository_path=repository_path,
+            repository_url=repository_url,
+            logger=logger,
+        )
+
     if not repository_path.is_dir():
         while "Trying to clone the repo":
             try:
-                repo = git.repo.Repo.clone_from(
-                    repository_url, repository_path, no_single_branch=True
+                git.repo.Repo.clone_from(
+                    repository_url,
+                    repository_path,
+                    env=(
+                        LFS_SKIP_SMUDGE_ENVIRONMENT
+                        if lfs_skip_smudge
+                        else None
+                    ),
+                    no_single_branch=True,
+                    no_checkout=not checkout or sparse_checkout is not None,
+                    filter=PARTIAL_CLONE_FILTER if partial_clone else None,
                 )
-                break
             except git.GitCommandError as e:
+                # Do not leave a partial clone behind, to be fetched later
+                shutil.rmtree(repository_path, ignore_errors=True)
+
                 if e.status == 128:
                     logger.warning(e, exc_info=True)
-                    return
+                    return RepositoryAction.failed
                 else:
                     raise e
 
-    else:
-        if fetch:
-            repo = git.repo.Repo(repository_path)
-            _fetch_repository(repo)
+            if sparse_checkout is not None:
+                set_sparse_checkout(
+                    repository_path,
+                    sparse_checkout,
+                    lfs_skip_smudge=lfs_skip_smudge,
+                )
+
+                if checkout:
+                    checkout_repository(
+                        repository_path, lfs_skip_smudge=lfs_skip_smudge
+                    )
+
+            return RepositoryAction.cloned
+
+    if fetch:
+        repo = git.repo.Repo(repository_path)
+        _fetch_repository(repo)
+
+        if sparse_checkout is not None:
+            set_sparse_checkout(
+                repository_path,
+                sparse_checkout,
+                lfs_skip_smudge=lfs_skip_smudge,
+            )
+
+        return RepositoryAction.fetched
+
+    return RepositoryAction.skipped
+
+
+def checkout_repository(
+    repository_path: Path, lfs_skip_smudge: bool = False
+) -> None:
+    """
+    Check out the working tree of a repository cloned without one.
+
+    Args:
+        repository_path (Path): the path of the repository
+        lfs_skip_smudge (bool): whether to check out Git LFS pointers
+          instead of downloading their objects
+    """
+    repository = git.repo.Repo(repository_path)
+
+    if not repository.head.is_valid():
+        return
+
+    with repository.git.custom_environment(
+        **(LFS_SKIP_SMUDGE_ENVIRONMENT if lfs_skip_smudge else {})
+    ):
+        repository.git.checkout("--force", "HEAD")
+
+
+def set_sparse_checkout(
+    repository_path: Path,
+    sparse_checkout: SparseCheckout,
+    lfs_skip_smudge: bool = False,
+) -> None:
+    """
+    Restrict the working tree of a repository to the files matching
+    sparse-checkout patterns.
+
+    Args:
+        repository_path (Path): the path of the repository
+        sparse_checkout (SparseCheckout): the files to check out
+        lfs_skip_smudge (bool): whether to check out Git LFS pointers
+          instead of downloading their objects
+    """
+    repository = git.repo.Repo(repository_path)
+
+    with repository.git.custom_environment(
+        **(LFS_SKIP_SMUDGE_ENVIRONMENT if lfs_skip_smudge else {})
+    ):
+        repository.git.sparse_checkout(
+            "set",
+            "--cone" if sparse_checkout.cone else "--no-cone",
+            *sparse_checkout.patterns,
+        )
+
+
+def pull_lfs_objects(repository_path: Path, logger: Logger) -> bool:
+    """
+    Download the Git LFS objects of a repository checked out without them,
+    and replace their pointers in the working tree.
+
+    Args:
+        repository_path (Path): the path of the repository
+        logger (Logger): the logger to use to generate logs
+
+    Returns:
+        bool: Whether the objects were downloaded
+    """
+    repository = git.repo.Repo(repository_path)
+
+    if not repository.head.is_valid():
+        return False
+
+    try:
+        repository.git.lfs("pull")
+    except git.GitCommandError as e:
+        logger.warning(e, exc_info=True)
+        return False
+
+    return True
+
+
+def run_maintenance(repository_path: Path, logger: Logger) -> bool:
+    """
+    Pack the loose objects and small packs of a repository, and write its
+    multi-pack-index and commit-graph, so that later fetches and searches
+    stay fast.
+
+    Args:
+        repository_path (Path): the path of the repository
+        logger (Logger): the logger to use to generate logs
+
+    Returns:
+        bool: Whether every maintenance task succeeded
+    """
+    repository = git.repo.Repo(repository_path)
+
+    for task in MAINTENANCE_TASKS:
+        try:
+            repository.git.maintenance("run", f"--task={task}")
+        except git.GitCommandError as e:
+            logger.warning(e, exc_info=True)
+            return False
+
+    return True
 
 
 def _fetch_repository(repository: git.repo.Repo) -> None:
     for remote in repository.remotes:
         remote.fetch()
+
+
+def _relocate_repository(
+    *,
+    previous_repository_path: Path,
+    repository_path: Path,
+    repository_url: str,
+    logger: Logger,
+) -> None:
+    """
+    Move a local repository to a new path, and point its origin to a new URL.
+    """
+    logger.info(f"Moving {previous_repository_path} to {repository_path}")
+
+    os.makedirs(repository_path.parent, exist_ok=True)
+    shutil.move(str(previous_repository_path), str(repository_path))
+
+    repository = git.repo.Repo(repository_path)
+
+    if "origin" in repository.remotes:
+        repository.remotes.origin.set_url(repository_url)
+
+
+def get_repository_size(repository_path: Path) -> int:
+    """
+    Get the size on disk of a repository's git directory.
+
+    Args:
+        repository_path (Path): the path of the repository
+
+    Returns:
+        int: The size of the git directory in bytes, 0 if it does not exist
+    """
+    size = 0
+
+    for directory, _, files in os.walk(repository_path / ".git"):
+        for file in files:
+            try:
+                size += os.lstat(os.path.join(directory, file)).st_size
+            except FileNotFoundError:
+                continue
+
+    return size
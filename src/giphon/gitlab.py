@@ -1,28 +1,113 @@
 import os
+from datetime import datetime
+from enum import Enum
 from logging import Logger
 from pathlib import Path
-from typing import Generator, List, Union
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Union,
+)
 from urllib.parse import quote_plus
 
 from gitlab import Gitlab
 from gitlab.base import RESTObject
 from gitlab.exceptions import GitlabHttpError, GitlabListError
 from gitlab.v4.objects import Group, GroupVariable, Project, ProjectVariable
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+
+from .filters import ProjectFilters
+from .inventory import Inventory
+from .pagination import PagePrefetcher
 
 Variable = Union[ProjectVariable, GroupVariable]
 
 
+class Discovery(str, Enum):
+    """
+    Which Gitlab API to discover groups and projects with.
+    """
+
+    rest = "rest"
+    graphql = "graphql"
+
+
+class GitlabElement(NamedTuple):
+    """
+    Compact, immutable record of a discovered Gitlab group or project.
+
+    Only holds the fields needed to siphon the element, so that discovering
+    a whole instance does not keep every python-gitlab object (and its
+    managers and session) alive.
+    """
+
+    id: int
+    type: str
+    name: str
+    full_path: str
+    ssh_url_to_repo: str = ""
+    http_url_to_repo: str = ""
+    repository_size: int = 0
+
+    @classmethod
+    def from_group(cls, group: RESTObject) -> "GitlabElement":
+        """
+        Build a record from a Gitlab group, or a subgroup listing entry.
+        """
+        return cls(
+            id=group.id,
+            type="group",
+            name=group.name,
+            full_path=group.full_path,
+        )
+
+    @classmethod
+    def from_project(cls, project: RESTObject) -> "GitlabElement":
+        """
+        Build a record from a Gitlab project, or a group project listing
+        entry.
+        """
+        return cls(
+            id=project.id,
+            type="project",
+            name=project.name,
+            full_path=project.path_with_namespace,
+            ssh_url_to_repo=project.ssh_url_to_repo,
+            http_url_to_repo=project.http_url_to_repo,
+            repository_size=getattr(project, "statistics", {}).get(
+                "repository_size", 0
+            ),
+        )
+
+
+Element = Union[RESTObject, GitlabElement]
+
+
 def save_environment_variables(
-    path: Path, element: RESTObject, logger: Logger
-) -> None:
+    path: Path,
+    element: Element,
+    logger: Logger,
+    gl: Optional[Gitlab] = None,
+) -> int:
     """
     Save environment variables locally for a given Gitlab group or project.
 
     Args:
         path (Path): the path to save the environment variables to
-        element (Union[gitlab.v4.objects.Group, gitlab.v4.objects.Project]):
-          The Gitlab group or project to get the environment variables from
+        element (Union[gitlab.v4.objects.Group, gitlab.v4.objects.Project,
+          GitlabElement]): The Gitlab group or project to get the environment
+          variables from
         logger (Logger): the logger to use to generate logs
+        gl (Gitlab, optional): the Python-Gitlab API instance, required when
+          `element` is a `GitlabElement`
+
+    Returns:
+        int: The number of saved environment variables
     """
 
     def _save_environment_variable(variable: Variable, env_path: Path) -> None:
@@ -42,7 +127,9 @@ def save_environment_variables(
 
     el_type = get_gitlab_element_type(element)
     try:
-        variables = element.variables.list(all=True)
+        variables = get_gitlab_element_object(element, gl).variables.list(
+            all=True
+        )
         for variable in variables:
             _save_environment_variable(variable, env_path)
 
@@ -53,14 +140,54 @@ def save_environment_variables(
             "has CI/CD disabled.]"
         )
 
+        return 0
+
+    return len(variables)
+
+
+def get_gitlab_element_object(
+    element: Element, gl: Optional[Gitlab] = None
+) -> RESTObject:
+    """
+    Get a python-gitlab object for a given Gitlab element.
+
+    `GitlabElement` records are turned into lazy objects, which do not query
+    the API until one of their managers is used.
+
+    Args:
+        element (Union[gitlab.v4.objects.Group, gitlab.v4.objects.Project,
+          GitlabElement]): The Gitlab group or project
+        gl (Gitlab, optional): the Python-Gitlab API instance, required when
+          `element` is a `GitlabElement`
+
+    Raises:
+        ValueError: Whether `element` is a record and no `gl` was given
+
+    Returns:
+        RESTObject: the python-gitlab object for `element`
+    """
+    if not isinstance(element, GitlabElement):
+        return element
+
+    if gl is None:
+        raise ValueError(
+            f"A Gitlab instance is required to query {element.type} "
+            f"{element.full_path}"
+        )
+
+    manager = gl.groups if element.type == "group" else gl.projects
+
+    return manager.get(element.id, lazy=True)
+
 
-def get_gitlab_element_type(element: RESTObject) -> str:
+def get_gitlab_element_type(element: Element) -> str:
     """
     Get a pretty-printable string representing the element's type.
 
     Args:
-        element (Union[gitlab.v4.objects.Group, gitlab.v4.objects.Project]):
-          The Gitlab group or project to get the type as a string
+        element (Union[gitlab.v4.objects.Group, gitlab.v4.objects.Project,
+          GitlabElement]): The Gitlab group or project to get the type as a
+          string
 
     Raises:
         NotImplementedError: Whether the type of `element` is unsupported
@@ -68,7 +195,9 @@ def get_gitlab_element_type(element: RESTObject) -> str:
     Returns:
         str: String representing `element`'s type
     """
-    if isinstance(element, Group):
+    if isinstance(element, GitlabElement):
+        return element.type
+    elif isinstance(element, Group):
         return "group"
     elif isinstance(element, Project):
         return "project"
@@ -79,13 +208,13 @@ def get_gitlab_element_type(element: RESTObject) -> str:
         )
 
 
-def get_gitlab_element_full_path(element: RESTObject) -> Path:
+def get_gitlab_element_full_path(element: Element) -> Path:
     """
     Get the full path of a given Gitlab Element
 
     Args:
-        element (Union[gitlab.v4.objects.Group, gitlab.v4.objects.Project]):
-          The Gitlab group or project to get the full path
+        element (Union[gitlab.v4.objects.Group, gitlab.v4.objects.Project,
+          GitlabElement]): The Gitlab group or project to get the full path
 
     Raises:
         NotImplementedError: Whether the type of `element` is unsupported
@@ -93,7 +222,9 @@ def get_gitlab_element_full_path(element: RESTObject) -> Path:
     Returns:
         Path: the full path for the element
     """
-    if isinstance(element, Group):
+    if isinstance(element, GitlabElement):
+        return Path(element.full_path)
+    elif isinstance(element, Group):
         return Path(element.full_path)
     elif isinstance(element, Project):
         return Path(element.path_with_namespace)
@@ -105,8 +236,15 @@ def get_gitlab_element_full_path(element: RESTObject) -> Path:
 
 
 def flatten_groups_tree(
-    *, groups: List[RESTObject], gl: Gitlab, archived: bool = False
-) -> Generator[RESTObject, None, None]:
+    *,
+    groups: List[RESTObject],
+    gl: Gitlab,
+    archived: bool = False,
+    statistics: bool = False,
+    filters: ProjectFilters = ProjectFilters(),
+    prefetcher: Optional[PagePrefetcher] = None,
+    inventory: Optional[Inventory] = None,
+) -> Generator[GitlabElement, None, None]:
     """
     Generate a flat tree containing all elements to handle for a given set of
     groups.
@@ -116,54 +254,185 @@ def flatten_groups_tree(
         gl (Gitlab): the Python-Gitlab API instance
         archived (bool, optional): Whether to get information from archived
           projects. Defaults to False.
+        statistics (bool, optional): Whether to get the repository size of
+          projects, which requires at least the Reporter role. Defaults to
+          False.
+        filters (ProjectFilters, optional): The selection of projects.
+          Excluded groups are neither walked nor fetched. Defaults to every
+          project.
+        prefetcher (Optional[PagePrefetcher], optional): The lister of
+          subgroups and projects, requesting pages ahead. Defaults to
+          python-gitlab's listings.
+        inventory (Optional[Inventory], optional): The inventory to index
+          the metadata of generated elements in, which they do not hold.
+          Defaults to None.
 
     Yields:
-        Element: Gitlab group or project to be handled.
+        GitlabElement: Gitlab group or project to be handled.
     """
+    list_parameters = filters.get_list_parameters()
+
+    if statistics:
+        list_parameters["statistics"] = True
+
     for group in groups:
-        yield group
+        if filters.is_excluded(group.full_path):
+            continue
+
+        if inventory is not None:
+            inventory.add_group(group)
+
+        yield GitlabElement.from_group(group)
 
         yield from flatten_groups_tree(
             groups=[
                 gl.groups.get(subgroup.id)
-                for subgroup in group.subgroups.list(all=True)
+                for subgroup in list_all(group.subgroups, prefetcher)
+                if not filters.is_excluded(subgroup.full_path)
             ],
             gl=gl,
             archived=archived,
+            statistics=statistics,
+            filters=filters,
+            prefetcher=prefetcher,
+            inventory=inventory,
+        )
+        for project in list_all(
+            group.projects,
+            prefetcher,
+            archived=archived,
+            **list_parameters,
+        ):
+            if filters.matches(project):
+                if inventory is not None:
+                    inventory.add_project(project)
+
+                yield GitlabElement.from_project(project)
+
+
+def get_recently_active_projects(
+    *,
+    namespace: Path,
+    gl: Gitlab,
+    since: datetime,
+    archived: bool = False,
+    prefetcher: Optional[PagePrefetcher] = None,
+) -> Generator[GitlabElement, None, None]:
+    """
+    Generate the projects of a namespace with activity since a given date.
+
+    Relies on the `last_activity_after` filter of the projects listing, so a
+    whole namespace is polled in a single paginated query. Gitlab only
+    refreshes a project's last activity date periodically, so this should be
+    paired with webhooks or periodic full runs for low latencies.
+
+    Args:
+        namespace (Path): The namespace to look for projects in. `/` looks in
+          the whole instance.
+        gl (Gitlab): the Python-Gitlab API instance
+        since (datetime): The date after which projects must have activity
+        archived (bool, optional): Whether to also get archived projects.
+          Defaults to False.
+        prefetcher (Optional[PagePrefetcher], optional): The lister of
+          projects, requesting pages ahead. Defaults to python-gitlab's
+          listings.
+
+    Yields:
+        GitlabElement: Gitlab projects with recent activity.
+    """
+    filters: Dict[str, Any] = {
+        "last_activity_after": since.isoformat(),
+        "order_by": "last_activity_at",
+    }
+
+    if not archived:
+        filters["archived"] = False
+
+    if namespace == Path("/"):
+        projects = list_all(gl.projects, prefetcher, **filters)
+    else:
+        projects = list_all(
+            gl.groups.get(str(namespace), lazy=True).projects,
+            prefetcher,
+            include_subgroups=True,
+            **filters,
         )
-        for project in group.projects.list(all=True, archived=archived):
-            yield gl.projects.get(project.id)
 
+    for project in projects:
+        yield GitlabElement.from_project(project)
 
-def get_gitlab_instance(*, url: str, private_token: str) -> Gitlab:
+
+def get_gitlab_instance(
+    *, url: str, private_token: str, pool_size: Optional[int] = None
+) -> Gitlab:
     """
     Get a Python Gitlab API instance
 
     Args:
         url (str): The URL of the Gitlab instance
         private_token (str): A private token capable to access the instance.
+        pool_size (Optional[int], optional): The number of connections to
+          keep open to the instance, for as many concurrent calls. Defaults
+          to the 10 connections of requests.
 
     Returns:
         Gitlab: The Python Gitlab API instance
     """
-    return Gitlab(url=url, private_token=private_token)
+    gl = Gitlab(url=url, private_token=private_token)
+
+    if pool_size is not None and pool_size > DEFAULT_POOLSIZE:
+        adapter = HTTPAdapter(pool_maxsize=pool_size)
+        gl.session.mount("http://", adapter)
+        gl.session.mount("https://", adapter)
 
+    return gl
 
-def get_groups_from_path(namespace: Path, gl: Gitlab) -> List[RESTObject]:
+
+def get_groups_from_path(
+    namespace: Path, gl: Gitlab, prefetcher: Optional[PagePrefetcher] = None
+) -> List[RESTObject]:
     """
     Get a list of Gitlab groups contained in a given namespace.
 
     Args:
         namespace (str): The namespace to get the groups from.
         gl (Gitlab): the Gitlab API instance.
+        prefetcher (Optional[PagePrefetcher], optional): The lister of
+          top-level groups, requesting pages ahead. Defaults to
+          python-gitlab's listings.
 
     Returns:
         List[Group]: THe list of Gitlab groups in `namespace`.
     """
 
     if namespace == Path("/"):
-        groups = [el for el in gl.groups.list(parent_id=None, iterator=True)]
+        # Subgroups are walked from their parents. python-gitlab drops
+        # `parent_id=None`, which would list them as well.
+        groups = [
+            el for el in list_all(gl.groups, prefetcher, top_level_only=True)
+        ]
     else:
         groups = [gl.groups.get(str(namespace))]
 
     return groups
+
+
+def list_all(
+    manager: Any, prefetcher: Optional[PagePrefetcher] = None, **kwargs: Any
+) -> Iterator[RESTObject]:
+    """
+    Iterate over every object of a python-gitlab manager.
+
+    Args:
+        manager (Any): The python-gitlab manager to list
+        prefetcher (Optional[PagePrefetcher], optional): The lister requesting
+          pages ahead. Defaults to python-gitlab's listing, page by page.
+        **kwargs (Any): The filters of the listing
+
+    Returns:
+        Iterator[RESTObject]: The listed objects
+    """
+    if prefetcher is None:
+        return iter(manager.list(iterator=True, **kwargs))
+
+    return prefetcher.list(manager, **kwargs)
@@ -0,0 +1,323 @@
+from typing import Any, Dict, Generator, Iterator, List, Optional
+
+from gitlab import Gitlab
+from gitlab.base import RESTObject
+from gitlab.exceptions import GitlabGetError
+from gitlab.v4.objects import Group, Project
+
+from .filters import ProjectFilters
+from .gitlab import GitlabElement
+from .inventory import Inventory
+
+GRAPHQL_PAGE_SIZE = 100
+
+DESCENDANT_GROUPS_QUERY = """
+query GiphonDescendantGroups($fullPath: ID!, $first: Int, $after: String) {
+  group(fullPath: $fullPath) {
+    descendantGroups(first: $first, after: $after) {
+      nodes {
+        id
+        name
+        fullPath
+      }
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+    }
+  }
+}
+"""
+
+PROJECTS_QUERY = """
+query GiphonGroupProjects(
+  $fullPath: ID!
+  $first: Int
+  $after: String
+  $statistics: Boolean!
+) {
+  group(fullPath: $fullPath) {
+    projects(includeSubgroups: true, first: $first, after: $after) {
+      nodes {
+        id
+        name
+        fullPath
+        sshUrlToRepo
+        httpUrlToRepo
+        archived
+        lastActivityAt
+        topics
+        visibility
+        repository {
+          empty
+          rootRef
+        }
+        statistics @include(if: $statistics) {
+          repositorySize
+        }
+      }
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+    }
+  }
+}
+"""
+
+
+def query_graphql(
+    gl: Gitlab, query: str, variables: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Run a query against the GraphQL API of a Gitlab instance.
+
+    The query goes through the session of the Python Gitlab API instance, so
+    that it is authenticated, retried and tracked like REST calls.
+
+    Args:
+        gl (Gitlab): The Python Gitlab API instance
+        query (str): The GraphQL query, with a single named operation
+        variables (Dict[str, Any]): The variables of the query
+
+    Raises:
+        GitlabGetError: Whether the query returned errors
+
+    Returns:
+        Dict[str, Any]: The data of the response
+    """
+    operation_name = query.split("(", 1)[0].split()[-1]
+
+    result = gl.http_post(
+        f"{gl.url}/api/graphql",
+        post_data={
+            "operationName": operation_name,
+            "query": query,
+            "variables": variables,
+        },
+    )
+
+    if not isinstance(result, dict):
+        raise GitlabGetError(f"Unexpected GraphQL response: {result}")
+
+    if result.get("errors"):
+        raise GitlabGetError(
+            "; ".join(error["message"] for error in result["errors"])
+        )
+
+    data: Dict[str, Any] = result["data"]
+
+    return data
+
+
+def get_group_nodes(
+    gl: Gitlab,
+    query: str,
+    connection: str,
+    full_path: str,
+    per_page: int = GRAPHQL_PAGE_SIZE,
+    **variables: Any,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over a paginated connection of a group, following its cursors.
+
+    Args:
+        gl (Gitlab): The Python Gitlab API instance
+        query (str): The GraphQL query of the connection
+        connection (str): The name of the connection in the group
+        full_path (str): The full path of the group
+        per_page (int): The number of nodes per page
+        **variables (Any): Other variables of the query
+
+    Raises:
+        GitlabGetError: Whether the group does not exist
+
+    Yields:
+        Dict[str, Any]: The nodes of the connection
+    """
+    after: Optional[str] = None
+
+    while True:
+        group = query_graphql(
+            gl,
+            query,
+            {
+                "fullPath": full_path,
+                "first": per_page,
+                "after": after,
+                **variables,
+            },
+        )["group"]
+
+        if group is None:
+            raise GitlabGetError(f"Group {full_path} not found")
+
+        yield from group[connection]["nodes"]
+
+        page_info = group[connection]["pageInfo"]
+
+        if not page_info["hasNextPage"]:
+            return
+
+        after = page_info["endCursor"]
+
+
+def get_id(global_id: str) -> int:
+    """
+    Get the REST identifier of an object from its GraphQL global identifier,
+    such as `gid://gitlab/Project/42`.
+    """
+    return int(global_id.rsplit("/", 1)[-1])
+
+
+def group_from_node(gl: Gitlab, node: Dict[str, Any]) -> RESTObject:
+    """
+    Build a python-gitlab group from a GraphQL node, with its REST fields.
+    """
+    return Group(
+        gl.groups,
+        {
+            "id": get_id(node["id"]),
+            "name": node["name"],
+            "full_path": node["fullPath"],
+        },
+        created_from_list=True,
+    )
+
+
+def project_from_node(gl: Gitlab, node: Dict[str, Any]) -> RESTObject:
+    """
+    Build a python-gitlab project from a GraphQL node, with its REST fields.
+    """
+    repository = node.get("repository") or {}
+    attributes = {
+        "id": get_id(node["id"]),
+        "name": node["name"],
+        "path_with_namespace": node["fullPath"],
+        "ssh_url_to_repo": node["sshUrlToRepo"],
+        "http_url_to_repo": node["httpUrlToRepo"],
+        "archived": node["archived"],
+        "last_activity_at": node["lastActivityAt"],
+        "topics": node.get("topics") or [],
+        "visibility": node["visibility"],
+        "empty_repo": bool(repository.get("empty")),
+        "default_branch": repository.get("rootRef"),
+    }
+
+    if node.get("statistics") is not None:
+        attributes["statistics"] = {
+            "repository_size": int(node["statistics"]["repositorySize"])
+        }
+
+    return Project(gl.projects, attributes, created_from_list=True)
+
+
+def flatten_groups_tree_graphql(
+    *,
+    groups: List[RESTObject],
+    gl: Gitlab,
+    archived: bool = False,
+    statistics: bool = False,
+    filters: ProjectFilters = ProjectFilters(),
+    per_page: int = GRAPHQL_PAGE_SIZE,
+    inventory: Optional[Inventory] = None,
+) -> Generator[GitlabElement, None, None]:
+    """
+    Generate a flat tree containing all elements to handle for a given set of
+    groups, through the GraphQL API.
+
+    Unlike `flatten_groups_tree`, subgroups are not walked one by one: the
+    descendant groups and the projects of every starting group are listed by
+    two paginated queries, with only the fields needed to siphon them.
+
+    Filters and archived projects are checked on listed projects, and forks
+    and access levels cannot be filtered.
+
+    Args:
+        groups (List[Group]): A list of starting groups
+        gl (Gitlab): the Python-Gitlab API instance
+        archived (bool, optional): Whether to get information from archived
+          projects. Defaults to False.
+        statistics (bool, optional): Whether to get the repository size of
+          projects, which requires at least the Reporter role. Defaults to
+          False.
+        filters (ProjectFilters, optional): The selection of projects.
+          Defaults to every project.
+        per_page (int, optional): The number of nodes per query. Defaults to
+          100, the maximum allowed by Gitlab.
+        inventory (Optional[Inventory], optional): The inventory to index
+          the metadata of generated elements in. Defaults to None.
+
+    Raises:
+        ValueError: Whether filters cannot be checked through GraphQL
+
+    Yields:
+        GitlabElement: Gitlab group or project to be handled.
+    """
+    if filters.exclude_forks or filters.min_access_level is not None:
+        raise ValueError(
+            "Forks and access levels cannot be filtered through GraphQL"
+        )
+
+    for group in groups:
+        if filters.is_excluded(group.full_path):
+            continue
+
+        if inventory is not None:
+            inventory.add_group(group)
+
+        yield GitlabElement.from_group(group)
+
+        for node in get_group_nodes(
+            gl,
+            DESCENDANT_GROUPS_QUERY,
+            "descendantGroups",
+            group.full_path,
+            per_page,
+        ):
+            if _is_in_excluded_group(
+                node["fullPath"], filters, include_self=True
+            ):
+                continue
+
+            subgroup = group_from_node(gl, node)
+
+            if inventory is not None:
+                inventory.add_group(subgroup)
+
+            yield GitlabElement.from_group(subgroup)
+
+        for node in get_group_nodes(
+            gl,
+            PROJECTS_QUERY,
+            "projects",
+            group.full_path,
+            per_page,
+            statistics=statistics,
+        ):
+            if node["archived"] and not archived:
+                continue
+
+            project = project_from_node(gl, node)
+
+            if _is_in_excluded_group(
+                node["fullPath"], filters
+            ) or not filters.matches(project):
+                continue
+
+            if inventory is not None:
+                inventory.add_project(project)
+
+            yield GitlabElement.from_project(project)
+
+
+def _is_in_excluded_group(
+    full_path: str, filters: ProjectFilters, include_self: bool = False
+) -> bool:
+    parts = full_path.split("/")
+    depth = len(parts) if include_self else len(parts) - 1
+
+    return any(
+        filters.is_excluded("/".join(parts[:index]))
+        for index in range(1, depth + 1)
+    )
@@ -0,0 +1,566 @@
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Iterable, List, NamedTuple, Optional, Tuple
+
+from gitlab.base import RESTObject
+from rich.console import Console
+from rich.table import Table
+from typer import Argument, BadParameter, Option
+
+from .disk import format_size, parse_size
+from .events import OutputFormat
+from .git import RepositoryAction
+from .report import ElementResult
+
+INVENTORY_PATH = Path(".giphon/inventory.sqlite3")
+INVENTORY_SCHEMA_VERSION = 2
+INVENTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS elements (
+    type TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    full_path TEXT NOT NULL,
+    ssh_url_to_repo TEXT NOT NULL DEFAULT '',
+    http_url_to_repo TEXT NOT NULL DEFAULT '',
+    default_branch TEXT NOT NULL DEFAULT '',
+    archived INTEGER NOT NULL DEFAULT 0,
+    repository_size INTEGER,
+    last_activity_at TEXT NOT NULL DEFAULT '',
+    topics TEXT NOT NULL DEFAULT '[]',
+    discovered_at TEXT NOT NULL,
+    PRIMARY KEY (type, id)
+);
+CREATE INDEX IF NOT EXISTS elements_full_path ON elements (full_path);
+CREATE TABLE IF NOT EXISTS discoveries (
+    namespace TEXT NOT NULL PRIMARY KEY,
+    archived INTEGER NOT NULL,
+    discovered_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    type TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    action TEXT,
+    synced_at TEXT NOT NULL,
+    duration REAL NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (type, id)
+);
+CREATE VIEW IF NOT EXISTS inventory AS
+    SELECT elements.*, syncs.action, syncs.synced_at, syncs.duration,
+        syncs.bytes
+    FROM elements LEFT JOIN syncs USING (type, id);
+"""
+# Sizes were stored as 0 when unknown before version 2
+INVENTORY_MIGRATION_1 = """
+DROP VIEW inventory;
+DROP INDEX elements_full_path;
+ALTER TABLE elements RENAME TO elements_1;
+"""
+INVENTORY_MIGRATION_1_DATA = """
+INSERT INTO elements SELECT type, id, name, full_path, ssh_url_to_repo,
+    http_url_to_repo, default_branch, archived, NULLIF(repository_size, 0),
+    last_activity_at, topics, discovered_at
+FROM elements_1;
+DROP TABLE elements_1;
+"""
+
+
+class InventoryEntry(NamedTuple):
+    """
+    Indexed Gitlab group or project, with the outcome of its last sync.
+
+    Attributes:
+        type (str): The type of the element, `group` or `project`
+        id (int): The Gitlab id of the element
+        name (str): The name of the element
+        full_path (str): The full path of the element
+        ssh_url_to_repo (str): The SSH URL of the project's repository
+        http_url_to_repo (str): The HTTPS URL of the project's repository
+        default_branch (str): The default branch of the project
+        archived (bool): Whether the project is archived
+        repository_size (Optional[int]): The size of the project's
+          repository, in bytes, None if unknown
+        last_activity_at (str): The date of the project's last activity
+        topics (Tuple[str, ...]): The topics of the project
+        discovered_at (str): The date of the run that last discovered the
+          element
+        action (Optional[str]): What was done to the project's repository
+          by its last sync, None if never synced
+        synced_at (Optional[str]): The date of the last sync
+        duration (Optional[float]): The duration of the last sync, in
+          seconds
+        bytes (Optional[int]): The growth of the repository on disk during
+          the last sync, in bytes, 0 if not measured
+    """
+
+    type: str
+    id: int
+    name: str
+    full_path: str
+    ssh_url_to_repo: str
+    http_url_to_repo: str
+    default_branch: str
+    archived: bool
+    repository_size: Optional[int]
+    last_activity_at: str
+    topics: Tuple[str, ...]
+    discovered_at: str
+    action: Optional[str]
+    synced_at: Optional[str]
+    duration: Optional[float]
+    bytes: Optional[int]
+
+    @classmethod
+    def from_row(cls, row: Tuple[Any, ...]) -> "InventoryEntry":
+        """
+        Build an entry from a row of the `inventory` view.
+        """
+        fields = dict(zip(cls._fields, row))
+        fields["archived"] = bool(fields["archived"])
+        fields["topics"] = tuple(json.loads(fields["topics"]))
+
+        return cls(**fields)
+
+
+class Inventory:
+    """
+    Local SQLite index of the discovered groups and projects, holding the
+    metadata gathered during discovery and the outcome of their last sync,
+    so that they can be queried without the Gitlab API.
+
+    Elements are written as they are discovered, within one transaction per
+    call to `commit`.
+    """
+
+    def __init__(
+        self: "Inventory", path: Path, read_only: bool = False
+    ) -> None:
+        self.path = path
+        self.discovered_at = datetime.now(timezone.utc).isoformat()
+
+        if read_only:
+            self.connection = sqlite3.connect(
+                f"{path.resolve().as_uri()}?mode=ro", uri=True
+            )
+            return
+
+        os.makedirs(path.parent, exist_ok=True)
+
+        self.connection = sqlite3.connect(str(path))
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+
+        if version == 1:
+            self.connection.executescript(INVENTORY_MIGRATION_1)
+
+        self.connection.executescript(INVENTORY_SCHEMA)
+
+        if version == 1:
+            self.connection.executescript(INVENTORY_MIGRATION_1_DATA)
+
+        self.connection.execute(
+            f"PRAGMA user_version = {INVENTORY_SCHEMA_VERSION}"
+        )
+
+    @classmethod
+    def open(cls, output: Path) -> "Inventory":
+        """
+        Open the inventory of a siphoned directory, creating it if needed.
+
+        Args:
+            output (Path): The target path the repositories are cloned to
+
+        Returns:
+            Inventory: The inventory
+        """
+        return cls(output / INVENTORY_PATH)
+
+    def commit(self: "Inventory") -> None:
+        self.connection.commit()
+
+    def close(self: "Inventory") -> None:
+        self.connection.commit()
+        self.connection.close()
+
+    def add_group(self: "Inventory", group: RESTObject) -> None:
+        """
+        Index a discovered group.
+
+        Args:
+            group (RESTObject): The group, or a subgroup listing entry
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO elements "
+            "(type, id, name, full_path, discovered_at) "
+            "VALUES ('group', ?, ?, ?, ?)",
+            (group.id, group.name, group.full_path, self.discovered_at),
+        )
+
+    def add_project(self: "Inventory", project: RESTObject) -> None:
+        """
+        Index a discovered project.
+
+        The size of its repository is kept from a previous discovery when
+        the listing does not hold it.
+
+        Args:
+            project (RESTObject): The project, from a listing
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO elements VALUES "
+            "('project', ?, ?, ?, ?, ?, ?, ?, COALESCE(?, ("
+            "SELECT repository_size FROM elements "
+            "WHERE type = 'project' AND id = ?"
+            ")), ?, ?, ?)",
+            (
+                project.id,
+                project.name,
+                project.path_with_namespace,
+                project.ssh_url_to_repo,
+                project.http_url_to_repo,
+                getattr(project, "default_branch", None) or "",
+                bool(getattr(project, "archived", False)),
+                (getattr(project, "statistics", None) or {}).get(
+                    "repository_size"
+                ),
+                project.id,
+                getattr(project, "last_activity_at", None) or "",
+                json.dumps(list(getattr(project, "topics", None) or [])),
+                self.discovered_at,
+            ),
+        )
+
+    def record_result(
+        self: "Inventory", id: int, result: ElementResult
+    ) -> None:
+        """
+        Record the outcome of the sync of an element.
+
+        Args:
+            id (int): The Gitlab id of the element
+            result (ElementResult): The outcome of its sync
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO syncs VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                result.type,
+                id,
+                result.action,
+                datetime.now(timezone.utc).isoformat(),
+                result.duration,
+                result.bytes,
+            ),
+        )
+
+    def record_discovery(
+        self: "Inventory", namespace: Path, archived: bool
+    ) -> None:
+        """
+        Record that a namespace was discovered.
+
+        Args:
+            namespace (Path): The siphoned namespace
+            archived (bool): Whether archived projects were discovered
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO discoveries VALUES (?, ?, ?)",
+            (str(namespace).strip("/"), archived, self.discovered_at),
+        )
+
+    def is_archived_discovered(self: "Inventory", namespace: Path) -> bool:
+        """
+        Get whether the archived projects of a namespace were discovered,
+        by the discovery of the namespace or of one of its parents.
+
+        Args:
+            namespace (Path): The namespace
+
+        Returns:
+            bool: Whether archived projects were discovered
+        """
+        path = str(namespace).strip("/")
+
+        try:
+            discovered = self.connection.execute(
+                "SELECT namespace FROM discoveries WHERE archived"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # Inventories from before version 2
+            return False
+
+        return any(
+            not parent or path == parent or path.startswith(f"{parent}/")
+            for (parent,) in discovered
+        )
+
+    def forget_undiscovered(self: "Inventory", namespace: Path) -> int:
+        """
+        Remove the elements of a namespace that were not discovered since
+        the inventory was opened, along with their syncs.
+
+        Args:
+            namespace (Path): The siphoned namespace
+
+        Returns:
+            int: The number of removed elements
+        """
+        condition, parameters = _get_namespace_condition(namespace)
+        undiscovered = (
+            "SELECT type, id FROM elements "
+            f"WHERE {condition} AND discovered_at != ?"
+        )
+        values = (*parameters, self.discovered_at)
+
+        self.connection.execute(
+            f"DELETE FROM syncs WHERE (type, id) IN ({undiscovered})", values
+        )
+
+        return self.connection.execute(
+            f"DELETE FROM elements WHERE (type, id) IN ({undiscovered})",
+            values,
+        ).rowcount
+
+    def select(
+        self: "Inventory",
+        *,
+        namespace: Path = Path("/"),
+        type: Optional[str] = None,
+        archived: Optional[bool] = None,
+        larger_than: Optional[float] = None,
+        action: Optional[str] = None,
+        topics: Iterable[str] = (),
+    ) -> List[InventoryEntry]:
+        """
+        Select indexed elements, sorted by path.
+
+        Args:
+            namespace (Path, optional): The namespace to select elements
+              in. Defaults to the whole instance.
+            type (Optional[str], optional): The type of the elements
+            archived (Optional[bool], optional): Whether projects are
+              archived
+            larger_than (Optional[float], optional): The size in bytes
+              repositories must exceed
+            action (Optional[str], optional): The outcome of the last sync
+            topics (Iterable[str], optional): Topics projects must all have
+
+        Returns:
+            List[InventoryEntry]: The matching elements
+        """
+        condition, parameters = _get_namespace_condition(namespace)
+        conditions, values = [condition], list(parameters)
+
+        for column, value in (
+            ("type", type),
+            ("archived", archived),
+            ("action", action),
+        ):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                values.append(value)
+
+        if larger_than is not None:
+            conditions.append("repository_size > ?")
+            values.append(larger_than)
+
+        entries = [
+            InventoryEntry.from_row(row)
+            for row in self.connection.execute(
+                f"SELECT * FROM inventory WHERE {' AND '.join(conditions)} "
+                "ORDER BY full_path",
+                values,
+            )
+        ]
+        required_topics = set(topics)
+
+        return [
+            entry for entry in entries if required_topics <= set(entry.topics)
+        ]
+
+
+def _get_namespace_condition(namespace: Path) -> Tuple[str, Tuple[Any, ...]]:
+    path = str(namespace).strip("/")
+
+    if not path:
+        return "1", ()
+
+    # Rather than LIKE, which is case-insensitive and has wildcards
+    return (
+        "(full_path = ? OR substr(full_path, 1, ?) = ?)",
+        (path, len(path) + 1, f"{path}/"),
+    )
+
+
+def _get_inventory_path(output: Path) -> Path:
+    path = output / INVENTORY_PATH
+
+    if not path.is_file():
+        raise BadParameter(
+            f"No inventory in {output}, siphon it with `--inventory` first"
+        )
+
+    return path
+
+
+def _print_rows(
+    columns: List[str],
+    rows: Iterable[Tuple[Any, ...]],
+    output_format: OutputFormat,
+) -> None:
+    if output_format == OutputFormat.jsonl:
+        for row in rows:
+            print(json.dumps(dict(zip(columns, row))))
+        return
+
+    table = Table(*columns)
+
+    for row in rows:
+        table.add_row(*("" if value is None else str(value) for value in row))
+
+    Console().print(table)
+
+
+def ls(
+    namespace: Path = Argument(
+        Path("/"),
+        help="The namespace to list the projects of.",
+    ),
+    output: Path = Option(
+        ...,
+        help="The target path the repositories were siphoned to.",
+    ),
+    archived: Optional[bool] = Option(
+        None,
+        "--archived/--not-archived",
+        help="Only list archived, or unarchived, projects.",
+    ),
+    larger_than: Optional[str] = Option(
+        None,
+        help=(
+            "Only list projects whose repository is larger than a size, "
+            "with an optional `K`, `M`, `G` or `T` suffix (e.g. `1G`)."
+        ),
+    ),
+    action: Optional[RepositoryAction] = Option(
+        None,
+        help=(
+            "Only list projects whose last sync had this outcome, e.g. "
+            "`failed`."
+        ),
+    ),
+    topic: Optional[List[str]] = Option(
+        None,
+        help="A topic projects must have. Can be repeated.",
+    ),
+    output_format: OutputFormat = Option(
+        OutputFormat.rich,
+        help="`rich` prints a table, `jsonl` one JSON object per project.",
+    ),
+) -> None:
+    """
+    List siphoned projects from the local inventory, without querying the
+    Gitlab API.
+    """
+    inventory = Inventory(_get_inventory_path(output), read_only=True)
+    select = partial(
+        inventory.select,
+        namespace=namespace,
+        type="project",
+        archived=archived,
+        action=action.value if action is not None else None,
+        topics=topic or (),
+    )
+
+    try:
+        entries = select(
+            larger_than=(
+                parse_size(larger_than) if larger_than is not None else None
+            ),
+        )
+
+        if larger_than is not None:
+            unknown_sizes = sum(
+                entry.repository_size is None for entry in select()
+            )
+
+            if unknown_sizes:
+                print(
+                    f"Warning: the size of {unknown_sizes} projects is "
+                    "unknown, siphon with `--inventory-sizes` to list them",
+                    file=sys.stderr,
+                )
+
+        if archived and not inventory.is_archived_discovered(namespace):
+            print(
+                "Warning: archived projects were not indexed, siphon with "
+                "`--clone-archived` to list them",
+                file=sys.stderr,
+            )
+    finally:
+        inventory.close()
+
+    if output_format == OutputFormat.jsonl:
+        _print_rows(list(InventoryEntry._fields), entries, output_format)
+        return
+
+    _print_rows(
+        ["Path", "Branch", "Archived", "Size", "Last activity", "Last sync"],
+        (
+            (
+                entry.full_path,
+                entry.default_branch,
+                "yes" if entry.archived else "",
+                (
+                    format_size(entry.repository_size)
+                    if entry.repository_size is not None
+                    else ""
+                ),
+                entry.last_activity_at,
+                entry.action,
+            )
+            for entry in entries
+        ),
+        output_format,
+    )
+
+
+def query(
+    sql: str = Argument(
+        ...,
+        help=(
+            "A read-only SQL query against the `inventory` view, which "
+            "joins the `elements` and `syncs` tables."
+        ),
+    ),
+    output: Path = Option(
+        ...,
+        help="The target path the repositories were siphoned to.",
+    ),
+    output_format: OutputFormat = Option(
+        OutputFormat.rich,
+        help="`rich` prints a table, `jsonl` one JSON object per row.",
+    ),
+) -> None:
+    """
+    Run an SQL query against the local inventory, without querying the
+    Gitlab API.
+    """
+    path = _get_inventory_path(output)
+    connection = sqlite3.connect(
+        f"{path.resolve().as_uri()}?mode=ro", uri=True
+    )
+
+    try:
+        cursor = connection.execute(sql)
+        columns = [column[0] for column in cursor.description or ()]
+        rows = cursor.fetchall()
+    except sqlite3.Error as e:
+        raise BadParameter(f"Invalid query: {e}")
+    finally:
+        connection.close()
+
+    _print_rows(columns, rows, output_format)
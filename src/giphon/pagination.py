@@ -0,0 +1,139 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Deque, Iterator, List, Optional
+
+from gitlab import Gitlab
+from gitlab.base import RESTObject
+
+PREFETCH_PER_PAGE = 100
+RATE_LIMIT_RESERVE = 50
+
+
+class PagePrefetcher:
+    """
+    Lister of paginated API resources, keeping the next pages in flight while
+    the current one is processed.
+
+    Listings whose first page holds every item cost a single request, as with
+    python-gitlab. Larger ones request up to `pages` pages ahead, which are
+    yielded in order: at most `pages + 1` pages are held at once.
+
+    Prefetching stops while the instance reports fewer remaining requests
+    than a reserve, through the `RateLimit-Remaining` header, and pages are
+    then requested one at a time, as python-gitlab does.
+    """
+
+    def __init__(
+        self: "PagePrefetcher",
+        gl: Gitlab,
+        *,
+        pages: int = 2,
+        per_page: int = PREFETCH_PER_PAGE,
+    ) -> None:
+        self.pages = pages
+        self.per_page = per_page
+        self.rate_limit_remaining: Optional[int] = None
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, pages), thread_name_prefix="giphon-prefetch"
+        )
+
+        self._gl = gl
+        gl.session.hooks["response"].append(self._record_rate_limit)
+
+    def __enter__(self: "PagePrefetcher") -> "PagePrefetcher":
+        return self
+
+    def __exit__(self: "PagePrefetcher", *_: Any) -> None:
+        self._executor.shutdown(wait=True)
+        # The instance may outlive the prefetcher, such as across runs
+        self._gl.session.hooks["response"].remove(self._record_rate_limit)
+
+    def _record_rate_limit(
+        self: "PagePrefetcher", response: Any, *_: Any, **__: Any
+    ) -> None:
+        remaining = response.headers.get("RateLimit-Remaining")
+
+        if remaining is not None and remaining.isdigit():
+            self.rate_limit_remaining = int(remaining)
+
+    def can_prefetch(self: "PagePrefetcher", in_flight: int) -> bool:
+        """
+        Check whether one more page can be requested ahead.
+
+        Args:
+            in_flight (int): The number of pages already requested ahead
+
+        Returns:
+            bool: Whether the prefetch depth and the rate limit allow it
+        """
+        return in_flight < self.pages and (
+            self.rate_limit_remaining is None
+            or self.rate_limit_remaining > RATE_LIMIT_RESERVE + in_flight
+        )
+
+    def list(
+        self: "PagePrefetcher", manager: Any, **kwargs: Any
+    ) -> Iterator[RESTObject]:
+        """
+        List every object of a python-gitlab manager.
+
+        Instances that do not report the number of pages, for listings of
+        more than 10,000 items, are read until a page is not full, so that
+        up to `pages` empty pages may be requested past the end.
+
+        Args:
+            manager (Any): The python-gitlab manager to list, such as
+              `gl.projects` or `group.subgroups`
+            **kwargs (Any): The filters of the listing
+
+        Yields:
+            RESTObject: The listed objects, in order
+        """
+        first_page = manager.list(
+            iterator=True, per_page=self.per_page, **kwargs
+        )
+        total_pages: Optional[int] = first_page.total_pages
+        objects = list(islice(first_page, self.per_page))
+
+        if len(objects) < self.per_page or total_pages == 1:
+            yield from objects
+            return
+
+        pending: Deque["Future[List[RESTObject]]"] = deque()
+        next_page = 2
+
+        def _has_next_page() -> bool:
+            return total_pages is None or next_page <= total_pages
+
+        def _request_pages() -> None:
+            nonlocal next_page
+
+            while _has_next_page() and (
+                not pending or self.can_prefetch(len(pending))
+            ):
+                pending.append(
+                    self._executor.submit(
+                        manager.list,
+                        page=next_page,
+                        per_page=self.per_page,
+                        get_all=False,
+                        **kwargs,
+                    )
+                )
+                next_page += 1
+
+        _request_pages()
+        yield from objects
+
+        while pending:
+            objects = pending.popleft().result()
+
+            if len(objects) < self.per_page:
+                # Pages requested past the end are empty
+                pending.clear()
+            else:
+                _request_pages()
+
+            yield from objects
@@ -0,0 +1,215 @@
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar, cast
+
+from typer import BadParameter
+
+Command = TypeVar("Command", bound=Callable[..., Any])
+
+
+class Profiler(str, Enum):
+    """
+    Which profiler to run a command under.
+    """
+
+    cprofile = "cprofile"
+    pyinstrument = "pyinstrument"
+
+
+class Tracer:
+    """
+    Collector of timed spans, exported in the Chrome trace-event format.
+
+    The exported file can be opened in `chrome://tracing` or Perfetto.
+    """
+
+    def __init__(self: "Tracer") -> None:
+        self.events: List[Dict[str, Any]] = []
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self: "Tracer", name: str, **args: Any) -> Iterator[None]:
+        """
+        Record the duration of a block of code.
+
+        Args:
+            name (str): The name of the span
+            **args (Any): JSON-serializable details attached to the span
+        """
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+
+            with self._lock:
+                self.events.append(
+                    {
+                        "name": name,
+                        "cat": "giphon",
+                        "ph": "X",
+                        "ts": (start - self._start) * 1e6,
+                        "dur": (end - start) * 1e6,
+                        "pid": os.getpid(),
+                        "tid": threading.get_ident(),
+                        "args": args,
+                    }
+                )
+
+    def write(self: "Tracer", path: Path) -> None:
+        """
+        Write the recorded spans as a Chrome trace-event file.
+
+        Args:
+            path (Path): The path of the JSON file to write
+        """
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+_tracer: Optional[Tracer] = None
+
+
+@contextmanager
+def trace_span(name: str, **args: Any) -> Iterator[None]:
+    """
+    Record a span, when tracing is enabled.
+
+    Args:
+        name (str): The name of the span
+        **args (Any): JSON-serializable details attached to the span
+    """
+    tracer = _tracer
+
+    if tracer is None:
+        yield
+        return
+
+    with tracer.span(name, **args):
+        yield
+
+
+@contextmanager
+def profiling(
+    *,
+    profile: Optional[Path] = None,
+    profiler: Profiler = Profiler.cprofile,
+    trace: Optional[Path] = None,
+) -> Iterator[None]:
+    """
+    Profile and trace a block of code.
+
+    Args:
+        profile (Optional[Path]): The path to write the profile to. A
+          `pstats` file for cProfile, covering the threads started within
+          the block, an HTML report for pyinstrument.
+        profiler (Profiler): The profiler to use. pyinstrument is a sampling
+          profiler, which must be installed separately.
+        trace (Optional[Path]): The path to write the spans to, as a Chrome
+          trace-event file
+
+    Raises:
+        BadParameter: Whether the requested profiler is not installed
+    """
+    global _tracer
+
+    if trace is not None:
+        _tracer = Tracer()
+
+    try:
+        if profile is None:
+            yield
+
+        elif profiler == Profiler.pyinstrument:
+            try:
+                from pyinstrument import Profiler as SamplingProfiler
+            except ImportError:
+                raise BadParameter(
+                    "pyinstrument is not installed, install it with "
+                    "`pip install giphon[profile]`"
+                )
+
+            sampling_profiler = SamplingProfiler()
+            sampling_profiler.start()
+
+            try:
+                yield
+            finally:
+                sampling_profiler.stop()
+
+                with open(profile, "w") as f:
+                    f.write(sampling_profiler.output_html())
+
+        else:
+            deterministic_profiler = cProfile.Profile()
+            thread_profilers: List[cProfile.Profile] = []
+
+            def _profile_thread(*_: Any) -> None:
+                # cProfile only sees the thread enabling it, so threads
+                # started meanwhile, such as workers, enable their own
+                sys.setprofile(None)
+                thread_profiler = cProfile.Profile()
+
+                try:
+                    thread_profiler.enable()
+                except ValueError:
+                    # From Python 3.12, profilers already see every thread
+                    return
+
+                thread_profilers.append(thread_profiler)
+
+            threading.setprofile(_profile_thread)
+            deterministic_profiler.enable()
+
+            try:
+                yield
+            finally:
+                deterministic_profiler.disable()
+                threading.setprofile(None)
+
+                stats = pstats.Stats(deterministic_profiler)
+
+                for thread_profiler in thread_profilers:
+                    stats.add(thread_profiler)
+
+                stats.dump_stats(profile)
+
+    finally:
+        if trace is not None and _tracer is not None:
+            _tracer.write(trace)
+            _tracer = None
+
+
+def profiled(command: Command) -> Command:
+    """
+    Run a command under the profiler and tracer requested through its
+    `profile`, `profiler` and `trace` parameters.
+
+    Args:
+        command (Callable): The command to wrap
+
+    Returns:
+        Callable: The wrapped command, with the same signature
+    """
+
+    @functools.wraps(command)
+    def _profiled_command(*args: Any, **kwargs: Any) -> Any:
+        with profiling(
+            profile=kwargs.get("profile"),
+            profiler=kwargs.get("profiler", Profiler.cprofile),
+            trace=kwargs.get("trace"),
+        ):
+            return command(*args, **kwargs)
+
+    return cast(Command, _profiled_command)
@@ -0,0 +1,361 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from gitlab import Gitlab
+from typer import Argument, Option
+
+
+class ElementResult(NamedTuple):
+    """
+    Outcome of siphoning a single Gitlab group or project.
+
+    Attributes:
+        type (str): The type of the element, `group` or `project`
+        full_path (str): The full path of the element
+        action (Optional[str]): What was done to the project's repository,
+          None for groups
+        duration (float): The time spent handling the element, in seconds
+        bytes (int): The growth of the repository on disk, in bytes, 0 if
+          not measured
+        variables (int): The number of saved CI/CD variables
+        error (Optional[str]): The error that stopped the handling of the
+          element, None if it succeeded
+    """
+
+    type: str
+    full_path: str
+    action: Optional[str] = None
+    duration: float = 0.0
+    bytes: int = 0
+    variables: int = 0
+    error: Optional[str] = None
+
+
+class ConcurrencyChange(NamedTuple):
+    """
+    Change of the number of concurrent workers during a run.
+
+    Attributes:
+        seconds (float): The time of the change, since the start of the
+          siphon phase
+        jobs (int): The number of concurrent workers from then on
+    """
+
+    seconds: float
+    jobs: int
+
+
+@dataclass
+class ApiMetrics:
+    """
+    Count and latency of the calls made to the Gitlab API.
+
+    Attributes:
+        calls (Dict[str, int]): Number of calls, per HTTP method
+        seconds (Dict[str, float]): Total latency of calls, per HTTP method
+        max_seconds (float): Latency of the slowest call
+    """
+
+    calls: Dict[str, int] = field(default_factory=dict)
+    seconds: Dict[str, float] = field(default_factory=dict)
+    max_seconds: float = 0.0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def record(self: "ApiMetrics", method: str, seconds: float) -> None:
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.seconds[method] = self.seconds.get(method, 0.0) + seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def record_response(
+        self: "ApiMetrics", response: Any, *_: Any, **__: Any
+    ) -> None:
+        """
+        Record a call from its response, as a hook of a requests session.
+
+        Args:
+            response (Response): The response of the call
+        """
+        self.record(response.request.method, response.elapsed.total_seconds())
+
+    def track(self: "ApiMetrics", gl: Gitlab) -> None:
+        """
+        Record every call made through a Python Gitlab API instance.
+
+        Args:
+            gl (Gitlab): The Python Gitlab API instance to track
+        """
+        gl.session.hooks["response"].append(self.record_response)
+
+    def merge(self: "ApiMetrics", other: "ApiMetrics") -> None:
+        for method, calls in other.calls.items():
+            self.calls[method] = self.calls.get(method, 0) + calls
+
+        for method, seconds in other.seconds.items():
+            self.seconds[method] = self.seconds.get(method, 0.0) + seconds
+
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+
+
+@dataclass
+class RunReport:
+    """
+    Summary of a siphon run, written as JSON for monitoring.
+
+    Attributes:
+        shards (List[str]): The shards covered by the run, as `index/count`
+        processed (Dict[str, int]): Number of handled elements, per type
+        phases (Dict[str, float]): Wall time of each phase, in seconds
+        elements (List[ElementResult]): Outcome of each handled element
+        api (ApiMetrics): Count and latency of the Gitlab API calls
+        concurrency (List[ConcurrencyChange]): The number of concurrent
+          workers over the course of the siphon phase
+    """
+
+    shards: List[str] = field(default_factory=list)
+    processed: Dict[str, int] = field(default_factory=dict)
+    phases: Dict[str, float] = field(default_factory=dict)
+    elements: List[ElementResult] = field(default_factory=list)
+    api: ApiMetrics = field(default_factory=ApiMetrics)
+    concurrency: List[ConcurrencyChange] = field(default_factory=list)
+
+    def count_processed(self: "RunReport", element_type: str) -> None:
+        self.processed[element_type] = self.processed.get(element_type, 0) + 1
+
+    def add_result(self: "RunReport", result: ElementResult) -> None:
+        self.elements.append(result)
+        self.count_processed(result.type)
+
+    @contextmanager
+    def phase(self: "RunReport", name: str) -> Iterator[None]:
+        """
+        Measure the wall time of a phase of the run.
+
+        Args:
+            name (str): The name of the phase
+        """
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (
+                time.perf_counter() - start
+            )
+
+    @property
+    def actions(self: "RunReport") -> Dict[str, int]:
+        """
+        Number of repositories per action taken.
+        """
+        actions: Dict[str, int] = {}
+
+        for result in self.elements:
+            if result.action is not None:
+                actions[result.action] = actions.get(result.action, 0) + 1
+
+        return actions
+
+    @property
+    def variables(self: "RunReport") -> int:
+        """
+        Number of saved CI/CD variables.
+        """
+        return sum(result.variables for result in self.elements)
+
+    @property
+    def bytes(self: "RunReport") -> int:
+        """
+        Growth of the repositories on disk, in bytes.
+        """
+        return sum(result.bytes for result in self.elements)
+
+    def to_dict(self: "RunReport") -> Dict[str, Any]:
+        return {
+            "shards": self.shards,
+            "processed": self.processed,
+            "phases": self.phases,
+            "actions": self.actions,
+            "variables": self.variables,
+            "bytes": self.bytes,
+            "api": {
+                "calls": self.api.calls,
+                "seconds": self.api.seconds,
+                "max_seconds": self.api.max_seconds,
+            },
+            "concurrency": [change._asdict() for change in self.concurrency],
+            "elements": [result._asdict() for result in self.elements],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunReport":
+        api = data.get("api", {})
+
+        return cls(
+            shards=list(data.get("shards", [])),
+            processed=dict(data.get("processed", {})),
+            phases=dict(data.get("phases", {})),
+            elements=[
+                ElementResult(**result) for result in data.get("elements", [])
+            ],
+            api=ApiMetrics(
+                calls=dict(api.get("calls", {})),
+                seconds=dict(api.get("seconds", {})),
+                max_seconds=api.get("max_seconds", 0.0),
+            ),
+            concurrency=[
+                ConcurrencyChange(**change)
+                for change in data.get("concurrency", [])
+            ],
+        )
+
+    def write(self: "RunReport", path: Path) -> None:
+        """
+        Write the report as JSON.
+
+        Args:
+            path (Path): The path of the JSON file to write
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+
+    @classmethod
+    def read(cls, path: Path) -> "RunReport":
+        """
+        Read a report from a JSON file.
+
+        Args:
+            path (Path): The path of the JSON file to read
+
+        Returns:
+            RunReport: The loaded report
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def write_prometheus(self: "RunReport", path: Path) -> None:
+        """
+        Write the report's metrics in the Prometheus text format, for the
+        node exporter's textfile collector.
+
+        The file is replaced atomically, so it is never scraped half-written.
+
+        Args:
+            path (Path): The path of the `.prom` file to write
+        """
+        lines = [
+            "# HELP giphon_phase_duration_seconds Wall time of a run phase.",
+            "# TYPE giphon_phase_duration_seconds gauge",
+            *(
+                f'giphon_phase_duration_seconds{{phase="{phase}"}} {seconds}'
+                for phase, seconds in sorted(self.phases.items())
+            ),
+            "# HELP giphon_elements_processed Number of handled elements.",
+            "# TYPE giphon_elements_processed gauge",
+            *(
+                f'giphon_elements_processed{{type="{element_type}"}} {count}'
+                for element_type, count in sorted(self.processed.items())
+            ),
+            "# HELP giphon_repositories Number of repositories per action.",
+            "# TYPE giphon_repositories gauge",
+            *(
+                f'giphon_repositories{{action="{action}"}} {count}'
+                for action, count in sorted(self.actions.items())
+            ),
+            "# HELP giphon_repositories_bytes Growth of repositories on disk.",
+            "# TYPE giphon_repositories_bytes gauge",
+            f"giphon_repositories_bytes {self.bytes}",
+            "# HELP giphon_ci_variables Number of saved CI/CD variables.",
+            "# TYPE giphon_ci_variables gauge",
+            f"giphon_ci_variables {self.variables}",
+            "# HELP giphon_api_calls Number of Gitlab API calls.",
+            "# TYPE giphon_api_calls gauge",
+            *(
+                f'giphon_api_calls{{method="{method}"}} {calls}'
+                for method, calls in sorted(self.api.calls.items())
+            ),
+            "# HELP giphon_api_seconds Total latency of Gitlab API calls.",
+            "# TYPE giphon_api_seconds gauge",
+            *(
+                f'giphon_api_seconds{{method="{method}"}} {seconds}'
+                for method, seconds in sorted(self.api.seconds.items())
+            ),
+            "# HELP giphon_api_max_seconds Latency of the slowest API call.",
+            "# TYPE giphon_api_max_seconds gauge",
+            f"giphon_api_max_seconds {self.api.max_seconds}",
+            *(
+                [
+                    "# HELP giphon_jobs Number of concurrent workers at the "
+                    "end of the run.",
+                    "# TYPE giphon_jobs gauge",
+                    f"giphon_jobs {self.concurrency[-1].jobs}",
+                ]
+                if self.concurrency
+                else []
+            ),
+        ]
+
+        temporary_path = path.with_name(f".{path.name}.tmp")
+
+        with open(temporary_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+        os.replace(temporary_path, path)
+
+
+def merge_run_reports(reports: List[RunReport]) -> RunReport:
+    """
+    Merge the reports of several runs, typically one per shard.
+
+    Counts are summed, while phase wall times are the longest of all runs,
+    since shards run in parallel. Concurrency histories are left out, as the
+    ones of independent runs do not make a single timeline.
+
+    Args:
+        reports (List[RunReport]): The reports to merge
+
+    Returns:
+        RunReport: A report combining all `reports`
+    """
+    merged = RunReport()
+
+    for report in reports:
+        merged.shards.extend(report.shards)
+        merged.elements.extend(report.elements)
+        merged.api.merge(report.api)
+
+        for element_type, count in report.processed.items():
+            merged.processed[element_type] = (
+                merged.processed.get(element_type, 0) + count
+            )
+
+        for phase, seconds in report.phases.items():
+            merged.phases[phase] = max(merged.phases.get(phase, 0.0), seconds)
+
+    merged.shards.sort()
+
+    return merged
+
+
+def merge_reports(
+    reports: List[Path] = Argument(
+        ...,
+        help="The JSON run reports to merge.",
+    ),
+    output: Path = Option(
+        ...,
+        help="The path to write the merged JSON report to.",
+    ),
+) -> None:
+    """
+    Merge JSON run reports, such as the ones from several shards.
+    """
+    merge_run_reports([RunReport.read(path) for path in reports]).write(output)
@@ -0,0 +1,83 @@
+from typing import NamedTuple, Optional
+from zlib import crc32
+
+from typer import BadParameter
+
+from .gitlab import GitlabElement
+
+
+class Shard(NamedTuple):
+    """
+    A slice of the elements to siphon, as `number` out of `total`.
+    """
+
+    number: int
+    total: int
+
+    def __str__(self: "Shard") -> str:
+        return f"{self.number}/{self.total}"
+
+
+def parse_shard(value: Optional[str]) -> Optional[Shard]:
+    """
+    Parse a shard specification such as `0/4`.
+
+    Args:
+        value (Optional[str]): The shard specification, as `index/count`
+
+    Raises:
+        BadParameter: Whether the specification is malformed
+
+    Returns:
+        Optional[Shard]: The parsed shard, or None when no value is given
+    """
+    if not value:
+        return None
+
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise BadParameter(f"Expected a shard as `index/count`, got {value}")
+
+    if count < 1 or not 0 <= index < count:
+        raise BadParameter(
+            f"Shard index must be between 0 and {count - 1}, got {index}"
+        )
+
+    return Shard(number=index, total=count)
+
+
+def get_element_shard(element: GitlabElement, count: int) -> int:
+    """
+    Get the shard a Gitlab element is assigned to.
+
+    The assignment relies on a stable hash of the element's id, so that every
+    node siphoning the same namespace agrees on it without coordination.
+
+    Args:
+        element (GitlabElement): The Gitlab group or project
+        count (int): The total number of shards
+
+    Returns:
+        int: The index of the shard handling `element`
+    """
+    return crc32(f"{element.type}:{element.id}".encode()) % count
+
+
+def is_element_in_shard(
+    element: GitlabElement, shard: Optional[Shard]
+) -> bool:
+    """
+    Check whether a Gitlab element is handled by a given shard.
+
+    Args:
+        element (GitlabElement): The Gitlab group or project
+        shard (Optional[Shard]): The current shard, None handling everything
+
+    Returns:
+        bool: Whether `element` should be handled
+    """
+    if shard is None:
+        return True
+
+    return get_element_shard(element, shard.total) == shard.number
@@ -1,10 +1,39 @@
+import asyncio
 import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import ExitStack
+from datetime import datetime
+from functools import partial
 from pathlib import Path
 from sys import stderr, stdout
-from typing import Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+)
 from urllib.parse import urlparse, urlunparse
 
-from gitlab.v4.objects import Project
+from gitlab import Gitlab
+from rich.console import Console
 from rich.progress import (
     BarColumn,
     MofNCompleteColumn,
@@ -12,10 +41,28 @@ from rich.progress import (
     SpinnerColumn,
     TextColumn,
 )
-from typer import Option
+from typer import BadParameter, Option
 
-from .git import handle_project
+from .bandwidth import BandwidthBudget, parse_bandwidth
+from .cassette import ApiRecorder, ApiReplayAdapter
+from .commands import callable_command
+from .concurrency import AdaptiveConcurrency, parse_jobs
+from .disk import DiskSpaceBudget, get_device, parse_size
+from .events import EventStream, OutputFormat
+from .filters import AccessLevel, ProjectFilters, Visibility
+from .git import (
+    LfsStrategy,
+    RepositoryAction,
+    SparseCheckout,
+    checkout_repository,
+    get_repository_size,
+    handle_project,
+    pull_lfs_objects,
+    run_maintenance,
+)
 from .gitlab import (
+    Discovery,
+    GitlabElement,
     flatten_groups_tree,
     get_gitlab_element_full_path,
     get_gitlab_element_type,
@@ -23,9 +70,24 @@ from .gitlab import (
     get_groups_from_path,
     save_environment_variables,
 )
+from .graphql import flatten_groups_tree_graphql
+from .inventory import Inventory
+from .pagination import PagePrefetcher
+from .profiling import Profiler, profiled, trace_span
+from .report import ElementResult, RunReport
+from .shard import is_element_in_shard, parse_shard
+from .ssh import ssh_multiplexing as _ssh_multiplexing
+from .state import (
+    PrunePolicy,
+    load_projects_state,
+    prune_projects,
+    save_projects_state,
+)
 
 
-def _setup_logger(name: str, log_level: int) -> logging.Logger:
+def _setup_logger(
+    name: str, log_level: int, info_stream: TextIO = stdout
+) -> logging.Logger:
     class _InfoFilter(logging.Filter):
         def filter(self: "_InfoFilter", rec: logging.LogRecord) -> bool:
             return rec.levelno in (logging.DEBUG, logging.INFO)
@@ -33,8 +95,9 @@ def _setup_logger(name: str, log_level: int) -> logging.Logger:
     logger = logging.getLogger(name)
 
     logger.setLevel(log_level)
+    logger.handlers.clear()
 
-    stdout_handler = logging.StreamHandler(stdout)
+    stdout_handler = logging.StreamHandler(info_stream)
     stdout_handler.setLevel(log_level)
     stdout_handler.addFilter(_InfoFilter())
     stderr_handler = logging.StreamHandler(stderr)
@@ -46,6 +109,1292 @@ def _setup_logger(name: str, log_level: int) -> logging.Logger:
     return logger
 
 
+def get_repository_url(
+    element: GitlabElement,
+    *,
+    clone_through_ssh: bool,
+    gitlab_username: str,
+    gitlab_token: str,
+) -> str:
+    """
+    Get the URL to clone a project's repository from.
+
+    Args:
+        element (GitlabElement): The Gitlab project
+        clone_through_ssh (bool): Whether to clone through SSH or https
+        gitlab_username (str): The username associated with the token, used
+          to authenticate https URLs
+        gitlab_token (str): The Personal Access Token, used to authenticate
+          https URLs
+
+    Returns:
+        str: The URL of the repository
+    """
+    if clone_through_ssh:
+        return element.ssh_url_to_repo
+
+    if not gitlab_username:
+        return element.http_url_to_repo
+
+    parsed_url_to_repo = urlparse(element.http_url_to_repo)
+
+    unauthenticated_domain = parsed_url_to_repo.netloc.split("@")[-1]
+
+    authenticated_domain = (
+        f"{gitlab_username}:{gitlab_token}@{unauthenticated_domain}"
+    )
+
+    return urlunparse(parsed_url_to_repo._replace(netloc=authenticated_domain))
+
+
+def handle_element(
+    element: GitlabElement,
+    *,
+    output: Path,
+    gl: Gitlab,
+    gitlab_token: str,
+    gitlab_username: str,
+    fetch_repositories: bool,
+    save_ci_variables: bool,
+    clone_through_ssh: bool,
+    logger: logging.Logger,
+    previous_path: Optional[Path] = None,
+    checkout: bool = True,
+    lfs_skip_smudge: bool = False,
+    sparse_checkout: Optional[SparseCheckout] = None,
+    partial_clone: bool = False,
+    bandwidth: Optional[BandwidthBudget] = None,
+    measure_size: bool = False,
+) -> ElementResult:
+    """
+    Siphon a single Gitlab group or project.
+
+    Clones or fetches the project's repository, and saves the element's CI/CD
+    variables.
+
+    Args:
+        element (GitlabElement): The Gitlab group or project to handle
+        output (Path): The target path to clone the repositories to
+        gl (Gitlab): the Python-Gitlab API instance
+        gitlab_token (str): The Personal Access Token for the Gitlab v4 API
+        gitlab_username (str): The username associated with the token
+        fetch_repositories (bool): Whether to fetch remotes on repositories
+          that already exist
+        save_ci_variables (bool): Whether to download CI/CD variables
+        clone_through_ssh (bool): Whether to clone through SSH or https
+        logger (Logger): the logger to use to generate logs
+        previous_path (Optional[Path]): The path of the project, relative to
+          `output`, as siphoned by a previous run
+        checkout (bool): Whether to check out the working tree of a cloned
+          repository, or to leave it to `checkout_element`
+        lfs_skip_smudge (bool): Whether to check out Git LFS pointers instead
+          of downloading their objects
+        sparse_checkout (Optional[SparseCheckout]): The files to check out
+        partial_clone (bool): Whether to clone without blobs
+        bandwidth (Optional[BandwidthBudget]): The budget shared by all git
+          transfers, if any
+        measure_size (bool): Whether to measure the growth of the
+          repository, which walks its git directory before and after. Always
+          measured with a bandwidth budget.
+
+    Returns:
+        ElementResult: The outcome of handling the element
+    """
+    start = time.perf_counter()
+    full_path = get_gitlab_element_full_path(element)
+    action = None
+    size_growth = 0
+    variables = 0
+
+    if element.type == "project":
+        repository_path = output / full_path
+        measure_size = measure_size or bandwidth is not None
+        size_before = (
+            get_repository_size(repository_path) if measure_size else 0
+        )
+
+        # Clones are expected to transfer the whole repository, unless
+        # without blobs, while the growth of fetches is unknown
+        expected_size = (
+            element.repository_size
+            if previous_path is None
+            and not partial_clone
+            and not repository_path.is_dir()
+            else 0
+        )
+
+        if bandwidth is not None:
+            with trace_span("bandwidth_admission", full_path=str(full_path)):
+                bandwidth.acquire(expected_size)
+
+        with trace_span("handle_project", full_path=str(full_path)):
+            action = handle_project(
+                repository_path=repository_path,
+                repository_url=get_repository_url(
+                    element,
+                    clone_through_ssh=clone_through_ssh,
+                    gitlab_username=gitlab_username,
+                    gitlab_token=gitlab_token,
+                ),
+                fetch=fetch_repositories,
+                logger=logger,
+                previous_repository_path=(
+                    output / previous_path
+                    if previous_path is not None
+                    else None
+                ),
+                checkout=checkout,
+                lfs_skip_smudge=lfs_skip_smudge,
+                sparse_checkout=sparse_checkout,
+                partial_clone=partial_clone,
+            ).value
+
+        if measure_size:
+            size_growth = get_repository_size(repository_path) - size_before
+
+        if bandwidth is not None:
+            bandwidth.consume(size_growth, reserved=expected_size)
+
+    if save_ci_variables:
+        with trace_span(
+            "save_environment_variables", full_path=str(full_path)
+        ):
+            variables = save_environment_variables(
+                output, element, logger, gl=gl
+            )
+
+    return ElementResult(
+        type=element.type,
+        full_path=str(full_path),
+        action=action,
+        duration=time.perf_counter() - start,
+        bytes=size_growth,
+        variables=variables,
+    )
+
+
+class _Stage(NamedTuple):
+    description: str
+    handle: Callable[..., ElementResult]
+    jobs: int
+    applies: Callable[[ElementResult], bool]
+
+
+def _is_cloned(result: ElementResult) -> bool:
+    return result.action == RepositoryAction.cloned
+
+
+def _received_objects(result: ElementResult) -> bool:
+    return result.action == RepositoryAction.fetched and result.bytes > 0
+
+
+def _transfer(
+    transfer: Callable[[], Any],
+    repository_path: Path,
+    *,
+    bandwidth: Optional[BandwidthBudget] = None,
+    measure_size: bool = False,
+) -> int:
+    """
+    Run a git command downloading objects into an existing repository,
+    within the bandwidth budget.
+
+    Args:
+        transfer (Callable[[], Any]): The git command to run
+        repository_path (Path): The path of the repository
+        bandwidth (Optional[BandwidthBudget]): The budget shared by all git
+          transfers, if any
+        measure_size (bool): Whether to measure the growth of the
+          repository. Always measured with a bandwidth budget.
+
+    Returns:
+        int: The growth of the repository, in bytes, 0 if not measured
+    """
+    measure_size = measure_size or bandwidth is not None
+    size_before = get_repository_size(repository_path) if measure_size else 0
+
+    if bandwidth is not None:
+        with trace_span("bandwidth_admission", full_path=str(repository_path)):
+            bandwidth.acquire()
+
+    transfer()
+
+    if not measure_size:
+        return 0
+
+    size_growth = get_repository_size(repository_path) - size_before
+
+    if bandwidth is not None:
+        bandwidth.consume(size_growth)
+
+    return size_growth
+
+
+def checkout_element(
+    result: ElementResult,
+    *,
+    output: Path,
+    lfs_skip_smudge: bool = False,
+    bandwidth: Optional[BandwidthBudget] = None,
+    measure_size: bool = False,
+) -> ElementResult:
+    """
+    Check out the working tree of a project cloned by `handle_element`
+    without one.
+
+    Checking out downloads the blobs of partial clones, and Git LFS objects
+    unless skipped, which are charged to the bandwidth budget.
+
+    Args:
+        result (ElementResult): The outcome of cloning the project
+        output (Path): The target path the repositories are cloned to
+        lfs_skip_smudge (bool): Whether to check out Git LFS pointers instead
+          of downloading their objects
+        bandwidth (Optional[BandwidthBudget]): The budget shared by all git
+          transfers, if any
+        measure_size (bool): Whether to measure the growth of the repository
+
+    Returns:
+        ElementResult: The outcome of the project, including the checkout
+    """
+    start = time.perf_counter()
+    repository_path = output / result.full_path
+
+    with trace_span("checkout_repository", full_path=result.full_path):
+        size_growth = _transfer(
+            partial(
+                checkout_repository,
+                repository_path,
+                lfs_skip_smudge=lfs_skip_smudge,
+            ),
+            repository_path,
+            bandwidth=bandwidth,
+            measure_size=measure_size,
+        )
+
+    return result._replace(
+        duration=result.duration + time.perf_counter() - start,
+        bytes=result.bytes + size_growth,
+    )
+
+
+def pull_lfs_element(
+    result: ElementResult,
+    *,
+    output: Path,
+    logger: logging.Logger,
+    bandwidth: Optional[BandwidthBudget] = None,
+    measure_size: bool = False,
+) -> ElementResult:
+    """
+    Download the Git LFS objects of a project cloned by `handle_element`
+    without them.
+
+    Args:
+        result (ElementResult): The outcome of cloning the project
+        output (Path): The target path the repositories are cloned to
+        logger (Logger): the logger to use to generate logs
+        bandwidth (Optional[BandwidthBudget]): The budget shared by all git
+          transfers, if any
+        measure_size (bool): Whether to measure the growth of the repository
+
+    Returns:
+        ElementResult: The outcome of the project, including the download
+    """
+    start = time.perf_counter()
+    repository_path = output / result.full_path
+
+    with trace_span("pull_lfs_objects", full_path=result.full_path):
+        size_growth = _transfer(
+            partial(pull_lfs_objects, repository_path, logger),
+            repository_path,
+            bandwidth=bandwidth,
+            measure_size=measure_size,
+        )
+
+    return result._replace(
+        duration=result.duration + time.perf_counter() - start,
+        bytes=result.bytes + size_growth,
+    )
+
+
+def maintain_element(
+    result: ElementResult, *, output: Path, logger: logging.Logger
+) -> ElementResult:
+    """
+    Run maintenance tasks on a project that received new objects.
+
+    Args:
+        result (ElementResult): The outcome of fetching the project
+        output (Path): The target path the repositories are cloned to
+        logger (Logger): the logger to use to generate logs
+
+    Returns:
+        ElementResult: The outcome of the project, including the maintenance
+    """
+    start = time.perf_counter()
+
+    with trace_span("run_maintenance", full_path=result.full_path):
+        run_maintenance(output / result.full_path, logger)
+
+    return result._replace(
+        duration=result.duration + time.perf_counter() - start
+    )
+
+
+class SiphonTarget(NamedTuple):
+    """
+    Gitlab namespace to siphon, with the instance it belongs to and the path
+    to clone it to.
+
+    Attributes:
+        namespace (Path): The Gitlab namespace to recursively siphon, `/` for
+          the whole instance
+        output (Path): The target path to clone the repositories to
+        gitlab_token (str): The Personal Access Token for the Gitlab v4 API
+        gitlab_url (str): The URL of the Gitlab instance
+        gitlab_username (str): The username associated with the token, used
+          to clone through https
+        fetch_repositories (bool): Whether to fetch remotes on repositories
+          that already exist
+        save_ci_variables (bool): Whether to download CI/CD variables
+        clone_archived (bool): Whether to clone archived repositories
+        filters (ProjectFilters): The selection of projects
+        discovery (Discovery): The API to discover groups and projects with
+        clone_through_ssh (bool): Whether to clone through SSH or https
+        prune (PrunePolicy): What to do with local projects that are no
+          longer siphoned
+        inventory (bool): Whether to index discovered elements in the local
+          inventory
+        inventory_sizes (bool): Whether to request the repository size of
+          projects for the inventory, which makes listings heavier for the
+          Gitlab instance
+    """
+
+    namespace: Path
+    output: Path
+    gitlab_token: str
+    gitlab_url: str = "https://gitlab.com"
+    gitlab_username: str = ""
+    fetch_repositories: bool = True
+    save_ci_variables: bool = True
+    clone_archived: bool = False
+    filters: ProjectFilters = ProjectFilters()
+    discovery: Discovery = Discovery.rest
+    clone_through_ssh: bool = True
+    prune: PrunePolicy = PrunePolicy.report
+    inventory: bool = True
+    inventory_sizes: bool = False
+
+
+class _Output(NamedTuple):
+    """
+    State shared by the targets cloned to the same path.
+    """
+
+    path: Path
+    gitlab_url: str
+    projects_state: Dict[int, Path]
+    inventory: Optional[Inventory]
+    disk_space: Optional[DiskSpaceBudget]
+    discovered: Set[Tuple[str, int]]
+
+
+class _TargetRun(NamedTuple):
+    target: SiphonTarget
+    gl: Gitlab
+    prefetcher: Optional[PagePrefetcher]
+    output: _Output
+    discovered_project_ids: Set[int]
+
+
+def _check_target(
+    target: SiphonTarget, logger: logging.Logger
+) -> SiphonTarget:
+    if target.discovery == Discovery.graphql and (
+        target.filters.exclude_forks
+        or target.filters.min_access_level is not None
+    ):
+        raise BadParameter(
+            "Forks and access levels cannot be filtered with GraphQL discovery"
+        )
+
+    if (
+        target.prune == PrunePolicy.delete
+        and target.filters != ProjectFilters()
+    ):
+        # Filtered out projects would be taken for deleted ones
+        logger.warning("Projects are filtered, only reporting stale ones.")
+        return target._replace(prune=PrunePolicy.report)
+
+    return target
+
+
+def _get_outputs(
+    targets: List[SiphonTarget], *, disk_headroom: Optional[float]
+) -> Dict[Path, _Output]:
+    outputs: Dict[Path, _Output] = {}
+    disk_spaces: Dict[int, DiskSpaceBudget] = {}
+
+    for target in targets:
+        gitlab_url = target.gitlab_url.rstrip("/")
+        output = outputs.get(target.output)
+
+        if output is not None:
+            if output.gitlab_url != gitlab_url:
+                # Projects are known by their id, which is only unique within
+                # an instance
+                raise BadParameter(
+                    f"Targets cloned to {target.output} must be on the same "
+                    "Gitlab instance"
+                )
+
+            continue
+
+        disk_space = None
+
+        if disk_headroom is not None:
+            # Outputs on the same volume share its free space
+            disk_space = disk_spaces.setdefault(
+                get_device(target.output),
+                DiskSpaceBudget(target.output, headroom=disk_headroom),
+            )
+
+        outputs[target.output] = _Output(
+            path=target.output,
+            gitlab_url=gitlab_url,
+            projects_state=load_projects_state(target.output),
+            inventory=(
+                Inventory.open(target.output) if target.inventory else None
+            ),
+            disk_space=disk_space,
+            discovered=set(),
+        )
+
+    return outputs
+
+
+class Siphoner:
+    """
+    Engine siphoning Gitlab namespaces, from one or several instances, as a
+    stream of results.
+
+    A siphoner holds the options that apply to whole runs, and reuses the
+    Python Gitlab API instances of its targets, along with their pools of
+    connections, from one run to the next. Instances can also be given, such
+    as ones already used by the caller.
+
+    Targets on the same instance share its API instance. Every target is
+    discovered first, then all of their elements are handled by a single pool
+    of workers, in the order they were discovered, under the same
+    concurrency, bandwidth and disk space limits. Targets may be cloned to
+    the same path if they are on the same instance, in which case the
+    elements found by several of them are handled once.
+
+    Elements whose handling raised an error are yielded with the error,
+    unless `fail_fast` is set, in which case the error is raised.
+
+    Other arguments are the options of the `siphon` command that apply to
+    whole runs, with the same values.
+
+    Args:
+        gitlab_instances (Iterable[Gitlab]): Python Gitlab API instances to
+          siphon targets of their instance and token with
+        measure_bytes (bool): Whether to measure the growth of repositories
+          on disk, which walks their git directory before and after every
+          transfer. Always measured with a bandwidth limit or maintenance,
+          otherwise results have 0 bytes.
+        fail_fast (bool): Whether to stop runs on the first error
+        events (Optional[EventStream]): The stream to write the events of
+          runs to, if any
+        progress (bool): Whether to show a progress display
+        logger (Optional[Logger]): The logger to use to generate logs.
+          Defaults to the logger of the module.
+    """
+
+    def __init__(
+        self: "Siphoner",
+        *,
+        gitlab_instances: Iterable[Gitlab] = (),
+        prefetch_pages: int = 2,
+        ssh_multiplexing: bool = True,
+        jobs: str = "1",
+        checkout: bool = True,
+        sparse_checkout: Optional[List[str]] = None,
+        sparse_checkout_cone: bool = True,
+        partial_clone: bool = False,
+        checkout_jobs: int = 0,
+        lfs: LfsStrategy = LfsStrategy.clone,
+        lfs_jobs: int = 2,
+        maintenance: bool = False,
+        maintenance_jobs: int = 2,
+        disk_headroom: Optional[str] = None,
+        max_bandwidth: Optional[str] = None,
+        shard: Optional[str] = None,
+        record_api: Optional[Path] = None,
+        replay_api: Optional[Path] = None,
+        replay_latency: float = 0.0,
+        measure_bytes: bool = True,
+        fail_fast: bool = False,
+        events: Optional[EventStream] = None,
+        progress: bool = False,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        if record_api is not None and replay_api is not None:
+            raise BadParameter("Cannot both record and replay the Gitlab API")
+
+        self.prefetch_pages = prefetch_pages
+        self.ssh_multiplexing = ssh_multiplexing
+        self.jobs = parse_jobs(jobs)
+        self.checkout = checkout
+        self.sparse_checkout = (
+            SparseCheckout(
+                patterns=tuple(sparse_checkout), cone=sparse_checkout_cone
+            )
+            if sparse_checkout
+            else None
+        )
+        self.partial_clone = partial_clone
+        self.checkout_jobs = checkout_jobs
+        self.lfs = lfs
+        self.lfs_jobs = lfs_jobs
+        self.maintenance = maintenance
+        self.maintenance_jobs = maintenance_jobs
+        self.disk_headroom = (
+            parse_size(disk_headroom) if disk_headroom is not None else None
+        )
+        bandwidth_rate = parse_bandwidth(max_bandwidth)
+        self.bandwidth = (
+            BandwidthBudget(bandwidth_rate)
+            if bandwidth_rate is not None
+            else None
+        )
+        self.shard = parse_shard(shard)
+        self.record_api = record_api
+        self.replay_api = replay_api
+        self.replay_latency = replay_latency
+        # Bandwidth limits and maintenance depend on the growth
+        self.measure_bytes = (
+            measure_bytes or self.bandwidth is not None or maintenance
+        )
+        self.fail_fast = fail_fast
+        self.events = events
+        self.progress = progress
+        self.logger = logger or logging.getLogger(__name__)
+
+        # The report of the current, or last, run
+        self.report = RunReport()
+
+        self._instances: Dict[Tuple[str, str], Gitlab] = {}
+
+        for gl in gitlab_instances:
+            self._add_instance((gl.url, gl.private_token or ""), gl)
+
+    def _add_instance(
+        self: "Siphoner", key: Tuple[str, str], gl: Gitlab
+    ) -> None:
+        def _record_response(response: Any, *_: Any, **__: Any) -> None:
+            # Recorded in the report of the current run
+            self.report.api.record_response(response)
+
+        gl.session.hooks["response"].append(_record_response)
+
+        if self.record_api is not None:
+            ApiRecorder(self.record_api, private_token=key[1]).track(gl)
+
+        if self.replay_api is not None:
+            ApiReplayAdapter(
+                self.replay_api, latency=self.replay_latency
+            ).mount(gl)
+
+        self._instances[key] = gl
+
+    def get_instance(self: "Siphoner", target: SiphonTarget) -> Gitlab:
+        """
+        Get the Python Gitlab API instance of a target, creating it on its
+        first use.
+
+        Args:
+            target (SiphonTarget): The target
+
+        Returns:
+            Gitlab: The Python Gitlab API instance of its instance and token
+        """
+        key = (target.gitlab_url.rstrip("/"), target.gitlab_token)
+
+        if key not in self._instances:
+            self._add_instance(
+                key,
+                get_gitlab_instance(
+                    url=target.gitlab_url,
+                    private_token=target.gitlab_token,
+                    pool_size=max(
+                        AdaptiveConcurrency.from_jobs(self.jobs).maximum,
+                        self.prefetch_pages,
+                    ),
+                ),
+            )
+
+        return self._instances[key]
+
+    def run(
+        self: "Siphoner", targets: Iterable[SiphonTarget]
+    ) -> Generator[ElementResult, None, None]:
+        """
+        Siphon namespaces.
+
+        The results are yielded as soon as elements are done, while the next
+        ones are handled. Stopping the iteration early waits for the elements
+        in flight, and skips pruning.
+
+        Args:
+            targets (Iterable[SiphonTarget]): The namespaces to siphon
+
+        Raises:
+            BadParameter: Whether targets conflict
+
+        Yields:
+            ElementResult: The outcome of every handled element
+        """
+        checked_targets = [
+            _check_target(target, self.logger) for target in targets
+        ]
+        outputs = _get_outputs(
+            checked_targets, disk_headroom=self.disk_headroom
+        )
+        self.report = RunReport(
+            shards=[str(self.shard)] if self.shard is not None else []
+        )
+
+        try:
+            runs, flat_tree = self._discover(checked_targets, outputs)
+
+            yield from self._siphon(flat_tree)
+        except BaseException:
+            # Projects handled so far are still known to the next runs
+            for output in outputs.values():
+                save_projects_state(output.path, output.projects_state)
+
+            raise
+        finally:
+            for output in outputs.values():
+                if output.inventory is not None:
+                    output.inventory.close()
+
+        with self.report.phase("prune"):
+            for run in runs:
+                prune_projects(
+                    output=run.output.path,
+                    namespace=run.target.namespace,
+                    state=run.output.projects_state,
+                    discovered_ids=run.discovered_project_ids,
+                    policy=run.target.prune,
+                    logger=self.logger,
+                )
+
+            for output in outputs.values():
+                save_projects_state(output.path, output.projects_state)
+
+    async def run_async(
+        self: "Siphoner", targets: Iterable[SiphonTarget]
+    ) -> AsyncIterator[ElementResult]:
+        """
+        Siphon namespaces, from an event loop.
+
+        The run happens in a thread of the loop's default executor, and its
+        results are yielded as soon as elements are done, as with `run`.
+
+        Args:
+            targets (Iterable[SiphonTarget]): The namespaces to siphon
+
+        Raises:
+            BadParameter: Whether targets conflict
+
+        Yields:
+            ElementResult: The outcome of every handled element
+        """
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Tuple[Optional[ElementResult], Any]]" = (
+            asyncio.Queue()
+        )
+        stopped = threading.Event()
+
+        def _run() -> None:
+            results = self.run(targets)
+
+            try:
+                for result in results:
+                    loop.call_soon_threadsafe(queue.put_nowait, (result, None))
+
+                    if stopped.is_set():
+                        results.close()
+                        break
+            except BaseException as e:
+                loop.call_soon_threadsafe(queue.put_nowait, (None, e))
+            else:
+                loop.call_soon_threadsafe(queue.put_nowait, (None, None))
+
+        running = loop.run_in_executor(None, _run)
+
+        try:
+            while True:
+                result, error = await queue.get()
+
+                if result is not None:
+                    yield result
+                elif error is not None:
+                    raise error
+                else:
+                    return
+        finally:
+            stopped.set()
+            await running
+
+    def _discover(
+        self: "Siphoner",
+        targets: List[SiphonTarget],
+        outputs: Dict[Path, _Output],
+    ) -> Tuple[List[_TargetRun], Deque[Tuple[_TargetRun, GitlabElement]]]:
+        events = self.events
+        runs: List[_TargetRun] = []
+        flat_tree: Deque[Tuple[_TargetRun, GitlabElement]] = deque()
+        discovered = 0
+
+        with self.report.phase(
+            "discovery"
+        ), ExitStack() as prefetchers, Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description] {task.description}"),
+            transient=True,
+            console=Console(stderr=events is not None),
+            disable=not self.progress,
+        ) as progress:
+            flat_tree_task_id = progress.add_task(
+                description="Looking for stuff to siphon...", total=None
+            )
+
+            instance_prefetchers: Dict[int, Optional[PagePrefetcher]] = {}
+
+            for target in targets:
+                gl = self.get_instance(target)
+
+                if id(gl) not in instance_prefetchers:
+                    instance_prefetchers[id(gl)] = (
+                        prefetchers.enter_context(
+                            PagePrefetcher(gl, pages=self.prefetch_pages)
+                        )
+                        if self.prefetch_pages > 0
+                        else None
+                    )
+
+                runs.append(
+                    _TargetRun(
+                        target=target,
+                        gl=gl,
+                        prefetcher=instance_prefetchers[id(gl)],
+                        output=outputs[target.output],
+                        discovered_project_ids=set(),
+                    )
+                )
+
+            for run in runs:
+                target = run.target
+
+                with trace_span(
+                    "flatten_groups_tree", namespace=str(target.namespace)
+                ):
+                    groups = get_groups_from_path(
+                        target.namespace, run.gl, run.prefetcher
+                    )
+
+                    flatten = (
+                        flatten_groups_tree_graphql
+                        if target.discovery == Discovery.graphql
+                        else partial(
+                            flatten_groups_tree, prefetcher=run.prefetcher
+                        )
+                    )
+
+                    for element in flatten(
+                        groups=groups,
+                        gl=run.gl,
+                        archived=target.clone_archived,
+                        statistics=(
+                            self.disk_headroom is not None
+                            or self.bandwidth is not None
+                            or (target.inventory and target.inventory_sizes)
+                        ),
+                        filters=target.filters,
+                        inventory=run.output.inventory,
+                    ):
+                        if events is not None:
+                            events.emit(
+                                "discovered",
+                                type=element.type,
+                                id=element.id,
+                                full_path=element.full_path,
+                            )
+                        else:
+                            progress.update(
+                                flat_tree_task_id,
+                                advance=1,
+                                description=f"Found {discovered} elements...",
+                            )
+
+                        discovered += 1
+
+                        if element.type == "project":
+                            run.discovered_project_ids.add(element.id)
+
+                        if (element.type, element.id) in run.output.discovered:
+                            # Already found by another target of the output
+                            continue
+
+                        run.output.discovered.add((element.type, element.id))
+
+                        if is_element_in_shard(element, self.shard):
+                            flat_tree.append((run, element))
+
+                if run.output.inventory is not None:
+                    run.output.inventory.record_discovery(
+                        target.namespace, archived=target.clone_archived
+                    )
+
+                    if target.filters == ProjectFilters():
+                        # Filtered out projects would be taken for deleted ones
+                        run.output.inventory.forget_undiscovered(
+                            target.namespace
+                        )
+
+                    run.output.inventory.commit()
+
+        return runs, flat_tree
+
+    def _get_stages(self: "Siphoner") -> List[_Stage]:
+        stages: List[_Stage] = []
+
+        if self.checkout and self.checkout_jobs > 0:
+            stages.append(
+                _Stage(
+                    description="Checking out",
+                    handle=partial(
+                        checkout_element,
+                        lfs_skip_smudge=self.lfs != LfsStrategy.clone,
+                        bandwidth=self.bandwidth,
+                        measure_size=self.measure_bytes,
+                    ),
+                    jobs=self.checkout_jobs,
+                    applies=_is_cloned,
+                )
+            )
+
+        if self.checkout and self.lfs == LfsStrategy.deferred:
+            stages.append(
+                _Stage(
+                    description="Pulling LFS objects",
+                    handle=partial(
+                        pull_lfs_element,
+                        logger=self.logger,
+                        bandwidth=self.bandwidth,
+                        measure_size=self.measure_bytes,
+                    ),
+                    jobs=self.lfs_jobs,
+                    applies=_is_cloned,
+                )
+            )
+
+        if self.maintenance:
+            stages.append(
+                _Stage(
+                    description="Maintaining",
+                    handle=partial(maintain_element, logger=self.logger),
+                    jobs=self.maintenance_jobs,
+                    applies=_received_objects,
+                )
+            )
+
+        return stages
+
+    def _siphon(
+        self: "Siphoner", pending: Deque[Tuple[_TargetRun, GitlabElement]]
+    ) -> Iterator[ElementResult]:
+        events = self.events
+        concurrency = AdaptiveConcurrency.from_jobs(self.jobs)
+        stages = self._get_stages()
+        processed = 0
+
+        with self.report.phase("siphon"), _ssh_multiplexing(
+            enabled=self.ssh_multiplexing
+            and any(run.target.clone_through_ssh for run, _ in pending)
+        ), Progress(
+            SpinnerColumn(),
+            MofNCompleteColumn(),
+            BarColumn(),
+            TextColumn("[progress.description] {task.description}"),
+            transient=True,
+            console=Console(stderr=events is not None),
+            disable=not self.progress,
+        ) as progress:
+            clone_task_id = progress.add_task(
+                description="Cloning", total=len(pending)
+            )
+
+            if events is not None:
+                events.emit("discovery_finished", elements=len(pending))
+
+            stage_task_ids = [
+                progress.add_task(description=stage.description, total=None)
+                for stage in stages
+            ]
+
+            deferred: List[Tuple[_TargetRun, GitlabElement]] = []
+            in_flight: Dict[
+                "Future[ElementResult]", Tuple[_TargetRun, GitlabElement]
+            ] = {}
+            in_stages: Dict[
+                "Future[ElementResult]",
+                Tuple[_TargetRun, GitlabElement, int, ElementResult],
+            ] = {}
+
+            with ExitStack() as executors:
+                executor = executors.enter_context(
+                    ThreadPoolExecutor(max_workers=concurrency.maximum)
+                )
+                stage_executors = [
+                    executors.enter_context(
+                        ThreadPoolExecutor(max_workers=stage.jobs)
+                    )
+                    for stage in stages
+                ]
+
+                while True:
+                    while pending and len(in_flight) < concurrency.limit:
+                        run, element = pending.popleft()
+                        target, output = run.target, run.output
+
+                        has_space = (
+                            output.disk_space is None
+                            or element.type != "project"
+                            or (output.path / element.full_path).is_dir()
+                            or output.disk_space.reserve(
+                                (output.path, element.id),
+                                element.repository_size,
+                            )
+                        )
+
+                        if not has_space and output.disk_space is not None:
+                            if output.disk_space.reservations:
+                                # Retried once a clone in flight is done
+                                deferred.append((run, element))
+                                continue
+
+                            self.logger.warning(
+                                "Not enough disk space to clone "
+                                f"{element.full_path}"
+                            )
+
+                        element_type = get_gitlab_element_type(element)
+                        element_full_path = get_gitlab_element_full_path(
+                            element
+                        )
+
+                        if events is not None:
+                            events.emit(
+                                "element_started",
+                                type=element_type,
+                                full_path=str(element_full_path),
+                            )
+                        else:
+                            progress.update(
+                                clone_task_id,
+                                description=(
+                                    f"Handling {element_type} "
+                                    f"{element_full_path} "
+                                    f"({len(in_flight) + 1}/"
+                                    f"{concurrency.limit} jobs)"
+                                ),
+                            )
+
+                        if not has_space:
+                            future: "Future[ElementResult]" = Future()
+                            future.set_result(
+                                ElementResult(
+                                    type=element.type,
+                                    full_path=element.full_path,
+                                    action=RepositoryAction.out_of_space.value,
+                                )
+                            )
+                            in_flight[future] = (run, element)
+                            continue
+
+                        future = executor.submit(
+                            handle_element,
+                            element,
+                            output=output.path,
+                            gl=run.gl,
+                            gitlab_token=target.gitlab_token,
+                            gitlab_username=target.gitlab_username,
+                            fetch_repositories=target.fetch_repositories,
+                            save_ci_variables=target.save_ci_variables,
+                            clone_through_ssh=target.clone_through_ssh,
+                            logger=self.logger,
+                            previous_path=(
+                                output.projects_state.get(element.id)
+                                if element.type == "project"
+                                else None
+                            ),
+                            checkout=self.checkout and self.checkout_jobs <= 0,
+                            lfs_skip_smudge=self.lfs != LfsStrategy.clone,
+                            sparse_checkout=self.sparse_checkout,
+                            partial_clone=self.partial_clone,
+                            bandwidth=self.bandwidth,
+                            measure_size=self.measure_bytes,
+                        )
+                        in_flight[future] = (run, element)
+
+                    if not in_flight and not in_stages:
+                        break
+
+                    done, _ = wait(
+                        [*in_flight, *in_stages], return_when=FIRST_COMPLETED
+                    )
+
+                    for future in done:
+                        previous_result: Optional[ElementResult] = None
+
+                        if future in in_flight:
+                            run, finished = in_flight.pop(future)
+                            next_stage = 0
+                        else:
+                            run, finished, stage_index, previous_result = (
+                                in_stages.pop(future)
+                            )
+                            next_stage = stage_index + 1
+                            progress.advance(stage_task_ids[stage_index])
+
+                        output = run.output
+
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            if events is not None:
+                                events.emit(
+                                    "element_failed",
+                                    type=get_gitlab_element_type(finished),
+                                    full_path=str(
+                                        get_gitlab_element_full_path(finished)
+                                    ),
+                                    error=str(e),
+                                )
+
+                            if self.fail_fast:
+                                raise
+
+                            self.logger.warning(e, exc_info=True)
+
+                            result = (
+                                previous_result
+                                or ElementResult(
+                                    type=finished.type,
+                                    full_path=finished.full_path,
+                                    action=(
+                                        RepositoryAction.failed.value
+                                        if finished.type == "project"
+                                        else None
+                                    ),
+                                )
+                            )._replace(error=str(e))
+
+                        if (
+                            next_stage == 0
+                            and finished.type == "project"
+                            and result.action != RepositoryAction.out_of_space
+                        ):
+                            concurrency.record(
+                                failed=result.action
+                                == RepositoryAction.failed,
+                                bytes=(
+                                    result.bytes
+                                    if self.measure_bytes
+                                    else None
+                                ),
+                            )
+
+                        next_stage = next(
+                            (
+                                index
+                                for index in range(next_stage, len(stages))
+                                if result.error is None
+                                and stages[index].applies(result)
+                            ),
+                            len(stages),
+                        )
+
+                        if next_stage < len(stages):
+                            stage_future = stage_executors[next_stage].submit(
+                                stages[next_stage].handle,
+                                result,
+                                output=output.path,
+                            )
+                            in_stages[stage_future] = (
+                                run,
+                                finished,
+                                next_stage,
+                                result,
+                            )
+                            continue
+
+                        if events is not None:
+                            if result.error is None:
+                                events.emit(
+                                    "element_finished", **result._asdict()
+                                )
+                        else:
+                            progress.advance(clone_task_id)
+
+                        if finished.type == "project":
+                            output.projects_state[finished.id] = Path(
+                                result.full_path
+                            )
+
+                        if output.disk_space is not None:
+                            output.disk_space.release(
+                                (output.path, finished.id)
+                            )
+                            pending.extendleft(reversed(deferred))
+                            deferred.clear()
+
+                        if output.inventory is not None:
+                            output.inventory.record_result(finished.id, result)
+
+                        self.report.add_result(result)
+                        processed += 1
+
+                        yield result
+
+                    for stage_index, stage in enumerate(stages):
+                        queued = sum(
+                            index == stage_index
+                            for _, _, index, _ in in_stages.values()
+                        )
+                        progress.update(
+                            stage_task_ids[stage_index],
+                            description=(
+                                f"{stage.description} ({queued} queued, "
+                                f"{stage.jobs} jobs)"
+                            ),
+                        )
+
+            self.report.concurrency = concurrency.history
+
+            self.logger.info(f"Done cloning {processed} elements.")
+
+
+def siphon_targets(
+    targets: List[SiphonTarget],
+    *,
+    prefetch_pages: int = 2,
+    ssh_multiplexing: bool = True,
+    jobs: str = "1",
+    checkout: bool = True,
+    sparse_checkout: Optional[List[str]] = None,
+    sparse_checkout_cone: bool = True,
+    partial_clone: bool = False,
+    checkout_jobs: int = 0,
+    lfs: LfsStrategy = LfsStrategy.clone,
+    lfs_jobs: int = 2,
+    maintenance: bool = False,
+    maintenance_jobs: int = 2,
+    disk_headroom: Optional[str] = None,
+    max_bandwidth: Optional[str] = None,
+    shard: Optional[str] = None,
+    report: Optional[Path] = None,
+    prometheus_textfile: Optional[Path] = None,
+    output_format: OutputFormat = OutputFormat.rich,
+    record_api: Optional[Path] = None,
+    replay_api: Optional[Path] = None,
+    replay_latency: float = 0.0,
+    verbose: bool = False,
+) -> RunReport:
+    """
+    Siphon several Gitlab namespaces, from one or several instances, in a
+    single run, as the `siphon` command does.
+
+    The run is carried out by a `Siphoner`, and stops on the first error.
+    Other arguments are the options of the `siphon` command that apply to
+    the whole run.
+
+    Args:
+        targets (List[SiphonTarget]): The namespaces to siphon
+
+    Raises:
+        BadParameter: Whether options or targets conflict
+
+    Returns:
+        RunReport: The summary of the run
+    """
+    events = EventStream() if output_format == OutputFormat.jsonl else None
+
+    logger = _setup_logger(
+        __name__,
+        logging.INFO if verbose <= 0 else logging.DEBUG,
+        info_stream=stdout if events is None else stderr,
+    )
+
+    siphoner = Siphoner(
+        prefetch_pages=prefetch_pages,
+        ssh_multiplexing=ssh_multiplexing,
+        jobs=jobs,
+        checkout=checkout,
+        sparse_checkout=sparse_checkout,
+        sparse_checkout_cone=sparse_checkout_cone,
+        partial_clone=partial_clone,
+        checkout_jobs=checkout_jobs,
+        lfs=lfs,
+        lfs_jobs=lfs_jobs,
+        maintenance=maintenance,
+        maintenance_jobs=maintenance_jobs,
+        disk_headroom=disk_headroom,
+        max_bandwidth=max_bandwidth,
+        shard=shard,
+        record_api=record_api,
+        replay_api=replay_api,
+        replay_latency=replay_latency,
+        # Otherwise, only the inventory records growths, as 0 if unknown
+        measure_bytes=(
+            report is not None
+            or prometheus_textfile is not None
+            or events is not None
+        ),
+        fail_fast=True,
+        events=events,
+        progress=events is None,
+        logger=logger,
+    )
+
+    for _ in siphoner.run(targets):
+        pass
+
+    run_report = siphoner.report
+
+    if report is not None:
+        run_report.write(report)
+
+    if prometheus_textfile is not None:
+        run_report.write_prometheus(prometheus_textfile)
+
+    if events is not None:
+        events.emit(
+            "run_finished",
+            processed=run_report.processed,
+            phases=run_report.phases,
+        )
+
+    return run_report
+
+
+@profiled
+@callable_command
 def siphon(
     *,
     namespace: Path = Option(
@@ -81,10 +1430,71 @@ def siphon(
         False,
         help="Whether to clone archived repository.",
     ),
+    include: Optional[List[str]] = Option(
+        None,
+        help=(
+            "A glob, or a regular expression prefixed by `re:`, of the "
+            "project paths to siphon. Can be repeated."
+        ),
+    ),
+    exclude: Optional[List[str]] = Option(
+        None,
+        help=(
+            "A glob, or a regular expression prefixed by `re:`, of the group "
+            "and project paths not to siphon. Can be repeated."
+        ),
+    ),
+    topic: Optional[List[str]] = Option(
+        None,
+        help="A topic projects must have. Can be repeated.",
+    ),
+    visibility: Optional[Visibility] = Option(
+        None,
+        help="The visibility of the projects to siphon.",
+    ),
+    min_access_level: Optional[AccessLevel] = Option(
+        None,
+        help="The minimal role of the user on the projects to siphon.",
+    ),
+    last_activity_after: Optional[datetime] = Option(
+        None,
+        help="The date after which projects must have activity.",
+    ),
+    exclude_forks: bool = Option(
+        False,
+        help="Whether to exclude forks.",
+    ),
+    exclude_empty: bool = Option(
+        False,
+        help="Whether to exclude empty repositories.",
+    ),
+    discovery: Discovery = Option(
+        Discovery.rest,
+        help=(
+            "The API to discover groups and projects with: `rest` walks "
+            "groups one by one, `graphql` lists the descendant groups and "
+            "projects of every group in a few paginated queries."
+        ),
+    ),
+    prefetch_pages: int = Option(
+        2,
+        help=(
+            "The number of pages of REST listings to request ahead during "
+            "discovery, while the current one is processed. With 0, pages "
+            "are requested one at a time."
+        ),
+    ),
     clone_through_ssh: Optional[bool] = Option(
         True,
         help="Whether to clone repositories through SSH (Default) or https.",
     ),
+    ssh_multiplexing: Optional[bool] = Option(
+        True,
+        help=(
+            "Whether to share one SSH connection per host between all clones "
+            "and fetches, when cloning through SSH."
+        ),
+    ),
     gitlab_username: Optional[str] = Option(
         "",
         help=(
@@ -93,6 +1503,170 @@ def siphon(
         ),
         envvar="GITLAB_USERNAME",
     ),
+    jobs: str = Option(
+        "1",
+        help=(
+            "The number of projects to handle concurrently, or `auto` to "
+            "tune it from the throughput and error rate of clones and "
+            "fetches."
+        ),
+    ),
+    checkout: bool = Option(
+        True,
+        help=(
+            "Whether to check out working trees, or to only clone git "
+            "objects, e.g. for `git grep`."
+        ),
+    ),
+    sparse_checkout: Optional[List[str]] = Option(
+        None,
+        help=(
+            "A sparse-checkout pattern, restricting the checked out files. "
+            "Can be repeated."
+        ),
+    ),
+    sparse_checkout_cone: bool = Option(
+        True,
+        help=(
+            "Whether sparse-checkout patterns are directories (cone mode), "
+            "or gitignore-like patterns."
+        ),
+    ),
+    partial_clone: bool = Option(
+        False,
+        help=(
+            "Whether to clone without file contents, which are downloaded "
+            "on demand, only for the checked out files."
+        ),
+    ),
+    checkout_jobs: int = Option(
+        0,
+        help=(
+            "The number of working trees to check out concurrently, in a "
+            "separate stage once objects are cloned. With 0, working trees "
+            "are checked out by the clones themselves."
+        ),
+    ),
+    lfs: LfsStrategy = Option(
+        LfsStrategy.clone,
+        help=(
+            "How to download Git LFS objects: during clones, in a separate "
+            "stage once repositories are cloned, or not at all."
+        ),
+    ),
+    lfs_jobs: int = Option(
+        2,
+        help="The number of repositories to download LFS objects of at once.",
+    ),
+    maintenance: bool = Option(
+        False,
+        help=(
+            "Whether to repack and write the commit-graph of repositories "
+            "that received new objects, once fetched."
+        ),
+    ),
+    maintenance_jobs: int = Option(
+        2,
+        help="The number of repositories to run maintenance on at once.",
+    ),
+    disk_headroom: Optional[str] = Option(
+        None,
+        help=(
+            "The free space to keep on the output volume, with an optional "
+            "K, M, G or T suffix. Clones that would not fit are deferred, or "
+            "skipped."
+        ),
+    ),
+    max_bandwidth: Optional[str] = Option(
+        None,
+        help=(
+            "The total bandwidth of clones and fetches, in bytes per second, "
+            "with an optional K, M or G suffix."
+        ),
+    ),
+    shard: Optional[str] = Option(
+        None,
+        help=(
+            "Only handle the elements of a given shard, as `index/count`, to "
+            "split a siphon across several nodes."
+        ),
+    ),
+    report: Optional[Path] = Option(
+        None,
+        help="The path to write a JSON run report to.",
+    ),
+    prometheus_textfile: Optional[Path] = Option(
+        None,
+        help=(
+            "The path to write the run's metrics to, in the Prometheus text "
+            "format."
+        ),
+    ),
+    prune: PrunePolicy = Option(
+        PrunePolicy.report,
+        help=(
+            "What to do with local projects that were deleted, archived or "
+            "moved out of the namespace upstream."
+        ),
+    ),
+    inventory: bool = Option(
+        True,
+        help=(
+            "Whether to index the metadata of discovered projects, and the "
+            "outcome of their sync, in a local SQLite inventory queried by "
+            "`giphon ls` and `giphon query`."
+        ),
+    ),
+    inventory_sizes: bool = Option(
+        False,
+        help=(
+            "Whether to request the repository size of projects for the "
+            "inventory, which makes listings heavier for the Gitlab instance."
+        ),
+    ),
+    output_format: OutputFormat = Option(
+        OutputFormat.rich,
+        help=(
+            "How to report progress: a progress display, or one JSON event "
+            "per line on stdout for headless runs (logs then go to stderr)."
+        ),
+    ),
+    record_api: Optional[Path] = Option(
+        None,
+        help=(
+            "The directory to record the Gitlab API requests and responses "
+            "to, with the token redacted."
+        ),
+    ),
+    replay_api: Optional[Path] = Option(
+        None,
+        help=(
+            "The directory to replay recorded Gitlab API responses from, "
+            "instead of calling the API."
+        ),
+    ),
+    replay_latency: float = Option(
+        0.0,
+        help="The delay added to every replayed API response, in seconds.",
+    ),
+    profile: Optional[Path] = Option(
+        None,
+        help="The path to write a profile of the run to.",
+    ),
+    profiler: Profiler = Option(
+        Profiler.cprofile,
+        help=(
+            "The profiler to use: cProfile, writing a pstats file, or the "
+            "pyinstrument sampling profiler, writing an HTML report."
+        ),
+    ),
+    trace: Optional[Path] = Option(
+        None,
+        help=(
+            "The path to write a Chrome trace-event file of discovery, "
+            "clones and CI/CD variables downloads to."
+        ),
+    ),
     verbose: bool = Option(
         False,
         "--verbose",
@@ -107,97 +1681,54 @@ def siphon(
     copy locally all of the project's repositories and their environment
     variables, while keeping the arborescence.
     """
-    logger = _setup_logger(
-        __name__, logging.INFO if verbose <= 0 else logging.DEBUG
-    )
-
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description] {task.description}"),
-        transient=True,
-    ) as progress:
-        flat_tree_task_id = progress.add_task(
-            description="Looking for stuff to siphon...", total=None
-        )
-
-        gl = get_gitlab_instance(url=gitlab_url, private_token=gitlab_token)
-
-        groups = get_groups_from_path(namespace, gl)
-
-        flat_tree = []
-
-        for index, element in enumerate(
-            flatten_groups_tree(
-                groups=groups, gl=gl, archived=bool(clone_archived)
-            )
-        ):
-            progress.update(
-                flat_tree_task_id,
-                advance=1,
-                description=f"Found {index} elements...",
-            )
-            flat_tree.append(element)
-
-    with Progress(
-        SpinnerColumn(),
-        MofNCompleteColumn(),
-        BarColumn(),
-        TextColumn("[progress.description] {task.description}"),
-        transient=True,
-    ) as progress:
-        clone_task_id = progress.add_task(description="Cloning")
-
-        processed = 0
-
-        for element in progress.track(flat_tree, task_id=clone_task_id):
-            element_type = get_gitlab_element_type(element)
-            element_full_path = get_gitlab_element_full_path(element)
-
-            progress.update(
-                clone_task_id,
-                description=(f"Handling {element_type} {element_full_path}"),
+    siphon_targets(
+        [
+            SiphonTarget(
+                namespace=namespace,
+                output=output,
+                gitlab_token=gitlab_token,
+                gitlab_url=gitlab_url,
+                gitlab_username=gitlab_username or "",
+                fetch_repositories=bool(fetch_repositories),
+                save_ci_variables=bool(save_ci_variables),
+                clone_archived=bool(clone_archived),
+                filters=ProjectFilters(
+                    include=tuple(include or ()),
+                    exclude=tuple(exclude or ()),
+                    topics=tuple(topic or ()),
+                    visibility=visibility,
+                    min_access_level=min_access_level,
+                    last_activity_after=last_activity_after,
+                    exclude_forks=exclude_forks,
+                    exclude_empty=exclude_empty,
+                ),
+                discovery=discovery,
+                clone_through_ssh=bool(clone_through_ssh),
+                prune=prune,
+                inventory=inventory,
+                inventory_sizes=inventory_sizes,
             )
-
-            if isinstance(element, Project):
-                if clone_through_ssh:
-                    url_to_repo = element.ssh_url_to_repo
-                elif not clone_through_ssh and gitlab_username:
-                    parsed_url_to_repo = urlparse(element.http_url_to_repo)
-
-                    unauthenticated_domain = parsed_url_to_repo.netloc.split(
-                        "@"
-                    )[-1]
-
-                    authenticated_domain = (
-                        f"{gitlab_username}:{gitlab_token}"
-                        f"@{unauthenticated_domain}"
-                    )
-
-                    unparsed_url_args = (
-                        parsed_url_to_repo[0],
-                        authenticated_domain
-                        if gitlab_username != ""
-                        else unauthenticated_domain,
-                        parsed_url_to_repo[2],
-                        parsed_url_to_repo[3],
-                        parsed_url_to_repo[4],
-                        parsed_url_to_repo[5],
-                    )
-
-                    url_to_repo = urlunparse(unparsed_url_args)
-                else:
-                    url_to_repo = element.http_url_to_repo
-
-                handle_project(
-                    repository_path=output / Path(element.path_with_namespace),
-                    repository_url=url_to_repo,
-                    fetch=bool(fetch_repositories),
-                    logger=logger,
-                )
-
-            if save_ci_variables:
-                save_environment_variables(output, element, logger)
-
-            processed += 1
-
-        logger.info(f"Done cloning {processed} elements.")
+        ],
+        prefetch_pages=prefetch_pages,
+        ssh_multiplexing=bool(ssh_multiplexing),
+        jobs=jobs,
+        checkout=checkout,
+        sparse_checkout=sparse_checkout,
+        sparse_checkout_cone=sparse_checkout_cone,
+        partial_clone=partial_clone,
+        checkout_jobs=checkout_jobs,
+        lfs=lfs,
+        lfs_jobs=lfs_jobs,
+        maintenance=maintenance,
+        maintenance_jobs=maintenance_jobs,
+        disk_headroom=disk_headroom,
+        max_bandwidth=max_bandwidth,
+        shard=shard,
+        report=report,
+        prometheus_textfile=prometheus_textfile,
+        output_format=output_format,
+        record_api=record_api,
+        replay_api=replay_api,
+        replay_latency=replay_latency,
+        verbose=verbose,
+    )
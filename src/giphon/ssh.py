@@ -0,0 +1,126 @@
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import git
+
+SSH_CONTROL_PERSIST = 60
+
+# Masters are shared by all runs of the process, until the last one is done
+_lock = threading.Lock()
+_control_directory: Optional[str] = None
+_previous_ssh_command: Optional[str] = None
+_users = 0
+
+
+@contextmanager
+def ssh_multiplexing(*, enabled: bool = True) -> Iterator[Optional[str]]:
+    """
+    Share a single SSH connection per host between all git operations.
+
+    A `ControlMaster` is started by the first connection to a host, and is
+    reused by the following ones through `GIT_SSH_COMMAND`, saving an SSH
+    handshake per clone or fetch. The options are added to the command git
+    would otherwise use, from `GIT_SSH_COMMAND` or the `core.sshCommand`
+    setting, so that custom keys or proxies are kept.
+
+    Nested and concurrent calls, such as overlapping runs in several
+    threads, reuse the same masters, which are stopped when the last of them
+    exits.
+
+    Args:
+        enabled (bool): Whether to multiplex connections
+
+    Yields:
+        Optional[str]: The directory of the control sockets, None if
+          connections are not multiplexed
+    """
+    global _control_directory, _previous_ssh_command, _users
+
+    if not enabled or os.name == "nt":
+        yield None
+        return
+
+    with _lock:
+        if _users == 0 and (
+            "GIT_SSH" not in os.environ or "GIT_SSH_COMMAND" in os.environ
+        ):
+            _control_directory = tempfile.mkdtemp(prefix="giphon-ssh-")
+            _previous_ssh_command = os.environ.get("GIT_SSH_COMMAND")
+
+            os.environ["GIT_SSH_COMMAND"] = " ".join(
+                [
+                    _previous_ssh_command
+                    or _get_configured_ssh_command(_control_directory)
+                    or "ssh",
+                    "-o ControlMaster=auto",
+                    "-o "
+                    + shlex.quote(
+                        "ControlPath=" + os.path.join(_control_directory, "%C")
+                    ),
+                    f"-o ControlPersist={SSH_CONTROL_PERSIST}",
+                ]
+            )
+
+        control_directory = _control_directory
+
+        if control_directory is not None:
+            _users += 1
+
+    try:
+        yield control_directory
+    finally:
+        if control_directory is not None:
+            with _lock:
+                _users -= 1
+
+                if _users == 0:
+                    _stop_multiplexing(control_directory)
+
+
+def _get_configured_ssh_command(directory: str) -> Optional[str]:
+    # Read from outside any repository, as the setting of the system or user
+    try:
+        return (
+            str(git.Git(directory).config("--get", "core.sshCommand")).strip()
+            or None
+        )
+    except git.GitCommandError:
+        return None
+
+
+def _stop_multiplexing(control_directory: str) -> None:
+    global _control_directory
+
+    _control_directory = None
+
+    if _previous_ssh_command is None:
+        del os.environ["GIT_SSH_COMMAND"]
+    else:
+        os.environ["GIT_SSH_COMMAND"] = _previous_ssh_command
+
+    _stop_masters(control_directory)
+    shutil.rmtree(control_directory, ignore_errors=True)
+
+
+def _stop_masters(control_directory: str) -> None:
+    for socket in os.listdir(control_directory):
+        subprocess.run(
+            [
+                "ssh",
+                "-o",
+                f"ControlPath={os.path.join(control_directory, socket)}",
+                "-O",
+                "exit",
+                "giphon",
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+from enum import Enum
+from logging import Logger
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+PROJECTS_STATE_PATH = Path(".giphon/projects.json")
+
+
+class PrunePolicy(str, Enum):
+    """
+    What to do with local projects that are no longer siphoned.
+    """
+
+    off = "off"
+    report = "report"
+    delete = "delete"
+
+
+def load_projects_state(output: Path) -> Dict[int, Path]:
+    """
+    Load the local path of every project siphoned by previous runs.
+
+    Args:
+        output (Path): The target path the repositories are cloned to
+
+    Returns:
+        Dict[int, Path]: The path of each project relative to `output`, by
+          project id
+    """
+    try:
+        with open(output / PROJECTS_STATE_PATH) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+
+    return {int(id): Path(path) for id, path in state.items()}
+
+
+def save_projects_state(output: Path, state: Dict[int, Path]) -> None:
+    """
+    Save the local path of every siphoned project, for the next runs.
+
+    Args:
+        output (Path): The target path the repositories are cloned to
+        state (Dict[int, Path]): The path of each project relative to
+          `output`, by project id
+    """
+    state_path = output / PROJECTS_STATE_PATH
+    temporary_path = state_path.with_suffix(".tmp")
+
+    os.makedirs(state_path.parent, exist_ok=True)
+
+    with open(temporary_path, "w") as f:
+        json.dump(
+            {str(id): str(path) for id, path in sorted(state.items())},
+            f,
+            indent=2,
+        )
+
+    os.replace(temporary_path, state_path)
+
+
+def prune_projects(
+    *,
+    output: Path,
+    namespace: Path,
+    state: Dict[int, Path],
+    discovered_ids: Iterable[int],
+    policy: PrunePolicy,
+    logger: Logger,
+) -> List[Path]:
+    """
+    Handle the local projects of a namespace that were not discovered.
+
+    Such projects were deleted, archived or moved out of the namespace
+    upstream. Depending on `policy`, they are ignored, reported, or deleted
+    locally and forgotten from `state`.
+
+    Args:
+        output (Path): The target path the repositories are cloned to
+        namespace (Path): The siphoned namespace
+        state (Dict[int, Path]): The path of each known project, by id
+        discovered_ids (Iterable[int]): The ids of the discovered projects
+        policy (PrunePolicy): What to do with the undiscovered projects
+        logger (Logger): the logger to use to generate logs
+
+    Returns:
+        List[Path]: The paths of the undiscovered projects
+    """
+    if policy == PrunePolicy.off:
+        return []
+
+    namespace_parts = Path(str(namespace).strip("/")).parts
+    discovered = set(discovered_ids)
+
+    missing = {
+        id: path
+        for id, path in state.items()
+        if id not in discovered
+        and path.parts[: len(namespace_parts)] == namespace_parts
+    }
+
+    for id, path in sorted(missing.items(), key=lambda item: item[1]):
+        if policy == PrunePolicy.delete:
+            logger.warning(f"Pruning {path}, which is no longer siphoned.")
+
+            shutil.rmtree(output / path, ignore_errors=True)
+            del state[id]
+        else:
+            logger.warning(f"Project {path} is no longer siphoned.")
+
+    return sorted(missing.values())
@@ -0,0 +1,463 @@
+import hmac
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from queue import Empty, Queue
+from threading import Event, Thread
+from typing import Any, Dict, Optional
+
+from gitlab import Gitlab
+from typer import Option
+
+from .commands import callable_command
+from .gitlab import (
+    GitlabElement,
+    get_gitlab_instance,
+    get_recently_active_projects,
+)
+from .siphon import (
+    SiphonTarget,
+    _setup_logger,
+    handle_element,
+    siphon_targets,
+)
+from .ssh import ssh_multiplexing
+from .state import load_projects_state, save_projects_state
+
+PUSH_EVENT_KINDS = ("push", "tag_push")
+
+# Gitlab refreshes the last activity date of a project at most this often
+ACTIVITY_REFRESH_INTERVAL = timedelta(hours=1)
+
+# The longest delay between failed iterations, unless polls are rarer
+MAX_RETRY_DELAY = 3600.0
+
+
+class Watcher:
+    """
+    Keep a siphoned namespace up to date.
+
+    Projects that recently received pushes are fetched as soon as they are
+    either found by polling the API or reported by a webhook, while periodic
+    full siphons catch anything that was missed.
+    """
+
+    def __init__(
+        self: "Watcher",
+        *,
+        gl: Gitlab,
+        namespace: Path,
+        output: Path,
+        gitlab_token: str,
+        gitlab_url: str,
+        gitlab_username: str,
+        save_ci_variables: bool,
+        clone_archived: bool,
+        clone_through_ssh: bool,
+        poll_interval: float,
+        reconciliation_interval: float,
+        verbose: bool,
+        logger: logging.Logger,
+    ) -> None:
+        self.gl = gl
+        self.namespace = namespace
+        self.output = output
+        self.gitlab_token = gitlab_token
+        self.gitlab_url = gitlab_url
+        self.gitlab_username = gitlab_username
+        self.save_ci_variables = save_ci_variables
+        self.clone_archived = clone_archived
+        self.clone_through_ssh = clone_through_ssh
+        self.poll_interval = poll_interval
+        self.reconciliation_interval = reconciliation_interval
+        self.verbose = verbose
+        self.logger = logger
+
+        # The local path of every project, kept up to date with full siphons
+        self.projects_state = load_projects_state(output)
+
+        self.pushed: "Queue[GitlabElement]" = Queue()
+        self.woken = Event()
+
+        self._last_reconciliation: Optional[float] = None
+        self._last_poll: Optional[float] = None
+        self._active_since = datetime.now(timezone.utc)
+
+    def reconcile(self: "Watcher") -> None:
+        """
+        Run a full siphon of the namespace.
+        """
+        active_since = datetime.now(timezone.utc)
+        started = time.monotonic()
+
+        siphon_targets(
+            [
+                SiphonTarget(
+                    namespace=self.namespace,
+                    output=self.output,
+                    gitlab_token=self.gitlab_token,
+                    gitlab_url=self.gitlab_url,
+                    gitlab_username=self.gitlab_username,
+                    save_ci_variables=self.save_ci_variables,
+                    clone_archived=self.clone_archived,
+                    clone_through_ssh=self.clone_through_ssh,
+                )
+            ],
+            verbose=self.verbose,
+        )
+
+        # Only once done, so that a failed siphon is run again
+        self._active_since = active_since
+        self._last_reconciliation = started
+
+        self.projects_state = load_projects_state(self.output)
+
+    def poll(self: "Watcher") -> Dict[int, GitlabElement]:
+        """
+        Get the projects with activity since the previous poll.
+
+        Gitlab only refreshes the last activity date of a project once in a
+        while, so a push to a project that was already active shortly before
+        does not move it. Every poll thus also covers that refresh interval
+        before the previous one, and projects active in it are fetched again,
+        which is a no-op for those that did not change.
+
+        Returns:
+            Dict[int, GitlabElement]: The active projects, by id
+        """
+        polled_at = datetime.now(timezone.utc)
+        self._last_poll = time.monotonic()
+
+        projects = {
+            project.id: project
+            for project in get_recently_active_projects(
+                namespace=self.namespace,
+                gl=self.gl,
+                since=self._active_since - ACTIVITY_REFRESH_INTERVAL,
+                archived=self.clone_archived,
+            )
+        }
+
+        self._active_since = polled_at
+
+        return projects
+
+    def run_once(self: "Watcher") -> int:
+        """
+        Run a single iteration: either a full siphon when one is due, or a
+        fetch of the projects that received pushes.
+
+        Returns:
+            int: The number of projects fetched, -1 on a full siphon
+        """
+        now = time.monotonic()
+
+        if (
+            self._last_reconciliation is None
+            or now - self._last_reconciliation >= self.reconciliation_interval
+        ):
+            self.reconcile()
+
+            return -1
+
+        projects: Dict[int, GitlabElement] = {}
+
+        if (
+            self._last_poll is None
+            or now - self._last_poll >= self.poll_interval
+        ):
+            projects.update(self.poll())
+
+        while True:
+            try:
+                project = self.pushed.get_nowait()
+            except Empty:
+                break
+
+            projects[project.id] = project
+
+        fetched = 0
+
+        for project in projects.values():
+            self.logger.debug(f"Fetching pushed project {project.full_path}")
+
+            try:
+                result = handle_element(
+                    project,
+                    output=self.output,
+                    gl=self.gl,
+                    gitlab_token=self.gitlab_token,
+                    gitlab_username=self.gitlab_username,
+                    fetch_repositories=True,
+                    save_ci_variables=self.save_ci_variables,
+                    clone_through_ssh=self.clone_through_ssh,
+                    logger=self.logger,
+                    # Renamed projects are moved, rather than cloned again
+                    previous_path=self.projects_state.get(project.id),
+                )
+            except Exception as e:
+                # Caught up with by the next full siphon
+                self.logger.warning(
+                    f"Cannot fetch {project.full_path}: {e}", exc_info=True
+                )
+                continue
+
+            self.projects_state[project.id] = Path(result.full_path)
+            fetched += 1
+
+        if fetched:
+            save_projects_state(self.output, self.projects_state)
+
+        if projects:
+            self.logger.info(f"Done fetching {len(projects)} projects.")
+
+        return len(projects)
+
+    def run(self: "Watcher") -> None:
+        """
+        Run iterations forever, waking up early when a webhook is received.
+
+        Failed iterations are logged and run again after a delay doubling
+        with every consecutive failure, during which webhooks are queued.
+        """
+        failures = 0
+
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                failures += 1
+
+                delay = min(
+                    self.poll_interval * 2**failures,
+                    max(self.poll_interval, MAX_RETRY_DELAY),
+                )
+                self.logger.warning(
+                    f"Watch iteration failed, retrying in {delay:.0f}s: {e}",
+                    exc_info=True,
+                )
+                time.sleep(delay)
+
+                continue
+
+            failures = 0
+
+            self.woken.wait(timeout=self.poll_interval)
+            self.woken.clear()
+
+    def notify_push(self: "Watcher", project: GitlabElement) -> None:
+        """
+        Schedule a pushed project for fetching, if it belongs to the watched
+        namespace.
+
+        Args:
+            project (GitlabElement): The pushed project
+        """
+        namespace_parts = Path(str(self.namespace).strip("/")).parts
+        project_parts = Path(project.full_path).parts
+
+        if project_parts[: len(namespace_parts)] != namespace_parts:
+            return
+
+        self.pushed.put(project)
+        self.woken.set()
+
+
+def parse_push_event(payload: Dict[str, Any]) -> Optional[GitlabElement]:
+    """
+    Get the pushed project from a Gitlab webhook payload.
+
+    Args:
+        payload (Dict[str, Any]): The JSON payload of the webhook
+
+    Returns:
+        Optional[GitlabElement]: The pushed project, or None if the payload
+          is not a push event
+    """
+    if payload.get("object_kind") not in PUSH_EVENT_KINDS:
+        return None
+
+    project = payload["project"]
+
+    return GitlabElement(
+        id=payload["project_id"],
+        type="project",
+        name=project["name"],
+        full_path=project["path_with_namespace"],
+        ssh_url_to_repo=project["git_ssh_url"],
+        http_url_to_repo=project["git_http_url"],
+    )
+
+
+class _WebhookServer(ThreadingHTTPServer):
+    watcher: Watcher
+    secret: str
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    server: _WebhookServer
+
+    def do_POST(self: "_WebhookHandler") -> None:
+        secret = self.server.secret
+
+        if secret and not hmac.compare_digest(
+            self.headers.get("X-Gitlab-Token", "").encode(), secret.encode()
+        ):
+            self.send_response(403)
+            self.end_headers()
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+
+        try:
+            project = parse_push_event(json.loads(self.rfile.read(length)))
+        except (ValueError, KeyError, AttributeError):
+            self.send_response(400)
+            self.end_headers()
+            return
+
+        if project is not None:
+            self.server.watcher.notify_push(project)
+
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self: "_WebhookHandler", format: str, *args: Any) -> None:
+        self.server.watcher.logger.debug(format % args)
+
+
+def start_webhook_server(
+    watcher: Watcher, *, address: str, port: int, secret: str
+) -> _WebhookServer:
+    """
+    Start a background HTTP server receiving Gitlab push webhooks.
+
+    Args:
+        watcher (Watcher): The watcher to notify of pushed projects
+        address (str): The address to listen on
+        port (int): The port to listen on
+        secret (str): The secret token expected from Gitlab, if any
+
+    Returns:
+        _WebhookServer: The running server
+    """
+    server = _WebhookServer((address, port), _WebhookHandler)
+    server.watcher = watcher
+    server.secret = secret
+
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+@callable_command
+def watch(
+    *,
+    namespace: Path = Option(
+        ...,
+        help=(
+            "The Gitlab namespace to recusively siphon. "
+            "Use `/` to siphon the instance."
+        ),
+    ),
+    output: Path = Option(
+        ...,
+        help="The target path to clone the repositories to.",
+    ),
+    gitlab_token: str = Option(
+        ...,
+        help="The Personal Access Token for the Gitlab v4 API.",
+        envvar="GITLAB_TOKEN",
+    ),
+    gitlab_url: str = Option(
+        "https://gitlab.com",
+        help="The URL for the Gitlab Instance.",
+        envvar="GITLAB_URL",
+    ),
+    save_ci_variables: Optional[bool] = Option(
+        True,
+        help="Whether to download CI/CD variables to a .env directory.",
+    ),
+    clone_archived: Optional[bool] = Option(
+        False,
+        help="Whether to clone archived repository.",
+    ),
+    clone_through_ssh: Optional[bool] = Option(
+        True,
+        help="Whether to clone repositories through SSH (Default) or https.",
+    ),
+    gitlab_username: Optional[str] = Option(
+        "",
+        help=(
+            "The Username associated with the Access Token. Used for cloning"
+            "through https."
+        ),
+        envvar="GITLAB_USERNAME",
+    ),
+    poll_interval: float = Option(
+        60,
+        help="The number of seconds between polls for active projects.",
+    ),
+    reconciliation_interval: float = Option(
+        86400,
+        help="The number of seconds between full siphons.",
+    ),
+    webhook_port: Optional[int] = Option(
+        None,
+        help="The port to receive Gitlab push webhooks on, if any.",
+    ),
+    webhook_address: str = Option(
+        "127.0.0.1",
+        help="The address to receive Gitlab push webhooks on.",
+    ),
+    webhook_secret: str = Option(
+        "",
+        help="The secret token Gitlab webhooks are configured with.",
+        envvar="GITLAB_WEBHOOK_SECRET",
+    ),
+    verbose: bool = Option(
+        False,
+        "--verbose",
+        "-v",
+        help=("The level of verbosity."),
+    ),
+) -> None:
+    """
+    Continuously siphon a Gitlab instance or group.
+
+    After a first full siphon, projects are fetched as soon as they receive
+    pushes, while full siphons periodically catch anything that was missed.
+    """
+    logger = _setup_logger(
+        __name__, logging.INFO if verbose <= 0 else logging.DEBUG
+    )
+
+    watcher = Watcher(
+        gl=get_gitlab_instance(url=gitlab_url, private_token=gitlab_token),
+        namespace=namespace,
+        output=output,
+        gitlab_token=gitlab_token,
+        gitlab_url=gitlab_url,
+        gitlab_username=gitlab_username or "",
+        save_ci_variables=bool(save_ci_variables),
+        clone_archived=bool(clone_archived),
+        clone_through_ssh=bool(clone_through_ssh),
+        poll_interval=poll_interval,
+        reconciliation_interval=reconciliation_interval,
+        verbose=verbose,
+        logger=logger,
+    )
+
+    if webhook_port is not None:
+        start_webhook_server(
+            watcher,
+            address=webhook_address,
+            port=webhook_port,
+            secret=webhook_secret,
+        )
+
+    with ssh_multiplexing(enabled=bool(clone_through_ssh)):
+        watcher.run()
@@ -0,0 +1,591 @@
+"""
+Local stand-in for a Gitlab instance, serving the subset of the v4 and
+GraphQL APIs used by giphon and real git repositories through `file://` URLs.
+
+It enables running whole siphons, clones included, offline.
+"""
+
+import json
+import math
+import os
+import subprocess
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+
+from .utils import (
+    DEFAULT_PER_PAGE,
+    SyntheticGitlab,
+    SyntheticGroup,
+    SyntheticProject,
+)
+
+MAX_PER_PAGE = 100
+RATE_LIMIT_WINDOW = 60
+
+GIT_ENVIRONMENT = {
+    "GIT_AUTHOR_NAME": "giphon",
+    "GIT_AUTHOR_EMAIL": "giphon@example.com",
+    "GIT_COMMITTER_NAME": "giphon",
+    "GIT_COMMITTER_EMAIL": "giphon@example.com",
+}
+
+
+def generate_bare_repositories(
+    path: Path, *, count: int, commits: int = 3, file_size: int = 1024
+) -> List[Path]:
+    """
+    Generate bare git repositories sharing the same history.
+
+    Args:
+        path (Path): The directory to generate the repositories in
+        count (int): The number of repositories
+        commits (int): The number of commits of each repository
+        file_size (int): The size of the file changed by every commit
+
+    Returns:
+        List[Path]: The paths of the bare repositories
+    """
+    environment = {**os.environ, **GIT_ENVIRONMENT}
+    work_tree = path / "work"
+
+    def run_git(*args: str, cwd: Path = work_tree) -> None:
+        subprocess.run(
+            ["git", *args],
+            cwd=cwd,
+            env=environment,
+            check=True,
+            capture_output=True,
+        )
+
+    os.makedirs(work_tree, exist_ok=True)
+    run_git("init")
+    run_git("symbolic-ref", "HEAD", "refs/heads/main")
+
+    for commit in range(commits):
+        with open(work_tree / "data.bin", "wb") as f:
+            f.write(os.urandom(file_size))
+        with open(work_tree / "README.md", "w") as f:
+            f.write(f"Commit {commit}\n")
+
+        run_git("add", "--all")
+        run_git("commit", "--message", f"Commit {commit}")
+
+    repositories = [path / f"repository-{index}.git" for index in range(count)]
+
+    for repository in repositories:
+        run_git("clone", "--bare", str(work_tree), str(repository), cwd=path)
+
+    return repositories
+
+
+class GitlabStandInServer:
+    """
+    HTTP server answering like a Gitlab instance, for a synthetic tree.
+
+    Listings are paginated, with the same headers as Gitlab, and every
+    response carries rate-limit headers. When `rate_limit` is set, requests
+    over the limit of the current window are answered with 429 errors.
+
+    Projects point to `file://` URLs of generated bare repositories, shared
+    round-robin across projects.
+    """
+
+    def __init__(
+        self: "GitlabStandInServer",
+        *,
+        root: Path,
+        groups: int = 2,
+        depth: int = 2,
+        projects: int = 8,
+        repositories: int = 4,
+        commits: int = 3,
+        file_size: int = 1024,
+        variables: int = 2,
+        rate_limit: Optional[int] = None,
+        latency: float = 0.0,
+    ) -> None:
+        self.tree = SyntheticGitlab(
+            groups=groups, depth=depth, projects=projects
+        )
+        self.variables = variables
+        self.rate_limit = rate_limit
+        self.latency = latency
+
+        self.requests: Counter = Counter()
+        self._lock = Lock()
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+
+        self.repositories = generate_bare_repositories(
+            root / "repositories",
+            count=repositories,
+            commits=commits,
+            file_size=file_size,
+        )
+
+        self._server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), _GitlabStandInHandler
+        )
+        self._server.stand_in = self  # type: ignore
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self: "GitlabStandInServer") -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def total_requests(self: "GitlabStandInServer") -> int:
+        return sum(self.requests.values())
+
+    def start(self: "GitlabStandInServer") -> "GitlabStandInServer":
+        self._thread.start()
+        return self
+
+    def stop(self: "GitlabStandInServer") -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self: "GitlabStandInServer") -> "GitlabStandInServer":
+        return self.start()
+
+    def __exit__(self: "GitlabStandInServer", *_: Any) -> None:
+        self.stop()
+
+    # Serialization
+    def group_to_json(self, group: SyntheticGroup) -> Dict[str, Any]:
+        return {
+            "id": group.id,
+            "name": group.name,
+            "path": group.path,
+            "full_path": group.full_path,
+            "parent_id": group.parent_id,
+            "web_url": f"{self.url}/groups/{group.full_path}",
+        }
+
+    def project_to_json(
+        self, project: SyntheticProject, statistics: bool = False
+    ) -> Dict[str, Any]:
+        repository = self.repositories[
+            (project.id - 1) % len(self.repositories)
+        ]
+        repository_url = repository.resolve().as_uri()
+        namespace = project.path_with_namespace.rsplit("/", 1)[0]
+
+        data = {
+            "id": project.id,
+            "name": project.name,
+            "path": project.path,
+            "path_with_namespace": project.path_with_namespace,
+            "namespace": {"full_path": namespace},
+            "default_branch": "main",
+            "archived": False,
+            "visibility": "private",
+            "topics": [],
+            "last_activity_at": "2024-01-01T00:00:00.000Z",
+            "ssh_url_to_repo": repository_url,
+            "http_url_to_repo": repository_url,
+            "web_url": f"{self.url}/{project.path_with_namespace}",
+        }
+
+        if statistics:
+            data["statistics"] = {
+                "repository_size": _get_directory_size(repository)
+            }
+
+        return data
+
+    def variables_to_json(self, owner: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                "key": f"VARIABLE_{index}",
+                "value": f"{owner}-{index}",
+                "variable_type": "env_var",
+                "environment_scope": "*",
+                "protected": False,
+                "masked": False,
+            }
+            for index in range(self.variables)
+        ]
+
+    # Routing
+    def handle(
+        self, path: str, query: Dict[str, str]
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        """
+        Answer an API request.
+
+        Args:
+            path (str): The path of the request
+            query (Dict[str, str]): The query parameters of the request
+
+        Returns:
+            Tuple[int, Any, Dict[str, str]]: The status, JSON body and headers
+              of the response
+        """
+        url = f"{self.url}{path}"
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+
+        if parts[:2] != ["api", "v4"]:
+            return 404, {"message": "404 Not Found"}, {}
+
+        resource = parts[2:]
+        statistics = _get_flag(query, "statistics")
+        tree = self.tree
+
+        try:
+            if resource == ["groups"]:
+                groups = (
+                    tree.root_groups
+                    if _get_flag(query, "top_level_only")
+                    else list(tree._groups.values())
+                )
+                return self.paginate(
+                    url, [self.group_to_json(group) for group in groups], query
+                )
+
+            if resource[0] == "groups" and len(resource) >= 2:
+                group = self.get_group(resource[1])
+
+                if len(resource) == 2:
+                    return 200, self.group_to_json(group), {}
+
+                if resource[2] == "subgroups":
+                    return self.paginate(
+                        url,
+                        [self.group_to_json(sub) for sub in group._subgroups],
+                        query,
+                    )
+
+                if resource[2] == "projects":
+                    return self.paginate(
+                        url,
+                        [
+                            self.project_to_json(project, statistics)
+                            for project in self.get_group_projects(
+                                group, _get_flag(query, "include_subgroups")
+                            )
+                        ],
+                        query,
+                    )
+
+                if resource[2] == "variables":
+                    return self.paginate(
+                        url, self.variables_to_json(group.full_path), query
+                    )
+
+            if resource == ["projects"]:
+                return self.paginate(
+                    url,
+                    [
+                        self.project_to_json(project, statistics)
+                        for project in tree._projects.values()
+                    ],
+                    query,
+                )
+
+            if resource[0] == "projects" and len(resource) >= 2:
+                project = self.get_project(resource[1])
+
+                if len(resource) == 2:
+                    return 200, self.project_to_json(project, statistics), {}
+
+                if resource[2] == "variables":
+                    return self.paginate(
+                        url,
+                        self.variables_to_json(project.path_with_namespace),
+                        query,
+                    )
+
+        except (KeyError, StopIteration):
+            pass
+
+        return 404, {"message": "404 Not Found"}, {}
+
+    def handle_graphql(
+        self, request: Dict[str, Any]
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        """
+        Answer the GraphQL queries of giphon, told apart by their operation
+        name rather than parsed.
+
+        Args:
+            request (Dict[str, Any]): The body of the request
+
+        Returns:
+            Tuple[int, Any, Dict[str, str]]: The status, JSON body and headers
+              of the response
+        """
+        variables = request.get("variables") or {}
+
+        try:
+            group = self.get_group(variables["fullPath"])
+        except StopIteration:
+            return 200, {"data": {"group": None}}, {}
+
+        if request.get("operationName") == "GiphonDescendantGroups":
+            connection = "descendantGroups"
+            nodes = [
+                {
+                    "id": f"gid://gitlab/Group/{descendant.id}",
+                    "name": descendant.name,
+                    "fullPath": descendant.full_path,
+                }
+                for descendant in self.get_descendant_groups(group)
+            ]
+        elif request.get("operationName") == "GiphonGroupProjects":
+            connection = "projects"
+            nodes = [
+                self.project_to_node(project, variables.get("statistics"))
+                for project in self.get_group_projects(group, True)
+            ]
+        else:
+            return 200, {"errors": [{"message": "Unknown operation"}]}, {}
+
+        first = min(int(variables.get("first") or MAX_PER_PAGE), MAX_PER_PAGE)
+        start = int(variables.get("after") or 0)
+        end = start + first
+
+        return (
+            200,
+            {
+                "data": {
+                    "group": {
+                        connection: {
+                            "nodes": nodes[start:end],
+                            "pageInfo": {
+                                "hasNextPage": end < len(nodes),
+                                "endCursor": str(end),
+                            },
+                        }
+                    }
+                }
+            },
+            {},
+        )
+
+    def project_to_node(
+        self, project: SyntheticProject, statistics: bool = False
+    ) -> Dict[str, Any]:
+        data = self.project_to_json(project, statistics)
+        node = {
+            "id": f"gid://gitlab/Project/{project.id}",
+            "name": data["name"],
+            "fullPath": data["path_with_namespace"],
+            "sshUrlToRepo": data["ssh_url_to_repo"],
+            "httpUrlToRepo": data["http_url_to_repo"],
+            "archived": data["archived"],
+            "lastActivityAt": data["last_activity_at"],
+            "topics": data["topics"],
+            "visibility": data["visibility"],
+            "repository": {
+                "empty": False,
+                "rootRef": data["default_branch"],
+            },
+        }
+
+        if statistics:
+            node["statistics"] = {
+                "repositorySize": float(data["statistics"]["repository_size"])
+            }
+
+        return node
+
+    def get_descendant_groups(
+        self, group: SyntheticGroup
+    ) -> List[SyntheticGroup]:
+        descendants = []
+
+        for subgroup in group._subgroups:
+            descendants.append(subgroup)
+            descendants.extend(self.get_descendant_groups(subgroup))
+
+        return descendants
+
+    def get_group(self, id: str) -> SyntheticGroup:
+        if id.isdigit():
+            return self.tree._groups[int(id)]
+
+        return next(
+            group
+            for group in self.tree._groups.values()
+            if group.full_path == id
+        )
+
+    def get_project(self, id: str) -> SyntheticProject:
+        if id.isdigit():
+            return self.tree._projects[int(id)]
+
+        return next(
+            project
+            for project in self.tree._projects.values()
+            if project.path_with_namespace == id
+        )
+
+    def get_group_projects(
+        self, group: SyntheticGroup, include_subgroups: bool
+    ) -> List[SyntheticProject]:
+        projects = list(group._projects)
+
+        if include_subgroups:
+            for subgroup in group._subgroups:
+                projects.extend(self.get_group_projects(subgroup, True))
+
+        return projects
+
+    def paginate(
+        self, url: str, items: List[Any], query: Dict[str, str]
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        per_page = min(
+            int(query.get("per_page", DEFAULT_PER_PAGE)), MAX_PER_PAGE
+        )
+        page = int(query.get("page", 1))
+        total_pages = max(1, math.ceil(len(items) / per_page))
+
+        headers = {
+            "X-Page": str(page),
+            "X-Per-Page": str(per_page),
+            "X-Total": str(len(items)),
+            "X-Total-Pages": str(total_pages),
+            "X-Next-Page": str(page + 1) if page < total_pages else "",
+            "X-Prev-Page": str(page - 1) if page > 1 else "",
+        }
+
+        if page < total_pages:
+            next_query = {**query, "page": str(page + 1)}
+            headers["Link"] = f"<{url}?{urlencode(next_query)}>; " 'rel="next"'
+
+        return (
+            200,
+            items[(page - 1) * per_page : page * per_page],  # noqa: E203
+            headers,
+        )
+
+    def rate_limit_headers(self) -> Tuple[bool, Dict[str, str]]:
+        """
+        Count a request against the rate limit.
+
+        Returns:
+            Tuple[bool, Dict[str, str]]: Whether the request is allowed, and
+              the rate-limit headers to answer with
+        """
+        with self._lock:
+            now = time.monotonic()
+
+            if now - self._window_start >= RATE_LIMIT_WINDOW:
+                self._window_start = now
+                self._window_requests = 0
+
+            self._window_requests += 1
+
+            limit = self.rate_limit or 2000
+            reset = int(self._window_start + RATE_LIMIT_WINDOW - now) + 1
+            allowed = self.rate_limit is None or self._window_requests <= limit
+
+            headers = {
+                "RateLimit-Limit": str(limit),
+                "RateLimit-Observed": str(self._window_requests),
+                "RateLimit-Remaining": str(
+                    max(0, limit - self._window_requests)
+                ),
+                "RateLimit-Reset": str(int(time.time()) + reset),
+            }
+
+            if not allowed:
+                headers["Retry-After"] = str(reset)
+
+            return allowed, headers
+
+
+class _GitlabStandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        parsed = urlparse(self.path)
+        query = {
+            key: values[-1] for key, values in parse_qs(parsed.query).items()
+        }
+
+        self.respond(
+            _get_endpoint(parsed.path),
+            lambda stand_in: stand_in.handle(parsed.path, query),
+        )
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if urlparse(self.path).path != "/api/graphql":
+            self.respond(
+                "POST " + _get_endpoint(self.path),
+                lambda _: (404, {"message": "404 Not Found"}, {}),
+            )
+            return
+
+        self.respond(
+            "/graphql",
+            lambda stand_in: stand_in.handle_graphql(request),
+        )
+
+    def respond(
+        self,
+        endpoint: str,
+        handle: Callable[
+            [GitlabStandInServer], Tuple[int, Any, Dict[str, str]]
+        ],
+    ) -> None:
+        stand_in: GitlabStandInServer = self.server.stand_in  # type: ignore
+
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+
+        allowed, headers = stand_in.rate_limit_headers()
+
+        if allowed:
+            with stand_in._lock:
+                stand_in.requests[endpoint] += 1
+
+            status, body, response_headers = handle(stand_in)
+            headers.update(response_headers)
+        else:
+            status, body = 429, {"message": "429 Too Many Requests"}
+
+        payload = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *_: Any) -> None:
+        pass
+
+
+def _get_endpoint(path: str) -> str:
+    """
+    Get an API endpoint template from a path, such as `/groups/:id`.
+    """
+    parts = path.strip("/").split("/")[2:]
+
+    return "/" + "/".join(
+        ":id" if index % 2 else part for index, part in enumerate(parts)
+    )
+
+
+def _get_flag(query: Dict[str, str], name: str) -> bool:
+    return query.get(name, "").lower() == "true"
+
+
+def _get_directory_size(path: Path) -> int:
+    return sum(
+        os.path.getsize(os.path.join(directory, file))
+        for directory, _, files in os.walk(path)
+        for file in files
+    )
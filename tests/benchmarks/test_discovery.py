@@ -0,0 +1,166 @@
+"""
+Benchmarks of the discovery of groups and projects, against a synthetic
+Gitlab instance and the stand-in server.
+
+Run with `pytest -m benchmark`.
+"""
+
+import math
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from giphon.git import RepositoryAction
+from giphon.gitlab import (
+    Discovery,
+    flatten_groups_tree,
+    get_gitlab_instance,
+    get_groups_from_path,
+)
+from giphon.graphql import flatten_groups_tree_graphql
+from giphon.siphon import siphon
+
+from .server import GitlabStandInServer
+from .utils import DEFAULT_PER_PAGE, SyntheticGitlab, record_benchmark
+
+pytestmark = pytest.mark.benchmark
+
+GROUPS = 50
+DEPTH = 20
+PROJECTS = 10_000
+
+
+def _get_synthetic_gitlab() -> SyntheticGitlab:
+    return SyntheticGitlab(groups=GROUPS, depth=DEPTH, projects=PROJECTS)
+
+
+def _get_expected_discovery_calls() -> int:
+    groups = GROUPS * DEPTH
+    projects_per_group = PROJECTS / groups
+
+    return (
+        # Root groups listing
+        math.ceil(GROUPS / DEFAULT_PER_PAGE)
+        # Subgroups and projects listings of every group
+        + groups
+        + groups * math.ceil(projects_per_group / DEFAULT_PER_PAGE)
+        # Getting every subgroup
+        + groups
+        - GROUPS
+    )
+
+
+def test_flatten_groups_tree_benchmark():
+    gl = _get_synthetic_gitlab()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    elements = list(
+        flatten_groups_tree(groups=get_groups_from_path(Path("/"), gl), gl=gl)
+    )
+
+    seconds = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    record = record_benchmark(
+        "flatten_groups_tree",
+        seconds=seconds,
+        peak_memory=peak_memory,
+        api_calls=gl.total_api_calls,
+    )
+    print(record)
+
+    assert len(elements) == GROUPS * DEPTH + PROJECTS
+    assert gl.total_api_calls == _get_expected_discovery_calls()
+
+
+def test_siphon_benchmark(monkeypatch, tmp_path):
+    """
+    Benchmark a whole siphon, with cloning mocked out.
+    """
+    siphon_module = sys.modules["giphon.siphon"]
+    gl = _get_synthetic_gitlab()
+
+    monkeypatch.setattr(siphon_module, "get_gitlab_instance", lambda **_: gl)
+    monkeypatch.setattr(
+        siphon_module,
+        "handle_project",
+        lambda **_: RepositoryAction.skipped,
+    )
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    siphon(
+        namespace=Path("/"),
+        output=tmp_path,
+        gitlab_token="",
+        gitlab_url=gl.url,
+        fetch_repositories=False,
+        save_ci_variables=False,
+        # Expected calls are those of python-gitlab's listings
+        prefetch_pages=0,
+        ssh_multiplexing=False,
+        report=tmp_path / "report.json",
+    )
+
+    seconds = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    record = record_benchmark(
+        "siphon",
+        seconds=seconds,
+        peak_memory=peak_memory,
+        api_calls=gl.total_api_calls,
+    )
+    print(record)
+
+    assert gl.total_api_calls == _get_expected_discovery_calls()
+
+
+@pytest.mark.parametrize("discovery", list(Discovery))
+def test_discovery_requests_benchmark(tmp_path, discovery):
+    """
+    Compare the requests made by the REST and GraphQL discovery, against
+    the stand-in server.
+    """
+    with GitlabStandInServer(
+        root=tmp_path, groups=10, depth=5, projects=2000, repositories=1
+    ) as server:
+        gl = get_gitlab_instance(url=server.url, private_token="SECRET")
+        groups = get_groups_from_path(Path("/"), gl)
+        server.requests.clear()
+
+        flatten = (
+            flatten_groups_tree_graphql
+            if discovery == Discovery.graphql
+            else flatten_groups_tree
+        )
+
+        start = time.perf_counter()
+        elements = list(flatten(groups=groups, gl=gl))
+        seconds = time.perf_counter() - start
+
+        record = record_benchmark(
+            f"discovery_{discovery.value}",
+            seconds=seconds,
+            api_calls=server.total_requests,
+        )
+        print(record)
+
+    assert len(elements) == 10 * 5 + 2000
+
+    if discovery == Discovery.graphql:
+        # Per root group: 1 page of descendant groups, 2 pages of projects
+        assert server.total_requests == 10 * (1 + 2)
+    else:
+        # Per group: subgroups and projects listings, and getting subgroups
+        assert server.total_requests == 10 * 5 * (
+            1 + math.ceil(2000 / (10 * 5) / DEFAULT_PER_PAGE)
+        ) + (10 * 4)
@@ -0,0 +1,80 @@
+"""
+Benchmarks of whole siphons, clones included, against the local Gitlab
+stand-in server.
+
+Run with `pytest -m benchmark`.
+"""
+
+import time
+from pathlib import Path
+
+import pytest
+
+from giphon.report import RunReport
+from giphon.siphon import siphon
+
+from .server import GitlabStandInServer
+from .utils import record_benchmark
+
+pytestmark = pytest.mark.benchmark
+
+GROUPS = 5
+DEPTH = 4
+PROJECTS = 200
+REPOSITORIES = 20
+
+
+def _siphon(
+    server: GitlabStandInServer, output: Path, jobs: str = "1"
+) -> RunReport:
+    siphon(
+        namespace=Path("/"),
+        output=output,
+        gitlab_token="SECRET",
+        gitlab_url=server.url,
+        clone_through_ssh=False,
+        ssh_multiplexing=False,
+        jobs=jobs,
+        report=output / "report.json",
+    )
+
+    return RunReport.read(output / "report.json")
+
+
+@pytest.mark.parametrize("jobs", ["1", "auto"])
+@pytest.mark.parametrize("run", ["clone", "fetch"])
+def test_siphon_end_to_end_benchmark(tmp_path, run, jobs):
+    with GitlabStandInServer(
+        root=tmp_path / "server",
+        groups=GROUPS,
+        depth=DEPTH,
+        projects=PROJECTS,
+        repositories=REPOSITORIES,
+        commits=10,
+        file_size=64 * 1024,
+    ) as server:
+        output = tmp_path / "output"
+
+        if run == "fetch":
+            _siphon(server, output, jobs)
+
+        start = time.perf_counter()
+        requests = server.total_requests
+
+        report = _siphon(server, output, jobs)
+
+        seconds = time.perf_counter() - start
+
+    record = record_benchmark(
+        f"siphon_end_to_end_{run}_jobs_{jobs}",
+        seconds=seconds,
+        api_calls=server.total_requests - requests,
+        bytes=report.bytes,
+        max_jobs=max(change.jobs for change in report.concurrency),
+    )
+    print(record)
+
+    assert report.processed == {"group": GROUPS * DEPTH, "project": PROJECTS}
+    assert report.actions == {
+        "cloned" if run == "clone" else "fetched": PROJECTS
+    }
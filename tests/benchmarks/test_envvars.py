@@ -0,0 +1,43 @@
+"""
+Benchmarks of the matching of CI/CD variables to environments.
+
+Run with `pytest -m benchmark`.
+"""
+
+import time
+
+import pytest
+
+from giphon.envvars import _compile_scope, _match_environment_to_scope
+
+from .utils import record_benchmark
+
+pytestmark = pytest.mark.benchmark
+
+
+def test_match_environment_to_scope_benchmark():
+    """
+    Microbenchmark matching 10k variables against 100 environments.
+
+    Each distinct scope must only be compiled once.
+    """
+    scopes = [f"env{index % 50}/*" for index in range(10_000)]
+    environments = [f"env{index}/review-{index}" for index in range(100)]
+
+    _compile_scope.cache_clear()
+
+    start = time.perf_counter()
+
+    matches = sum(
+        _match_environment_to_scope(environment=environment, scope=scope)
+        for environment in environments
+        for scope in scopes
+    )
+
+    seconds = time.perf_counter() - start
+
+    record = record_benchmark("match_environment_to_scope", seconds=seconds)
+    print(record)
+
+    assert matches == 50 * 200
+    assert _compile_scope.cache_info().misses == 50
@@ -0,0 +1,264 @@
+"""
+End-to-end tests of siphon, against the local Gitlab stand-in server.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import git
+import pytest
+from typer import BadParameter
+
+import giphon.disk
+from giphon.config import load_config, run
+from giphon.events import OutputFormat
+from giphon.git import LfsStrategy
+from giphon.gitlab import Discovery, get_gitlab_instance
+from giphon.inventory import Inventory
+from giphon.report import RunReport
+from giphon.siphon import siphon, siphon_targets
+from giphon.state import load_projects_state
+
+from .server import GitlabStandInServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    with GitlabStandInServer(
+        root=tmp_path / "server", groups=2, depth=2, projects=30
+    ) as server:
+        yield server
+
+
+def test_server_pagination(server):
+    """
+    Test that python-gitlab follows the stand-in server's pagination.
+    """
+    gl = get_gitlab_instance(url=server.url, private_token="SECRET")
+
+    projects = gl.projects.list(all=True, per_page=7)
+
+    assert len(projects) == 30
+    assert server.requests["/projects"] == 5
+
+    groups = gl.groups.list(top_level_only=True, all=True)
+
+    assert [group.full_path for group in groups] == ["group-1", "group-3"]
+
+
+def test_server_rate_limit(tmp_path):
+    with GitlabStandInServer(root=tmp_path, rate_limit=2) as server:
+        gl = get_gitlab_instance(url=server.url, private_token="SECRET")
+        gl.groups.get(1)
+        gl.groups.get(2)
+
+        response = gl.session.get(f"{server.url}/api/v4/groups/1")
+
+        assert response.status_code == 429
+        assert response.headers["RateLimit-Remaining"] == "0"
+        assert "Retry-After" in response.headers
+
+
+def _get_siphon_options(server, output, **options):
+    return {
+        "namespace": Path("/"),
+        "output": output,
+        "gitlab_token": "SECRET",
+        "gitlab_url": server.url,
+        "clone_through_ssh": False,
+        "ssh_multiplexing": False,
+        "jobs": "auto",
+        "checkout_jobs": 2,
+        "lfs": LfsStrategy.deferred,
+        "maintenance": True,
+        **options,
+    }
+
+
+def test_siphon_end_to_end(server, tmp_path):
+    """
+    Test a whole siphon, cloning the stand-in server's repositories.
+    """
+    output = tmp_path / "output"
+    options = _get_siphon_options(server, output, inventory_sizes=True)
+
+    siphon(**options)
+
+    for project in server.tree._projects.values():
+        repository = git.Repo(output / project.path_with_namespace)
+
+        assert repository.head.commit.message == "Commit 2\n"
+        assert not repository.is_dirty()
+
+    for group in server.tree._groups.values():
+        assert sorted(
+            os.listdir(output / group.full_path / ".gitlab/.env")
+        ) == [
+            "env_var:VARIABLE_0:%2A",
+            "env_var:VARIABLE_1:%2A",
+        ]
+
+    # Fetching already cloned repositories
+    siphon(**options)
+
+    inventory = Inventory.open(output)
+    projects = inventory.select(type="project")
+    inventory.close()
+
+    assert len(projects) == len(server.tree._projects)
+    assert {project.action for project in projects} == {"fetched"}
+    assert all(project.repository_size > 0 for project in projects)
+
+
+def test_siphon_graphql_discovery(server, tmp_path):
+    """
+    Test a whole siphon, discovering projects through the GraphQL API.
+    """
+    siphon(
+        **_get_siphon_options(
+            server,
+            tmp_path / "output",
+            discovery=Discovery.graphql,
+            save_ci_variables=False,
+            report=tmp_path / "report.json",
+        )
+    )
+
+    assert RunReport.read(tmp_path / "report.json").actions == {"cloned": 30}
+    assert server.requests["/graphql"] == 2 * (1 + 1)
+    assert server.requests["/groups/:id/subgroups"] == 0
+
+    inventory = Inventory.open(tmp_path / "output")
+    projects = inventory.select(type="project")
+    inventory.close()
+
+    assert len(projects) == 30
+    assert {project.default_branch for project in projects} == {"main"}
+    # Sizes are only requested on demand
+    assert {project.repository_size for project in projects} == {None}
+
+
+def test_run_targets(server, tmp_path, monkeypatch):
+    """
+    Test a run of several namespaces from two instances, sharing a single
+    API instance per Gitlab instance.
+    """
+    siphon_module = sys.modules["giphon.siphon"]
+    instances = []
+
+    def _get_gitlab_instance(**kwargs):
+        instances.append(kwargs["url"])
+        return get_gitlab_instance(**kwargs)
+
+    monkeypatch.setattr(
+        siphon_module, "get_gitlab_instance", _get_gitlab_instance
+    )
+
+    with GitlabStandInServer(
+        root=tmp_path / "other-server", groups=2, depth=2, projects=12
+    ) as other_server:
+        config = {
+            "clone_through_ssh": False,
+            "save_ci_variables": False,
+            "jobs": 4,
+            "targets": [
+                {"gitlab_url": server.url, "namespace": "/", "output": "a"},
+                # Overlaps the previous target
+                {
+                    "gitlab_url": server.url,
+                    "namespace": "group-1",
+                    "output": "a",
+                },
+                {
+                    "gitlab_url": other_server.url,
+                    "namespace": "group-3",
+                    "output": "b",
+                },
+            ],
+        }
+        config_path = tmp_path / "giphon.json"
+        config_path.write_text(json.dumps(config))
+
+        run(
+            config=config_path,
+            gitlab_token="SECRET",
+            gitlab_username="",
+            report=tmp_path / "report.json",
+            prometheus_textfile=None,
+            output_format=OutputFormat.rich,
+            verbose=False,
+        )
+
+        other_projects = [
+            project.path_with_namespace
+            for project in other_server.tree._projects.values()
+            if project.path_with_namespace.startswith("group-3/")
+        ]
+
+    assert instances == [server.url, other_server.url]
+    assert RunReport.read(tmp_path / "report.json").actions == {
+        "cloned": 30 + len(other_projects)
+    }
+    assert len(load_projects_state(tmp_path / "a")) == 30
+    assert sorted(map(str, load_projects_state(tmp_path / "b").values())) == (
+        sorted(other_projects)
+    )
+
+    # Project ids are only unique within an instance
+    config["targets"][2]["output"] = "a"
+    config_path.write_text(json.dumps(config))
+
+    targets, _ = load_config(config_path, gitlab_token="SECRET")
+
+    with pytest.raises(BadParameter):
+        siphon_targets(targets)
+
+
+def test_siphon_disk_space_admission(server, tmp_path, monkeypatch):
+    """
+    Test that clones are deferred while others use the disk space they
+    would need, and skipped when they cannot fit at all.
+    """
+    repository_size = max(
+        server.project_to_json(project, statistics=True)["statistics"][
+            "repository_size"
+        ]
+        for project in server.tree._projects.values()
+    )
+    headroom = 1024**3
+
+    # Only leaves space for one clone at a time
+    monkeypatch.setattr(
+        giphon.disk,
+        "_get_free_space",
+        lambda _: headroom + 3 * repository_size,
+    )
+
+    siphon(
+        **_get_siphon_options(
+            server,
+            tmp_path / "output",
+            disk_headroom=str(headroom),
+            report=tmp_path / "report.json",
+        )
+    )
+
+    assert RunReport.read(tmp_path / "report.json").actions == {"cloned": 30}
+
+    monkeypatch.setattr(giphon.disk, "_get_free_space", lambda _: headroom)
+
+    siphon(
+        **_get_siphon_options(
+            server,
+            tmp_path / "other-output",
+            disk_headroom=str(headroom),
+            report=tmp_path / "report.json",
+        )
+    )
+
+    assert RunReport.read(tmp_path / "report.json").actions == {
+        "out_of_space": 30
+    }
+    assert not (tmp_path / "other-output/group-1/project-1").exists()
@@ -0,0 +1,44 @@
+"""
+Unit tests for the benchmark utilities.
+"""
+
+import pytest
+
+from . import utils
+from .utils import BenchmarkRegression, SyntheticGitlab, record_benchmark
+
+
+def test_synthetic_gitlab():
+    gl = SyntheticGitlab(groups=2, depth=3, projects=12)
+
+    assert [group.full_path for group in gl.groups.list()] == [
+        "group-1",
+        "group-4",
+    ]
+    assert gl.groups.get("group-1/group-2/group-3").id == 3
+    assert len(gl.groups.get(1).projects.list(all=True)) == 2
+    assert gl.projects.get(12).path_with_namespace == (
+        "group-4/group-5/group-6/project-12"
+    )
+    assert gl.total_api_calls == 5
+
+
+def test_record_benchmark(monkeypatch, tmp_path):
+    """
+    Test that results are stored, and regressions compared to another commit
+    are reported.
+    """
+    monkeypatch.setattr(
+        utils, "BENCHMARK_RESULTS_PATH", tmp_path / "results.jsonl"
+    )
+
+    monkeypatch.setattr(utils, "_get_commit", lambda: "first")
+    record_benchmark("discovery", seconds=1.0, api_calls=10)
+
+    monkeypatch.setattr(utils, "_get_commit", lambda: "second")
+
+    with pytest.warns(BenchmarkRegression, match="api_calls"):
+        record = record_benchmark("discovery", seconds=1.1, api_calls=20)
+
+    assert record["commit"] == "second"
+    assert len((tmp_path / "results.jsonl").read_text().splitlines()) == 2
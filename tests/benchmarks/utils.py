@@ -0,0 +1,254 @@
+"""
+Synthetic Gitlab instances and result recording for benchmarks.
+"""
+
+import json
+import math
+import os
+import subprocess
+import warnings
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+BENCHMARK_RESULTS_PATH = Path(
+    os.environ.get("GIPHON_BENCHMARK_RESULTS", ".benchmarks/results.jsonl")
+)
+REGRESSION_THRESHOLD = 1.5
+DEFAULT_PER_PAGE = 20
+
+
+class BenchmarkRegression(UserWarning):
+    pass
+
+
+# Synthetic Gitlab
+class SyntheticGitlab:
+    """
+    Fake Gitlab instance holding a generated tree of groups and projects.
+
+    The tree is made of `groups` root groups, each being a chain of `depth`
+    nested groups, with `projects` projects spread evenly across all groups.
+
+    API calls are counted the way python-gitlab would issue them, including
+    one call per page of listings.
+    """
+
+    def __init__(
+        self: "SyntheticGitlab",
+        *,
+        groups: int,
+        depth: int,
+        projects: int,
+    ) -> None:
+        self.url = "https://synthetic.gitlab"
+        self.session = requests.Session()
+        self.api_calls: Counter = Counter()
+
+        self.groups = _SyntheticGroupManager(self)
+        self.projects = _SyntheticProjectManager(self)
+
+        self._groups: Dict[int, SyntheticGroup] = {}
+        self._projects: Dict[int, SyntheticProject] = {}
+        self.root_groups: List[SyntheticGroup] = []
+
+        for root_index in range(groups):
+            parent: Optional[SyntheticGroup] = None
+
+            for _ in range(depth):
+                group = SyntheticGroup(
+                    gl=self,
+                    id=len(self._groups) + 1,
+                    path=f"group-{len(self._groups) + 1}",
+                    parent=parent,
+                )
+                self._groups[group.id] = group
+
+                if parent is None:
+                    self.root_groups.append(group)
+                else:
+                    parent._subgroups.append(group)
+
+                parent = group
+
+        all_groups = list(self._groups.values())
+
+        for index in range(projects):
+            group = all_groups[index % len(all_groups)]
+            project = SyntheticProject(
+                id=index + 1, path=f"project-{index + 1}", group=group
+            )
+            self._projects[project.id] = project
+            group._projects.append(project)
+
+    @property
+    def total_api_calls(self: "SyntheticGitlab") -> int:
+        return sum(self.api_calls.values())
+
+    def _paginate(self: "SyntheticGitlab", endpoint: str, items, **kwargs):
+        per_page = kwargs.get("per_page", DEFAULT_PER_PAGE)
+        self.api_calls[endpoint] += max(1, math.ceil(len(items) / per_page))
+
+        return list(items)
+
+
+class SyntheticGroup:
+    def __init__(
+        self: "SyntheticGroup",
+        *,
+        gl: SyntheticGitlab,
+        id: int,
+        path: str,
+        parent: Optional["SyntheticGroup"],
+    ) -> None:
+        self.id = id
+        self.name = path
+        self.path = path
+        self.full_path = f"{parent.full_path}/{path}" if parent else path
+        self.parent_id = parent.id if parent else None
+
+        self._subgroups: List[SyntheticGroup] = []
+        self._projects: List[SyntheticProject] = []
+
+        self.subgroups = _SyntheticListing(
+            gl, "GET /groups/:id/subgroups", self._subgroups
+        )
+        self.projects = _SyntheticListing(
+            gl, "GET /groups/:id/projects", self._projects
+        )
+        self.variables = _SyntheticListing(gl, "GET /groups/:id/variables", [])
+
+
+class SyntheticProject:
+    def __init__(
+        self: "SyntheticProject",
+        *,
+        id: int,
+        path: str,
+        group: SyntheticGroup,
+    ) -> None:
+        self.id = id
+        self.name = path
+        self.path = path
+        self.path_with_namespace = f"{group.full_path}/{path}"
+        self.ssh_url_to_repo = (
+            f"git@synthetic.gitlab:{self.path_with_namespace}.git"
+        )
+        self.http_url_to_repo = (
+            f"https://synthetic.gitlab/{self.path_with_namespace}.git"
+        )
+
+
+class _SyntheticListing:
+    def __init__(self, gl: SyntheticGitlab, endpoint: str, items) -> None:
+        self._gl = gl
+        self._endpoint = endpoint
+        self._items = items
+
+    def list(self, *args, **kwargs):
+        return self._gl._paginate(self._endpoint, self._items, **kwargs)
+
+
+class _SyntheticGroupManager:
+    def __init__(self, gl: SyntheticGitlab) -> None:
+        self._gl = gl
+
+    def get(self, id, *args, lazy: bool = False, **kwargs) -> SyntheticGroup:
+        if not lazy:
+            self._gl.api_calls["GET /groups/:id"] += 1
+
+        if isinstance(id, str) and not id.isdigit():
+            return next(
+                group
+                for group in self._gl._groups.values()
+                if group.full_path == id
+            )
+
+        return self._gl._groups[int(id)]
+
+    def list(self, *args, **kwargs) -> List[SyntheticGroup]:
+        return self._gl._paginate(
+            "GET /groups", self._gl.root_groups, **kwargs
+        )
+
+
+class _SyntheticProjectManager:
+    def __init__(self, gl: SyntheticGitlab) -> None:
+        self._gl = gl
+
+    def get(self, id, *args, lazy: bool = False, **kwargs):
+        if not lazy:
+            self._gl.api_calls["GET /projects/:id"] += 1
+
+        return self._gl._projects[int(id)]
+
+    def list(self, *args, **kwargs) -> List[SyntheticProject]:
+        return self._gl._paginate(
+            "GET /projects", list(self._gl._projects.values()), **kwargs
+        )
+
+
+# Results
+def _get_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def record_benchmark(name: str, **metrics: float) -> Dict:
+    """
+    Store the results of a benchmark, and warn about regressions compared to
+    the latest results of another commit.
+
+    Results are appended to a JSON lines file, `.benchmarks/results.jsonl`
+    by default, or the path in the `GIPHON_BENCHMARK_RESULTS` environment
+    variable.
+    """
+    record = {
+        "name": name,
+        "commit": _get_commit(),
+        "time": datetime.now(timezone.utc).isoformat(),
+        **metrics,
+    }
+
+    previous = None
+
+    if BENCHMARK_RESULTS_PATH.exists():
+        with open(BENCHMARK_RESULTS_PATH) as f:
+            for line in f:
+                result = json.loads(line)
+
+                if (
+                    result["name"] == name
+                    and result["commit"] != record["commit"]
+                ):
+                    previous = result
+
+    if previous is not None:
+        for metric, value in metrics.items():
+            previous_value = previous.get(metric)
+
+            if previous_value and value > previous_value * (
+                REGRESSION_THRESHOLD
+            ):
+                warnings.warn(
+                    f"{name}: {metric} went from {previous_value} at "
+                    f"{previous['commit']} to {value}",
+                    BenchmarkRegression,
+                )
+
+    os.makedirs(BENCHMARK_RESULTS_PATH.parent, exist_ok=True)
+
+    with open(BENCHMARK_RESULTS_PATH, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    return record
@@ -0,0 +1,97 @@
+"""
+Unit tests for the bandwidth module.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from typer import BadParameter
+
+from giphon.bandwidth import BandwidthBudget, parse_bandwidth
+
+
+class MockClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_parse_bandwidth():
+    assert parse_bandwidth(None) is None
+    assert parse_bandwidth("2048") == 2048
+    assert parse_bandwidth("500k") == 500 * 1024
+    assert parse_bandwidth("1.5M") == 1.5 * 1024**2
+    assert parse_bandwidth("1G") == 1024**3
+
+    for value in ("0", "-1M", "fast", "10P"):
+        with pytest.raises(BadParameter):
+            parse_bandwidth(value)
+
+
+def test_bandwidth_budget():
+    clock = MockClock()
+    budget = BandwidthBudget(1000, clock=clock, sleep=clock.sleep)
+
+    # Small transfers are admitted right away
+    for _ in range(5):
+        assert budget.acquire() == 0
+        budget.consume(100)
+
+    # A large transfer puts the budget in debt, delaying the next one
+    assert budget.acquire() == 0
+    budget.consume(3500)
+
+    assert budget.acquire() == pytest.approx(3)
+    assert clock.now == pytest.approx(3)
+
+    # The budget refills up to one second of transfers
+    clock.now += 60
+    budget.consume(1000)
+
+    assert budget.acquire() == 0
+
+
+def test_bandwidth_budget_reservations():
+    clock = MockClock()
+    budget = BandwidthBudget(1000, clock=clock, sleep=clock.sleep)
+
+    # Transfers admitted before any of them is done are paced by their
+    # expected size
+    assert budget.acquire(3000) == 0
+    assert budget.acquire(3000) == pytest.approx(2)
+    assert budget.acquire(1000) == pytest.approx(3)
+
+    # Transfers settle the difference with what they actually transferred
+    budget.consume(2000, reserved=3000)
+    budget.consume(3000, reserved=3000)
+    budget.consume(1000, reserved=1000)
+
+    assert budget.acquire() == 0
+
+    # Refunds do not overflow the bucket
+    clock.now += 60
+    budget.consume(0, reserved=3000)
+    budget.acquire(3000)
+
+    assert budget.acquire() == pytest.approx(2)
+
+
+def test_bandwidth_budget_concurrent_admissions():
+    """
+    Test that clones admitted concurrently, on a full bucket, are paced.
+    """
+    budget = BandwidthBudget(50_000)
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        waits = list(executor.map(lambda _: budget.acquire(10_000), range(8)))
+
+    # Five clones fit the full bucket, the sixth puts it in debt
+    assert sum(wait > 0 for wait in waits) == 2
+    assert time.monotonic() - start >= 0.3
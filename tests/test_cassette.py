@@ -0,0 +1,134 @@
+"""
+Unit tests for the cassette module.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+import requests
+
+from giphon.cassette import (
+    REDACTED,
+    ApiRecorder,
+    ApiReplayAdapter,
+    get_interaction_key,
+)
+from giphon.gitlab import (
+    flatten_groups_tree,
+    get_gitlab_instance,
+    get_groups_from_path,
+    save_environment_variables,
+)
+
+from .benchmarks.server import GitlabStandInServer
+from .utils import MockLogger
+
+TOKEN = "glpat-SECRET"
+
+
+def _discover(gl):
+    return [
+        (element.type, element.full_path)
+        for element in flatten_groups_tree(
+            groups=get_groups_from_path(Path("/"), gl), gl=gl
+        )
+    ]
+
+
+def test_get_interaction_key():
+    assert get_interaction_key(
+        "get", "https://a/api/v4/groups?page=2&per_page=20&private_token=X"
+    ) == get_interaction_key(
+        "GET", "http://b/api/v4/groups?per_page=20&page=2"
+    )
+    assert get_interaction_key(
+        "GET", "https://a/api/v4/groups?page=2"
+    ) != get_interaction_key("GET", "https://a/api/v4/groups?page=3")
+    assert get_interaction_key(
+        "POST", "https://a/api/graphql", b'{"query": "a"}'
+    ) == get_interaction_key("POST", "https://b/api/graphql", '{"query": "a"}')
+    assert get_interaction_key(
+        "POST", "https://a/api/graphql", b'{"query": "a"}'
+    ) != get_interaction_key(
+        "POST", "https://a/api/graphql", b'{"query": "b"}'
+    )
+
+
+def test_record_and_replay(tmp_path):
+    cassettes = tmp_path / "cassettes"
+
+    with GitlabStandInServer(
+        root=tmp_path / "server", groups=2, depth=2, projects=30
+    ) as server:
+        gl = get_gitlab_instance(url=server.url, private_token=TOKEN)
+        ApiRecorder(cassettes, private_token=TOKEN).track(gl)
+
+        recorded = _discover(gl)
+        save_environment_variables(
+            tmp_path / "recorded", gl.groups.get(1), MockLogger()
+        )
+
+    for cassette in os.listdir(cassettes):
+        assert TOKEN not in (cassettes / cassette).read_text()
+
+    # The server is stopped: any request that was not recorded fails
+    gl = get_gitlab_instance(url="https://gitlab.invalid", private_token="")
+    ApiReplayAdapter(cassettes, latency=0.001).mount(gl)
+
+    assert _discover(gl) == recorded
+
+    assert (
+        save_environment_variables(
+            tmp_path / "replayed", gl.groups.get(1), MockLogger()
+        )
+        == 2
+    )
+    assert os.listdir(tmp_path / "replayed") == os.listdir(
+        tmp_path / "recorded"
+    )
+
+    with pytest.raises(requests.ConnectionError):
+        gl.projects.get(12345)
+
+
+def test_record_variables(tmp_path):
+    """
+    Test that the values of CI/CD variables are not recorded.
+    """
+    cassettes = tmp_path / "cassettes"
+
+    with GitlabStandInServer(
+        root=tmp_path / "server", groups=1, depth=1, projects=1
+    ) as server:
+        gl = get_gitlab_instance(url=server.url, private_token=TOKEN)
+        ApiRecorder(cassettes, private_token=TOKEN).track(gl)
+
+        group = gl.groups.get(1)
+        secret = server.variables_to_json(group.full_path)[0]["value"]
+
+        save_environment_variables(tmp_path / "recorded", group, MockLogger())
+
+    assert (
+        secret
+        in (tmp_path / "recorded" / group.full_path / ".gitlab" / ".env")
+        .joinpath("env_var:VARIABLE_0:%2A")
+        .read_text()
+    )
+
+    (cassette,) = [
+        cassettes / name
+        for name in os.listdir(cassettes)
+        if "/variables" in (cassettes / name).read_text()
+    ]
+    assert secret not in cassette.read_text()
+
+    gl = get_gitlab_instance(url="https://gitlab.invalid", private_token="")
+    ApiReplayAdapter(cassettes).mount(gl)
+
+    (variable,) = [
+        variable
+        for variable in gl.groups.get(1, lazy=True).variables.list(all=True)
+        if variable.key == "VARIABLE_0"
+    ]
+    assert variable.value == REDACTED
@@ -0,0 +1,28 @@
+"""
+Unit tests for the commands module.
+"""
+
+import pytest
+from typer import Argument, Option
+
+from giphon.commands import callable_command
+
+
+def test_callable_command():
+    @callable_command
+    def command(
+        name: str = Argument(...),
+        *,
+        count: int = Option(1),
+        verbose: bool = Option(False, "--verbose"),
+        plain: str = "plain",
+    ):
+        return name, count, verbose, plain
+
+    assert command("a") == ("a", 1, False, "plain")
+    assert command(name="a", verbose=True) == ("a", 1, True, "plain")
+    assert command("a", count=2, plain="other") == ("a", 2, False, "other")
+
+    # Required parameters are still required
+    with pytest.raises(TypeError):
+        command()
@@ -0,0 +1,117 @@
+"""
+Unit tests for the concurrency module.
+"""
+
+import pytest
+from typer import BadParameter
+
+from giphon.concurrency import AdaptiveConcurrency, parse_jobs
+from giphon.report import ConcurrencyChange
+
+
+class MockClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_jobs():
+    assert parse_jobs("4") == 4
+    assert parse_jobs("auto") is None
+
+    for value in ("0", "-1", "many"):
+        with pytest.raises(BadParameter):
+            parse_jobs(value)
+
+
+def _run_window(concurrency, clock, *, seconds, failed=0):
+    window = max(4, 2 * concurrency.limit)
+    clock.now += seconds
+
+    for index in range(window):
+        concurrency.record(failed=index < failed)
+
+
+def test_adaptive_concurrency():
+    clock = MockClock()
+    concurrency = AdaptiveConcurrency(initial=2, maximum=4, clock=clock)
+
+    # Throughput holds: additive increase, up to the maximum
+    _run_window(concurrency, clock, seconds=1)
+    _run_window(concurrency, clock, seconds=1)
+    _run_window(concurrency, clock, seconds=1)
+
+    assert concurrency.limit == 4
+
+    # Errors: multiplicative decrease
+    _run_window(concurrency, clock, seconds=1, failed=2)
+
+    assert concurrency.limit == 2
+
+    # Throughput drops: multiplicative decrease
+    _run_window(concurrency, clock, seconds=1)
+    _run_window(concurrency, clock, seconds=10)
+
+    assert concurrency.limit == 1
+    assert concurrency.history == [
+        ConcurrencyChange(seconds=0.0, jobs=2),
+        ConcurrencyChange(seconds=1.0, jobs=3),
+        ConcurrencyChange(seconds=2.0, jobs=4),
+        ConcurrencyChange(seconds=4.0, jobs=2),
+        ConcurrencyChange(seconds=5.0, jobs=3),
+        ConcurrencyChange(seconds=15.0, jobs=1),
+    ]
+
+
+def test_adaptive_concurrency_bytes():
+    """
+    Test that windows of a few large repositories are not taken for a drop
+    in throughput when bytes are measured.
+    """
+    clock = MockClock()
+    concurrency = AdaptiveConcurrency(initial=2, maximum=4, clock=clock)
+
+    # Many small repositories, then few large ones of a larger total
+    for seconds, sizes in ((1, [1024] * 4), (10, [1024**3] + [1024] * 5)):
+        clock.now += seconds
+
+        for size in sizes:
+            concurrency.record(failed=False, bytes=size)
+
+    assert concurrency.limit == 4
+
+    # Without bytes, the same windows are a drop in operations per second
+    concurrency = AdaptiveConcurrency(initial=2, maximum=4, clock=clock)
+
+    for seconds, count in ((1, 4), (10, 6)):
+        clock.now += seconds
+
+        for _ in range(count):
+            concurrency.record(failed=False)
+
+    assert concurrency.limit == 1
+
+    # Nor are windows that transferred nothing
+    concurrency = AdaptiveConcurrency(initial=2, maximum=4, clock=clock)
+
+    for seconds, sizes in ((1, [1024**2] * 4), (10, [0] * 6)):
+        clock.now += seconds
+
+        for size in sizes:
+            concurrency.record(failed=False, bytes=size)
+
+    assert concurrency.limit == 4
+
+
+def test_fixed_concurrency():
+    clock = MockClock()
+    concurrency = AdaptiveConcurrency.from_jobs(3)
+    concurrency.clock = clock
+
+    _run_window(concurrency, clock, seconds=1)
+    _run_window(concurrency, clock, seconds=1, failed=6)
+
+    assert concurrency.limit == 3
+    assert concurrency.history == [ConcurrencyChange(seconds=0.0, jobs=3)]
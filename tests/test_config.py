@@ -0,0 +1,128 @@
+"""
+Unit tests for the config module.
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from typer import BadParameter
+
+from giphon.config import load_config
+from giphon.filters import ProjectFilters, Visibility
+from giphon.git import LfsStrategy
+from giphon.gitlab import Discovery
+from giphon.siphon import SiphonTarget
+from giphon.state import PrunePolicy
+
+
+def _write_config(tmp_path, config):
+    path = tmp_path / "giphon.json"
+
+    with open(path, "w") as f:
+        json.dump(config, f)
+
+    return path
+
+
+def test_load_config(tmp_path, monkeypatch):
+    monkeypatch.setenv("OTHER_GITLAB_TOKEN", "OTHER_SECRET")
+
+    path = _write_config(
+        tmp_path,
+        {
+            "gitlab_url": "https://gitlab.example.com",
+            "clone_through_ssh": False,
+            "jobs": 4,
+            "lfs": "deferred",
+            "max_bandwidth": "50M",
+            "targets": [
+                {"namespace": "platform", "output": "mirror/platform"},
+                {
+                    "namespace": "/",
+                    "output": "/srv/gitlab.com",
+                    "gitlab_url": "https://gitlab.com",
+                    "gitlab_token_env": "OTHER_GITLAB_TOKEN",
+                    "include": "org/*",
+                    "visibility": "public",
+                    "last_activity_after": "2026-01-01",
+                    "discovery": "graphql",
+                    "prune": "delete",
+                },
+            ],
+        },
+    )
+
+    targets, options = load_config(path, gitlab_token="SECRET")
+
+    assert targets == [
+        SiphonTarget(
+            namespace=Path("platform"),
+            output=tmp_path / "mirror/platform",
+            gitlab_token="SECRET",
+            gitlab_url="https://gitlab.example.com",
+            clone_through_ssh=False,
+        ),
+        SiphonTarget(
+            namespace=Path("/"),
+            output=Path("/srv/gitlab.com"),
+            gitlab_token="OTHER_SECRET",
+            gitlab_url="https://gitlab.com",
+            clone_through_ssh=False,
+            filters=ProjectFilters(
+                include=("org/*",),
+                visibility=Visibility.public,
+                last_activity_after=datetime(2026, 1, 1),
+            ),
+            discovery=Discovery.graphql,
+            prune=PrunePolicy.delete,
+        ),
+    ]
+    assert options == {
+        "jobs": "4",
+        "lfs": LfsStrategy.deferred,
+        "max_bandwidth": "50M",
+    }
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        [],
+        {"targets": []},
+        {"targets": ["platform"]},
+        {"targets": [{"namespace": "platform"}]},
+        {"targets": [{"output": "mirror"}]},
+        {"unknown": True, "targets": [{"namespace": "a", "output": "b"}]},
+        {"targets": [{"namespace": "a", "output": "b", "jobs": 4}]},
+        {"targets": [{"namespace": "a", "output": "b", "prune": "all"}]},
+        {"targets": [{"namespace": "a", "output": "b", "inventory": "no"}]},
+        {"targets": [{"namespace": "a", "output": "b", "include": [1]}]},
+        {
+            "checkout_jobs": True,
+            "targets": [{"namespace": "a", "output": "b"}],
+        },
+        {
+            "targets": [
+                {"namespace": "a", "output": "b", "gitlab_token_env": "UNSET"}
+            ]
+        },
+    ],
+)
+def test_load_config_errors(tmp_path, monkeypatch, config):
+    monkeypatch.delenv("UNSET", raising=False)
+
+    with pytest.raises(BadParameter):
+        load_config(_write_config(tmp_path, config))
+
+
+def test_load_config_unreadable(tmp_path):
+    with pytest.raises(BadParameter):
+        load_config(tmp_path / "missing.json")
+
+    path = tmp_path / "invalid.json"
+    path.write_text("{")
+
+    with pytest.raises(BadParameter):
+        load_config(path)
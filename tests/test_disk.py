@@ -0,0 +1,61 @@
+"""
+Unit tests for the disk module.
+"""
+
+import os
+
+import pytest
+from typer import BadParameter
+
+from giphon.disk import DiskSpaceBudget, format_size, get_device, parse_size
+
+
+def test_parse_size():
+    assert parse_size("2048") == 2048
+    assert parse_size("500k") == 500 * 1024
+    assert parse_size("10G") == 10 * 1024**3
+    assert parse_size("1T") == 1024**4
+
+    for value in ("0", "-1G", "huge", "10P"):
+        with pytest.raises(BadParameter):
+            parse_size(value)
+
+
+def test_format_size():
+    assert format_size(0) == "0"
+    assert format_size(512) == "512"
+    assert format_size(1536) == "1.5K"
+    assert format_size(10 * 1024**3) == "10.0G"
+    assert format_size(parse_size("1T")) == "1.0T"
+
+
+def test_disk_space_budget(tmp_path):
+    budget = DiskSpaceBudget(
+        tmp_path / "output",
+        headroom=1000,
+        get_free_space=lambda _: 2000,
+    )
+
+    # Estimated sizes account for working trees
+    assert budget.reserve(1, 300)
+    assert budget.reserved == 600
+
+    assert not budget.reserve(2, 300)
+    assert budget.reserve(3, 200)
+    assert not budget.reserve(4, 1)
+
+    budget.release(1)
+
+    assert budget.reserve(2, 300)
+    assert budget.reservations == {2: 600, 3: 400}
+
+
+def test_disk_space_budget_free_space(tmp_path):
+    budget = DiskSpaceBudget(tmp_path / "output/not/created", headroom=1)
+
+    assert budget.reserve(1, 0)
+
+
+def test_get_device(tmp_path):
+    # Paths that do not exist yet are on the volume of their parents
+    assert get_device(tmp_path / "output/group") == os.stat(tmp_path).st_dev
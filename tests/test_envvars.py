@@ -5,7 +5,14 @@ Integration test for the main function.
 """
 
 
-from giphon.envvars import _match_environment_to_scope
+import contextlib
+from io import StringIO
+
+from giphon.envvars import (
+    _match_environment_to_scope,
+    _scope_specificity,
+    _source_specific_path,
+)
 
 
 def test_match_environment_to_scope():
@@ -42,6 +49,53 @@ def test_match_environment_to_scope():
         is False
     )
 
+    # Test: the whole environment must match
+    assert (
+        _match_environment_to_scope(environment="production", scope="prod")
+        is False
+    )
+    assert (
+        _match_environment_to_scope(environment="production", scope="prod*")
+        is True
+    )
+
+    # Test: the catch-all scope
+    assert _match_environment_to_scope(environment="any", scope="*") is True
+
+
+def test_scope_specificity():
+    assert _scope_specificity(environment="env/dev", scope="env/dev") > (
+        _scope_specificity(environment="env/dev", scope="env/*")
+    )
+    assert _scope_specificity(environment="env/dev", scope="env/*") > (
+        _scope_specificity(environment="env/dev", scope="*")
+    )
+    assert _scope_specificity(environment="env/dev", scope="env/d*") > (
+        _scope_specificity(environment="env/dev", scope="env/*")
+    )
+
+
+def test_source_specific_path_most_specific_scope(tmp_path):
+    """
+    Test that, among several matching scopes for a variable, only the most
+    specific one is exported.
+    """
+    env_path = tmp_path / ".gitlab/.env"
+    env_path.mkdir(parents=True)
+
+    (env_path / "env_var:FOO:*").write_text("catch-all")
+    (env_path / "env_var:FOO:env%2F*").write_text("wildcard")
+    (env_path / "env_var:FOO:env%2Fdev").write_text("exact")
+    (env_path / "env_var:BAR:*").write_text("bar")
+    (env_path / "env_var:BAZ:prod").write_text("baz")
+
+    f = StringIO()
+
+    with contextlib.redirect_stdout(f):
+        _source_specific_path(environment="env/dev", path=tmp_path)
+
+    assert f.getvalue() == "export BAR='bar'\nexport FOO='exact'\n"
+
 
 def test_source():
     """
@@ -0,0 +1,32 @@
+"""
+Unit tests for the events module.
+"""
+
+import json
+from datetime import datetime
+from io import StringIO
+
+from giphon.events import EventStream
+
+
+def test_event_stream():
+    stream = StringIO()
+    events = EventStream(stream)
+
+    events.emit("element_started", type="project", full_path="lorem/ipsum")
+    events.emit("run_finished", processed={"project": 1})
+
+    lines = stream.getvalue().splitlines()
+
+    assert len(lines) == 2
+
+    first, second = (json.loads(line) for line in lines)
+
+    assert first["event"] == "element_started"
+    assert first["full_path"] == "lorem/ipsum"
+    assert datetime.fromisoformat(first["time"]).tzinfo is not None
+    assert second == {
+        "time": second["time"],
+        "event": "run_finished",
+        "processed": {"project": 1},
+    }
@@ -0,0 +1,90 @@
+"""
+Unit tests for the filters module.
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from giphon.filters import AccessLevel, ProjectFilters, Visibility, match_path
+
+
+def _project(path_with_namespace="group/project", **attributes):
+    return SimpleNamespace(
+        path_with_namespace=path_with_namespace, **attributes
+    )
+
+
+def test_match_path():
+    assert match_path("group/project", "group/*")
+    assert match_path("group/subgroup/project", "group/*")
+    assert not match_path("other/project", "group/*")
+    assert not match_path("Group/project", "group/*")
+
+    assert match_path("group/project-infra", "re:.*-infra")
+    assert not match_path("group/project-infra-old", "re:.*-infra")
+    assert match_path("group/project", "re:group/(project|other)")
+
+
+def test_get_list_parameters():
+    assert ProjectFilters().get_list_parameters() == {}
+
+    assert ProjectFilters(
+        include=("group/*",),
+        topics=("python", "cli"),
+        visibility=Visibility.internal,
+        min_access_level=AccessLevel.developer,
+        last_activity_after=datetime(2024, 1, 2, tzinfo=timezone.utc),
+        exclude_forks=True,
+    ).get_list_parameters() == {
+        "topic": "python,cli",
+        "visibility": "internal",
+        "min_access_level": 30,
+        "last_activity_after": "2024-01-02T00:00:00+00:00",
+    }
+
+
+def test_is_excluded():
+    filters = ProjectFilters(exclude=("group/archive", "re:.*/tmp-.*"))
+
+    assert filters.is_excluded("group/archive")
+    assert filters.is_excluded("group/sub/tmp-project")
+    assert not filters.is_excluded("group/archive-2")
+    assert not filters.is_excluded("group/project")
+
+
+def test_matches():
+    assert ProjectFilters().matches(_project())
+
+    filters = ProjectFilters(include=("group/*",), exclude=("group/old-*",))
+
+    assert filters.matches(_project("group/project"))
+    assert not filters.matches(_project("other/project"))
+    assert not filters.matches(_project("group/old-project"))
+
+    filters = ProjectFilters(topics=("python", "cli"))
+
+    assert filters.matches(_project(topics=["cli", "python", "web"]))
+    assert not filters.matches(_project(topics=["python"]))
+    assert not filters.matches(_project())
+
+    filters = ProjectFilters(visibility=Visibility.public)
+
+    assert filters.matches(_project(visibility="public"))
+    assert not filters.matches(_project(visibility="private"))
+
+    filters = ProjectFilters(last_activity_after=datetime(2024, 1, 2))
+
+    assert filters.matches(_project(last_activity_at="2024-03-01T10:00:00Z"))
+    assert not filters.matches(
+        _project(last_activity_at="2023-12-31T10:00:00.000+01:00")
+    )
+
+    filters = ProjectFilters(exclude_forks=True, exclude_empty=True)
+
+    assert filters.matches(
+        _project(forked_from_project=None, empty_repo=False)
+    )
+    assert not filters.matches(
+        _project(forked_from_project={"id": 1}, empty_repo=False)
+    )
+    assert not filters.matches(_project(empty_repo=True))
@@ -3,13 +3,23 @@ Unit tests for the git module.
 """
 
 import contextlib
+import logging
+import os
 from io import StringIO
 from pathlib import Path
 
 import git
 import pytest
 
-from giphon.git import _fetch_repository, handle_project
+from giphon.git import (
+    RepositoryAction,
+    SparseCheckout,
+    _fetch_repository,
+    checkout_repository,
+    handle_project,
+    pull_lfs_objects,
+    run_maintenance,
+)
 
 from .utils import MockLogger, MockRepository
 
@@ -168,3 +178,185 @@ def test_handle_project_without_dir_and_unhandled_exception(monkeypatch):
             fetch=False,  # Doesn't intervene
             logger=MockLogger(),  # Doesn't intervene
         )
+
+
+def test_handle_project_relocation(tmp_path, monkeypatch):
+    """
+    Test that `handle_project` moves a renamed project's checkout and updates
+    its remote URL, instead of cloning it again.
+    """
+
+    def mock_clone_from(*args, **kwargs):
+        raise AssertionError("The repository should not have been cloned")
+
+    monkeypatch.setattr(git.Repo, "clone_from", mock_clone_from)
+
+    previous_path = tmp_path / "old-group/project"
+    repository = git.Repo.init(previous_path)
+    repository.create_remote("origin", "git@toto.com:old-group/project.git")
+
+    new_path = tmp_path / "new-group/renamed-project"
+
+    handle_project(
+        repository_path=new_path,
+        repository_url="git@toto.com:new-group/renamed-project.git",
+        fetch=False,
+        logger=logging.getLogger(__name__),
+        previous_repository_path=previous_path,
+    )
+
+    assert not previous_path.exists()
+    assert (new_path / ".git").is_dir()
+    assert git.Repo(new_path).remotes.origin.url == (
+        "git@toto.com:new-group/renamed-project.git"
+    )
+
+
+def _init_upstream_repository(path, files=("README.md",)):
+    upstream = git.Repo.init(path)
+
+    for file in files:
+        os.makedirs((path / file).parent, exist_ok=True)
+        (path / file).write_text("Lorem ipsum\n")
+
+    upstream.index.add(list(files))
+    upstream.index.commit(
+        "Initial commit",
+        author=git.Actor("giphon", "giphon@example.com"),
+        committer=git.Actor("giphon", "giphon@example.com"),
+    )
+
+    return upstream
+
+
+def test_handle_project_without_checkout(tmp_path):
+    """
+    Test that `handle_project` can only clone objects, leaving the working
+    tree to `checkout_repository`.
+    """
+    _init_upstream_repository(tmp_path / "upstream")
+
+    repository_path = tmp_path / "clone"
+
+    action = handle_project(
+        repository_path=repository_path,
+        repository_url=str(tmp_path / "upstream"),
+        fetch=False,
+        logger=logging.getLogger(__name__),
+        checkout=False,
+    )
+
+    assert action == RepositoryAction.cloned
+    assert not (repository_path / "README.md").exists()
+
+    checkout_repository(repository_path)
+
+    assert (repository_path / "README.md").read_text() == "Lorem ipsum\n"
+    assert not git.Repo(repository_path).is_dirty()
+
+
+def test_handle_project_lfs_skip_smudge(monkeypatch):
+    clones = []
+
+    monkeypatch.setattr(Path, "is_dir", lambda _: False)
+    monkeypatch.setattr(
+        git.Repo, "clone_from", lambda *_, **kwargs: clones.append(kwargs)
+    )
+
+    for lfs_skip_smudge in (False, True):
+        handle_project(
+            repository_path=Path("toto"),
+            repository_url="git@toto.com",
+            fetch=False,
+            logger=MockLogger(),
+            lfs_skip_smudge=lfs_skip_smudge,
+        )
+
+    assert clones[0]["env"] is None
+    assert clones[1]["env"] == {"GIT_LFS_SKIP_SMUDGE": "1"}
+
+
+def test_pull_lfs_objects(tmp_path, monkeypatch, capsys):
+    _init_upstream_repository(tmp_path)
+
+    pulls = []
+
+    monkeypatch.setattr(
+        git.cmd.Git, "lfs", lambda _, *args: pulls.append(args), raising=False
+    )
+
+    assert pull_lfs_objects(tmp_path, MockLogger())
+    assert pulls == [("pull",)]
+
+    def mock_lfs(*_):
+        raise git.GitCommandError(command="git lfs pull", status=1)
+
+    monkeypatch.setattr(git.cmd.Git, "lfs", mock_lfs, raising=False)
+
+    assert not pull_lfs_objects(tmp_path, MockLogger())
+    assert "Would have warned" in capsys.readouterr().out
+
+
+def test_handle_project_sparse_checkout(tmp_path):
+    """
+    Test that sparse-checkout patterns are set at clone time, and applied
+    again on fetches.
+    """
+    _init_upstream_repository(
+        tmp_path / "upstream", files=("README.md", "ci/.gitlab-ci.yml")
+    )
+
+    repository_path = tmp_path / "clone"
+    options = dict(
+        repository_path=repository_path,
+        repository_url=str(tmp_path / "upstream"),
+        fetch=True,
+        logger=logging.getLogger(__name__),
+        partial_clone=True,
+    )
+
+    handle_project(
+        **options, sparse_checkout=SparseCheckout(("/ci/",), cone=False)
+    )
+
+    assert (repository_path / "ci/.gitlab-ci.yml").exists()
+    assert not (repository_path / "README.md").exists()
+
+    handle_project(
+        **options, sparse_checkout=SparseCheckout(("/README.md",), cone=False)
+    )
+
+    assert not (repository_path / "ci/.gitlab-ci.yml").exists()
+    assert (repository_path / "README.md").exists()
+
+
+def test_run_maintenance(tmp_path):
+    _init_upstream_repository(tmp_path)
+
+    assert run_maintenance(tmp_path, MockLogger())
+
+    assert (tmp_path / ".git/objects/pack/multi-pack-index").exists()
+    assert (tmp_path / ".git/objects/info/commit-graphs").exists()
+
+
+def test_handle_project_failed_clone_cleanup(tmp_path, monkeypatch):
+    """
+    Test that a failed clone does not leave a partial repository behind.
+    """
+    repository_path = tmp_path / "project"
+
+    def mock_clone_from(*args, **kwargs):
+        os.makedirs(repository_path / ".git/objects")
+        raise git.GitCommandError(command="clone", status=128)
+
+    monkeypatch.setattr(git.Repo, "clone_from", mock_clone_from)
+
+    action = handle_project(
+        repository_path=repository_path,
+        repository_url="git@toto.com",
+        fetch=False,
+        logger=MockLogger(),
+    )
+
+    assert action == RepositoryAction.failed
+    assert not repository_path.exists()
@@ -5,21 +5,29 @@ Unit tests for the gitlab module.
 import builtins
 import contextlib
 import os
+import tracemalloc
+from datetime import datetime, timezone
 from io import StringIO
 from pathlib import Path
 
 import gitlab
 import pytest
 
+from giphon.filters import ProjectFilters
 from giphon.gitlab import (
+    GitlabElement,
     flatten_groups_tree,
     get_gitlab_element_full_path,
+    get_gitlab_element_object,
     get_gitlab_element_type,
     get_gitlab_instance,
     get_groups_from_path,
+    get_recently_active_projects,
     save_environment_variables,
 )
+from giphon.pagination import PagePrefetcher
 
+from .benchmarks.server import GitlabStandInServer
 from .utils import (
     MockGitlab,
     MockGitlabGroup,
@@ -45,6 +53,13 @@ def test_get_gitlab_instance(monkeypatch):
 
     assert isinstance(gl, gitlab.client.Gitlab)
 
+    # Connections are kept for as many concurrent calls
+    gl = get_gitlab_instance(
+        url="https://test", private_token="SECRET", pool_size=32
+    )
+
+    assert gl.session.get_adapter("https://test")._pool_maxsize == 32
+
 
 def test_get_gitlab_element_type(monkeypatch):
     """
@@ -199,6 +214,31 @@ def test_get_groups_from_path():
     assert group[0].id == "/first"
 
 
+def test_get_groups_from_path_top_level(tmp_path):
+    """
+    Test that only top-level groups are listed for the whole instance,
+    through python-gitlab and the API: listing every group would have
+    subgroups discovered twice.
+    """
+    with GitlabStandInServer(
+        root=tmp_path, groups=2, depth=3, projects=2
+    ) as server:
+        gl = get_gitlab_instance(url=server.url, private_token="SECRET")
+        top_level_paths = [
+            group.full_path for group in server.tree.root_groups
+        ]
+
+        assert [
+            group.full_path for group in get_groups_from_path(Path("/"), gl)
+        ] == top_level_paths
+
+        with PagePrefetcher(gl) as prefetcher:
+            assert [
+                group.full_path
+                for group in get_groups_from_path(Path("/"), gl, prefetcher)
+            ] == top_level_paths
+
+
 def test_save_environment_variables(monkeypatch):
     """
     Test the `save_environment_variables` function.
@@ -390,3 +430,157 @@ def test_flatten_groups_tree():
         "baz",
         "dolor",
     ]
+
+
+def test_flatten_groups_tree_filters():
+    """
+    Test the `flatten_groups_tree` function with project filters.
+
+    Excluded groups must not be fetched at all.
+    """
+    foo = MockGitlabProject(id="foo")
+    bar = MockGitlabProject(id="bar")
+    baz = MockGitlabProject(id="baz")
+
+    ipsum = MockGitlabGroup(id="ipsum", projects=[foo])
+    lorem = MockGitlabGroup(id="lorem", subgroups=[ipsum], projects=[bar, baz])
+
+    gl = MockGitlab(
+        url="https://toto",
+        private_token="SECRET",
+    )
+    gl.groups._groups = [lorem]
+    gl.projects._projects = [foo, bar, baz]
+
+    r = flatten_groups_tree(
+        groups=[lorem],
+        gl=gl,
+        filters=ProjectFilters(
+            include=("namespace/ba*",),
+            exclude=("ipsum", "re:.*/baz"),
+        ),
+    )
+
+    # ipsum is not among the groups of the instance, getting it would fail
+    assert [k.id for k in r] == ["lorem", "bar"]
+
+
+def test_gitlab_element():
+    """
+    Test the `GitlabElement` record, built from mocked groups and projects.
+    """
+    group = GitlabElement.from_group(MockGitlabGroup(id="lorem"))
+    project = GitlabElement.from_project(MockGitlabProject(id="ipsum"))
+
+    assert get_gitlab_element_type(group) == "group"
+    assert get_gitlab_element_type(project) == "project"
+
+    assert get_gitlab_element_full_path(group) == Path("lorem")
+    assert get_gitlab_element_full_path(project) == Path("namespace/ipsum")
+
+    assert project.ssh_url_to_repo == "git@toto.com:namespace/ipsum.git"
+
+    with pytest.raises(AttributeError):
+        project.name = "dolor"
+
+    assert not hasattr(project, "__dict__")
+
+
+def test_gitlab_element_memory():
+    """
+    Test that a `GitlabElement` stays small, by measuring the memory
+    allocated by a large number of records with tracemalloc.
+    """
+    count = 10_000
+
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+
+    elements = [
+        GitlabElement(
+            id=index,
+            type="project",
+            name=f"project-{index}",
+            full_path=f"some-group/some-subgroup/project-{index}",
+            ssh_url_to_repo=(
+                f"git@gitlab.com:some-group/some-subgroup/project-{index}.git"
+            ),
+            http_url_to_repo=(
+                "https://gitlab.com/some-group/some-subgroup/"
+                f"project-{index}.git"
+            ),
+        )
+        for index in range(count)
+    ]
+
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(
+        stat.size_diff
+        for stat in snapshot_after.compare_to(snapshot_before, "filename")
+    )
+
+    assert len(elements) == count
+    assert allocated / count < 512
+
+
+def test_get_gitlab_element_object():
+    """
+    Test whether records are turned into lazy python-gitlab objects, and
+    other objects are returned as-is.
+    """
+    gl = get_gitlab_instance(url="https://toto", private_token="SECRET")
+
+    group = get_gitlab_element_object(
+        GitlabElement(id=42, type="group", name="lorem", full_path="lorem"),
+        gl,
+    )
+    project = get_gitlab_element_object(
+        GitlabElement(id=43, type="project", name="ipsum", full_path="ipsum"),
+        gl,
+    )
+
+    assert isinstance(group, gitlab.v4.objects.groups.Group)
+    assert group.id == 42
+    assert isinstance(project, gitlab.v4.objects.projects.Project)
+    assert project.id == 43
+
+    mock_group = MockGitlabGroup(id="dolor")
+
+    assert get_gitlab_element_object(mock_group) is mock_group
+
+    with pytest.raises(ValueError):
+        get_gitlab_element_object(
+            GitlabElement(id=42, type="group", name="lorem", full_path="lorem")
+        )
+
+
+def test_get_recently_active_projects():
+    """
+    Test the `get_recently_active_projects` function, for a group and for
+    the whole instance, with a mocked gitlab instance.
+    """
+    foo = MockGitlabProject(id="foo")
+    bar = MockGitlabProject(id="bar")
+
+    gl = MockGitlab(url="https://toto", private_token="SECRET")
+    gl.groups._groups = [MockGitlabGroup(id="lorem", projects=[foo])]
+    gl.projects._projects = [foo, bar]
+
+    since = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+    projects = get_recently_active_projects(
+        namespace=Path("lorem"), gl=gl, since=since
+    )
+
+    assert [project.id for project in projects] == ["foo"]
+
+    projects = get_recently_active_projects(
+        namespace=Path("/"), gl=gl, since=since
+    )
+
+    assert [project.full_path for project in projects] == [
+        "namespace/foo",
+        "namespace/bar",
+    ]
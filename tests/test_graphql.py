@@ -0,0 +1,93 @@
+"""
+Unit tests for the graphql module.
+"""
+
+from pathlib import Path
+
+import pytest
+from gitlab.exceptions import GitlabGetError
+
+from giphon.filters import ProjectFilters
+from giphon.gitlab import (
+    flatten_groups_tree,
+    get_gitlab_instance,
+    get_groups_from_path,
+)
+from giphon.graphql import flatten_groups_tree_graphql, get_id
+
+from .benchmarks.server import GitlabStandInServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    with GitlabStandInServer(
+        root=tmp_path / "server", groups=2, depth=3, projects=30
+    ) as server:
+        yield server
+
+
+def test_get_id():
+    assert get_id("gid://gitlab/Project/42") == 42
+    assert get_id("gid://gitlab/Group/7") == 7
+
+
+def test_flatten_groups_tree_graphql(server):
+    gl = get_gitlab_instance(url=server.url, private_token="SECRET")
+    groups = get_groups_from_path(Path("/"), gl)
+
+    rest = set(flatten_groups_tree(groups=groups, gl=gl, statistics=True))
+    server.requests.clear()
+
+    graphql = list(
+        flatten_groups_tree_graphql(
+            groups=groups, gl=gl, statistics=True, per_page=4
+        )
+    )
+
+    assert set(graphql) == rest
+    assert len(graphql) == len(rest)
+    assert all(
+        element.repository_size > 0
+        for element in graphql
+        if element.type == "project"
+    )
+
+    # Per root group: 1 page of 2 descendant groups, 4 pages of 15 projects
+    assert server.requests == {"/graphql": 10}
+
+
+def test_flatten_groups_tree_graphql_filters(server):
+    gl = get_gitlab_instance(url=server.url, private_token="SECRET")
+    groups = get_groups_from_path(Path("/"), gl)
+    filters = ProjectFilters(exclude=("group-1/group-2",))
+
+    elements = list(
+        flatten_groups_tree_graphql(groups=groups, gl=gl, filters=filters)
+    )
+
+    assert set(elements) == set(
+        flatten_groups_tree(groups=groups, gl=gl, filters=filters)
+    )
+    # group-1 and its 5 projects, the 3 groups of group-4 and their projects
+    assert len(elements) == 1 + 5 + 3 + 15
+    assert not any(
+        element.full_path.startswith("group-1/group-2") for element in elements
+    )
+
+    with pytest.raises(ValueError):
+        next(
+            flatten_groups_tree_graphql(
+                groups=groups,
+                gl=gl,
+                filters=ProjectFilters(exclude_forks=True),
+            )
+        )
+
+
+def test_flatten_groups_tree_graphql_missing_group(server):
+    gl = get_gitlab_instance(url=server.url, private_token="SECRET")
+    group = get_groups_from_path(Path("/"), gl)[0]
+    group.full_path = "missing"
+
+    with pytest.raises(GitlabGetError):
+        list(flatten_groups_tree_graphql(groups=[group], gl=gl))
@@ -0,0 +1,353 @@
+"""
+Unit tests for the inventory module.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from typer import BadParameter
+
+from giphon.events import OutputFormat
+from giphon.git import RepositoryAction
+from giphon.inventory import (
+    INVENTORY_PATH,
+    INVENTORY_SCHEMA_VERSION,
+    Inventory,
+    ls,
+    query,
+)
+from giphon.report import ElementResult
+
+# The schema of the first version, whose sizes were 0 when unknown
+INVENTORY_SCHEMA_1 = """
+CREATE TABLE elements (
+    type TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    full_path TEXT NOT NULL,
+    ssh_url_to_repo TEXT NOT NULL DEFAULT '',
+    http_url_to_repo TEXT NOT NULL DEFAULT '',
+    default_branch TEXT NOT NULL DEFAULT '',
+    archived INTEGER NOT NULL DEFAULT 0,
+    repository_size INTEGER NOT NULL DEFAULT 0,
+    last_activity_at TEXT NOT NULL DEFAULT '',
+    topics TEXT NOT NULL DEFAULT '[]',
+    discovered_at TEXT NOT NULL,
+    PRIMARY KEY (type, id)
+);
+CREATE INDEX elements_full_path ON elements (full_path);
+CREATE TABLE syncs (
+    type TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    action TEXT,
+    synced_at TEXT NOT NULL,
+    duration REAL NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (type, id)
+);
+CREATE VIEW inventory AS
+    SELECT elements.*, syncs.action, syncs.synced_at, syncs.duration,
+        syncs.bytes
+    FROM elements LEFT JOIN syncs USING (type, id);
+"""
+
+
+def _get_project(id, path_with_namespace, **kwargs):
+    return SimpleNamespace(
+        id=id,
+        name=path_with_namespace.rsplit("/", 1)[-1],
+        path_with_namespace=path_with_namespace,
+        ssh_url_to_repo=f"git@gitlab.example.com:{path_with_namespace}.git",
+        http_url_to_repo=f"https://gitlab.example.com/{path_with_namespace}",
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def output(tmp_path):
+    inventory = Inventory.open(tmp_path)
+    inventory.add_group(SimpleNamespace(id=1, name="org", full_path="org"))
+    inventory.add_group(
+        SimpleNamespace(id=2, name="team", full_path="org/team")
+    )
+    inventory.add_project(
+        _get_project(
+            1,
+            "org/team/api",
+            default_branch="main",
+            archived=False,
+            statistics={"repository_size": 2 * 1024**3},
+            last_activity_at="2026-01-01T00:00:00Z",
+            topics=["python", "backend"],
+        )
+    )
+    inventory.add_project(
+        _get_project(
+            2,
+            "org/team/legacy",
+            default_branch="master",
+            archived=True,
+            statistics={"repository_size": 1024},
+            topics=["python"],
+        )
+    )
+    # Listing entries may lack optional attributes
+    inventory.add_project(_get_project(3, "org-other/web"))
+    inventory.record_result(
+        1,
+        ElementResult(
+            type="project",
+            full_path="org/team/api",
+            action=RepositoryAction.cloned.value,
+            duration=1.5,
+            bytes=2048,
+        ),
+    )
+    inventory.close()
+
+    return tmp_path
+
+
+def test_inventory_select(output):
+    inventory = Inventory.open(output)
+
+    assert [entry.full_path for entry in inventory.select()] == [
+        "org",
+        "org-other/web",
+        "org/team",
+        "org/team/api",
+        "org/team/legacy",
+    ]
+
+    # Namespaces match whole path components
+    assert [
+        entry.full_path
+        for entry in inventory.select(namespace=Path("/org"), type="project")
+    ] == ["org/team/api", "org/team/legacy"]
+
+    (api,) = inventory.select(archived=False, larger_than=1024**3)
+    assert api.full_path == "org/team/api"
+    assert api.default_branch == "main"
+    assert api.topics == ("python", "backend")
+    assert api.action == "cloned"
+    assert api.duration == 1.5
+    assert api.bytes == 2048
+
+    assert [
+        entry.id for entry in inventory.select(type="project", archived=True)
+    ] == [2]
+    assert [entry.id for entry in inventory.select(topics=["python"])] == [
+        1,
+        2,
+    ]
+    assert [
+        entry.id for entry in inventory.select(topics=["python", "backend"])
+    ] == [1]
+    assert [entry.id for entry in inventory.select(action="cloned")] == [1]
+
+    (web,) = inventory.select(namespace=Path("org-other"))
+    assert web.default_branch == ""
+    assert not web.archived
+    assert web.repository_size is None
+    assert web.topics == ()
+    assert web.action is None
+
+    inventory.close()
+
+
+def test_inventory_unknown_size(output):
+    """
+    Test that the known size of a repository is kept by discoveries that do
+    not request sizes.
+    """
+    inventory = Inventory.open(output)
+    inventory.add_project(_get_project(1, "org/team/api"))
+    inventory.add_project(
+        _get_project(3, "org-other/web", statistics={"repository_size": 512})
+    )
+
+    assert [
+        (entry.id, entry.repository_size)
+        for entry in inventory.select(type="project")
+    ] == [(3, 512), (1, 2 * 1024**3), (2, 1024)]
+
+    inventory.close()
+
+
+def test_inventory_migration(tmp_path):
+    """
+    Test that sizes stored as 0 by the first version of the schema are
+    taken as unknown.
+    """
+    path = tmp_path / ".giphon" / "inventory.sqlite3"
+    path.parent.mkdir()
+
+    connection = sqlite3.connect(str(path))
+    connection.executescript(INVENTORY_SCHEMA_1)
+    connection.execute(
+        "INSERT INTO elements (type, id, name, full_path, repository_size, "
+        "discovered_at) VALUES ('project', 1, 'api', 'org/api', 0, ''), "
+        "('project', 2, 'web', 'org/web', 1024, '')"
+    )
+    connection.execute("PRAGMA user_version = 1")
+    connection.commit()
+    connection.close()
+
+    inventory = Inventory.open(tmp_path)
+
+    assert [
+        (entry.id, entry.repository_size) for entry in inventory.select()
+    ] == [(1, None), (2, 1024)]
+    assert inventory.connection.execute("PRAGMA user_version").fetchone() == (
+        INVENTORY_SCHEMA_VERSION,
+    )
+
+    inventory.close()
+
+
+def test_inventory_archived_discovered(output):
+    inventory = Inventory.open(output)
+
+    assert not inventory.is_archived_discovered(Path("/"))
+
+    inventory.record_discovery(Path("/org"), archived=True)
+    inventory.record_discovery(Path("/org-other"), archived=False)
+
+    assert inventory.is_archived_discovered(Path("/org"))
+    assert inventory.is_archived_discovered(Path("org/team"))
+    assert not inventory.is_archived_discovered(Path("/org-other"))
+    assert not inventory.is_archived_discovered(Path("/"))
+
+    inventory.close()
+
+
+def test_inventory_forget_undiscovered(output):
+    inventory = Inventory.open(output)
+    inventory.add_group(SimpleNamespace(id=1, name="org", full_path="org"))
+    inventory.add_project(_get_project(2, "org/team/legacy"))
+
+    # Only undiscovered elements of the namespace are forgotten
+    assert inventory.forget_undiscovered(Path("/org")) == 2
+    assert [entry.full_path for entry in inventory.select()] == [
+        "org",
+        "org-other/web",
+        "org/team/legacy",
+    ]
+    assert inventory.connection.execute(
+        "SELECT COUNT(*) FROM syncs"
+    ).fetchone() == (0,)
+
+    inventory.close()
+
+
+def test_ls(output, capsys):
+    ls(
+        namespace=Path("/org"),
+        output=output,
+        archived=None,
+        larger_than="1K",
+        action=None,
+        topic=["python"],
+        output_format=OutputFormat.jsonl,
+    )
+
+    entries = [
+        json.loads(line) for line in capsys.readouterr().out.splitlines()
+    ]
+
+    assert [entry["full_path"] for entry in entries] == ["org/team/api"]
+    assert entries[0]["topics"] == ["python", "backend"]
+    assert entries[0]["action"] == "cloned"
+
+    ls(
+        namespace=Path("/"),
+        output=output,
+        archived=None,
+        larger_than=None,
+        action=RepositoryAction.cloned,
+        topic=None,
+        output_format=OutputFormat.rich,
+    )
+
+    table = capsys.readouterr().out
+    assert "org/team/api" in table
+    assert "org/team/legacy" not in table
+    assert "2.0G" in table
+
+
+def test_ls_warnings(output, capsys):
+    """
+    Test that listings on data that were not collected warn about it, and
+    that the inventory is opened read-only.
+    """
+    ls_options = dict(
+        namespace=Path("/"),
+        output=output,
+        action=None,
+        topic=None,
+        output_format=OutputFormat.jsonl,
+    )
+    inventory = Inventory.open(output)
+    inventory.connection.execute("PRAGMA user_version = 42")
+    inventory.connection.close()
+
+    ls(archived=None, larger_than="1K", **ls_options)
+
+    captured = capsys.readouterr()
+    assert len(captured.out.splitlines()) == 1
+    assert "the size of 1 projects is unknown" in captured.err
+
+    ls(archived=True, larger_than=None, **ls_options)
+
+    captured = capsys.readouterr()
+    assert len(captured.out.splitlines()) == 1
+    assert "archived projects were not indexed" in captured.err
+
+    ls(archived=False, larger_than=None, **ls_options)
+
+    assert capsys.readouterr().err == ""
+
+    connection = sqlite3.connect(str(output / INVENTORY_PATH))
+    assert connection.execute("PRAGMA user_version").fetchone() == (42,)
+    connection.close()
+
+
+def test_query(output, capsys):
+    query(
+        sql=(
+            "SELECT full_path, repository_size FROM inventory "
+            "WHERE type = 'project' ORDER BY repository_size DESC LIMIT 1"
+        ),
+        output=output,
+        output_format=OutputFormat.jsonl,
+    )
+
+    assert json.loads(capsys.readouterr().out) == {
+        "full_path": "org/team/api",
+        "repository_size": 2 * 1024**3,
+    }
+
+    # The inventory is opened read-only
+    with pytest.raises(BadParameter):
+        query(
+            sql="DELETE FROM elements",
+            output=output,
+            output_format=OutputFormat.jsonl,
+        )
+
+    with pytest.raises(BadParameter):
+        query(
+            sql="SELECT nothing FROM nowhere",
+            output=output,
+            output_format=OutputFormat.jsonl,
+        )
+
+    with pytest.raises(BadParameter):
+        query(
+            sql="SELECT 1",
+            output=output / "missing",
+            output_format=OutputFormat.jsonl,
+        )
@@ -0,0 +1,105 @@
+"""
+Unit tests for the pagination module.
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import requests
+
+from giphon.gitlab import get_gitlab_instance
+from giphon.pagination import RATE_LIMIT_RESERVE, PagePrefetcher
+
+from .benchmarks.server import GitlabStandInServer
+
+
+class _FirstPage(list):
+    def __init__(self, items, total_pages):
+        super().__init__(items)
+        self.total_pages = total_pages
+
+
+class _PaginatedManager:
+    """
+    Manager of `count` items, answering pages after a delay and recording
+    how many were requested at once.
+    """
+
+    def __init__(self, count, report_total_pages=True, delay=0.01):
+        self.items = list(range(count))
+        self.report_total_pages = report_total_pages
+        self.delay = delay
+        self.pages = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def list(self, iterator=False, page=1, per_page=20, **kwargs):
+        with self._lock:
+            self.pages.append(page)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        time.sleep(self.delay)
+
+        with self._lock:
+            self.in_flight -= 1
+
+        start = (page - 1) * per_page
+        items = self.items[start : start + per_page]  # noqa: E203
+
+        if iterator:
+            total_pages = -(-len(self.items) // per_page)
+            return _FirstPage(
+                items, total_pages if self.report_total_pages else None
+            )
+
+        return items
+
+
+def test_page_prefetcher():
+    gl = SimpleNamespace(session=requests.Session())
+
+    with PagePrefetcher(gl, pages=3, per_page=10) as prefetcher:
+        manager = _PaginatedManager(95)
+
+        assert list(prefetcher.list(manager)) == manager.items
+        assert sorted(manager.pages) == list(range(1, 11))
+        assert manager.max_in_flight == 3
+
+        # Single pages cost a single request
+        manager = _PaginatedManager(10)
+
+        assert list(prefetcher.list(manager)) == manager.items
+        assert manager.pages == [1]
+
+        # Without the number of pages, the listing stops on a partial page
+        manager = _PaginatedManager(95, report_total_pages=False)
+
+        assert list(prefetcher.list(manager)) == manager.items
+        assert 10 in manager.pages
+        assert max(manager.pages) <= 10 + 3
+
+        # Close to the rate limit, pages are requested one at a time
+        prefetcher.rate_limit_remaining = RATE_LIMIT_RESERVE
+        manager = _PaginatedManager(95)
+
+        assert list(prefetcher.list(manager)) == manager.items
+        assert manager.pages == list(range(1, 11))
+        assert manager.max_in_flight == 1
+
+
+def test_page_prefetcher_rate_limit(tmp_path):
+    with GitlabStandInServer(
+        root=tmp_path, groups=2, depth=2, projects=30
+    ) as server:
+        gl = get_gitlab_instance(url=server.url, private_token="SECRET")
+
+        with PagePrefetcher(gl, pages=2, per_page=7) as prefetcher:
+            projects = list(prefetcher.list(gl.projects))
+
+            assert [project.id for project in projects] == list(range(1, 31))
+            assert server.requests["/projects"] == 5
+            # Prefetched responses may be recorded out of order
+            assert 2000 - 5 <= prefetcher.rate_limit_remaining < 2000
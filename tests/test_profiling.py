@@ -0,0 +1,139 @@
+"""
+Unit tests for the profiling module.
+"""
+
+import importlib.util
+import inspect
+import json
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from typer import BadParameter, Typer
+from typer.testing import CliRunner
+
+from giphon.envvars import source
+from giphon.profiling import (
+    Profiler,
+    Tracer,
+    profiled,
+    profiling,
+    trace_span,
+)
+
+
+def test_tracer(tmp_path):
+    tracer = Tracer()
+
+    with tracer.span("handle_project", full_path="lorem/ipsum"):
+        with tracer.span("save_environment_variables"):
+            pass
+
+    tracer.write(tmp_path / "trace.json")
+
+    with open(tmp_path / "trace.json") as f:
+        events = json.load(f)["traceEvents"]
+
+    assert [event["name"] for event in events] == [
+        "save_environment_variables",
+        "handle_project",
+    ]
+    assert events[1]["ph"] == "X"
+    assert events[1]["args"] == {"full_path": "lorem/ipsum"}
+    assert events[1]["ts"] <= events[0]["ts"]
+    assert events[1]["dur"] >= events[0]["dur"]
+
+
+def test_profiling(tmp_path):
+    """
+    Test that a profile and a trace are written, and that spans are only
+    recorded while tracing.
+    """
+
+    def work():
+        with trace_span("flatten_groups_tree"):
+            return sum(range(1000))
+
+    work()
+
+    with profiling(
+        profile=tmp_path / "siphon.pstats", trace=tmp_path / "trace.json"
+    ):
+        work()
+
+    work()
+
+    stats = pstats.Stats(str(tmp_path / "siphon.pstats"))
+
+    assert any(function[2] == "work" for function in stats.stats)
+
+    with open(tmp_path / "trace.json") as f:
+        events = json.load(f)["traceEvents"]
+
+    assert [event["name"] for event in events] == ["flatten_groups_tree"]
+
+
+def test_profiling_threads(tmp_path):
+    """
+    Test that the profile covers the threads started while profiling.
+    """
+
+    def work_in_thread():
+        return sum(range(1000))
+
+    with profiling(profile=tmp_path / "siphon.pstats"):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda _: work_in_thread(), range(4)))
+
+    stats = pstats.Stats(str(tmp_path / "siphon.pstats"))
+
+    assert any(function[2] == "work_in_thread" for function in stats.stats)
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("pyinstrument") is not None,
+    reason="pyinstrument is installed",
+)
+def test_profiling_without_pyinstrument(tmp_path):
+    with pytest.raises(BadParameter):
+        with profiling(
+            profile=tmp_path / "siphon.html", profiler=Profiler.pyinstrument
+        ):
+            pass
+
+
+def test_profiled():
+    """
+    Test that the decorator keeps the signature of the command.
+    """
+
+    @profiled
+    def command(*, value: int, profile=None) -> int:
+        return value
+
+    assert command(value=3) == 3
+    assert list(inspect.signature(command).parameters) == ["value", "profile"]
+
+
+def test_source_profile(tmp_path):
+    """
+    Test the `--profile` option of the `source` command.
+    """
+    app = Typer()
+    app.command()(source)
+    app.command(name="noop")(lambda: None)
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "source",
+            "production",
+            "--path",
+            str(tmp_path),
+            "--profile",
+            str(tmp_path / "source.pstats"),
+        ],
+    )
+
+    assert result.exit_code == 0
+    assert pstats.Stats(str(tmp_path / "source.pstats")).total_calls > 0
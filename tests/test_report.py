@@ -0,0 +1,119 @@
+"""
+Unit tests for the report module.
+"""
+
+from datetime import timedelta
+from types import SimpleNamespace
+
+from giphon.gitlab import get_gitlab_instance
+from giphon.report import (
+    ApiMetrics,
+    ConcurrencyChange,
+    ElementResult,
+    RunReport,
+    merge_reports,
+    merge_run_reports,
+)
+
+
+def _get_report(shard: str) -> RunReport:
+    report = RunReport(shards=[shard])
+
+    with report.phase("discovery"):
+        report.api.record("GET", 0.5)
+
+    report.add_result(ElementResult(type="group", full_path="lorem"))
+    report.add_result(
+        ElementResult(
+            type="project",
+            full_path="lorem/ipsum",
+            action="cloned",
+            duration=1.5,
+            bytes=1024,
+            variables=2,
+        )
+    )
+    report.concurrency = [
+        ConcurrencyChange(seconds=0.0, jobs=2),
+        ConcurrencyChange(seconds=1.0, jobs=3),
+    ]
+
+    return report
+
+
+def test_run_report_round_trip(tmp_path):
+    report = _get_report("0/2")
+
+    assert report.processed == {"group": 1, "project": 1}
+    assert report.actions == {"cloned": 1}
+    assert report.variables == 2
+    assert report.bytes == 1024
+    assert report.phases["discovery"] >= 0
+
+    report.write(tmp_path / "report.json")
+
+    assert RunReport.read(tmp_path / "report.json") == report
+
+
+def test_merge_reports(tmp_path):
+    first = _get_report("1/2")
+    first.phases["discovery"] = 3.0
+    second = _get_report("0/2")
+    second.phases["discovery"] = 2.0
+
+    merged = merge_run_reports([first, second])
+
+    assert merged.shards == ["0/2", "1/2"]
+    assert merged.processed == {"group": 2, "project": 2}
+    assert merged.actions == {"cloned": 2}
+    assert merged.phases == {"discovery": 3.0}
+    assert merged.api == ApiMetrics(
+        calls={"GET": 2}, seconds={"GET": 1.0}, max_seconds=0.5
+    )
+    assert merged.concurrency == []
+
+    first.write(tmp_path / "first.json")
+    second.write(tmp_path / "second.json")
+
+    merge_reports(
+        reports=[tmp_path / "first.json", tmp_path / "second.json"],
+        output=tmp_path / "merged.json",
+    )
+
+    assert RunReport.read(tmp_path / "merged.json") == merged
+
+
+def test_api_metrics_track():
+    """
+    Test that responses of the Gitlab session are recorded.
+    """
+    gl = get_gitlab_instance(url="https://toto", private_token="SECRET")
+    metrics = ApiMetrics()
+
+    metrics.track(gl)
+
+    for seconds in (0.25, 0.75):
+        gl.session.hooks["response"][-1](
+            SimpleNamespace(
+                request=SimpleNamespace(method="GET"),
+                elapsed=timedelta(seconds=seconds),
+            )
+        )
+
+    assert metrics == ApiMetrics(
+        calls={"GET": 2}, seconds={"GET": 1.0}, max_seconds=0.75
+    )
+
+
+def test_write_prometheus(tmp_path):
+    _get_report("0/2").write_prometheus(tmp_path / "giphon.prom")
+
+    lines = (tmp_path / "giphon.prom").read_text().splitlines()
+
+    assert 'giphon_elements_processed{type="project"} 1' in lines
+    assert 'giphon_repositories{action="cloned"} 1' in lines
+    assert "giphon_repositories_bytes 1024" in lines
+    assert "giphon_ci_variables 2" in lines
+    assert 'giphon_api_calls{method="GET"} 1' in lines
+    assert "giphon_jobs 3" in lines
+    assert list(tmp_path.iterdir()) == [tmp_path / "giphon.prom"]
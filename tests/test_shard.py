@@ -0,0 +1,66 @@
+"""
+Unit tests for the shard module.
+"""
+
+import pytest
+from typer import BadParameter
+
+from giphon.gitlab import GitlabElement
+from giphon.shard import (
+    Shard,
+    get_element_shard,
+    is_element_in_shard,
+    parse_shard,
+)
+
+
+def test_parse_shard():
+    assert parse_shard(None) is None
+    assert parse_shard("") is None
+
+    shard = parse_shard("1/4")
+
+    assert shard == Shard(number=1, total=4)
+    assert str(shard) == "1/4"
+
+    for value in ("4/4", "-1/4", "0/0", "1", "a/b", "1/2/3"):
+        with pytest.raises(BadParameter):
+            parse_shard(value)
+
+
+def test_element_shards():
+    """
+    Test that every element belongs to exactly one shard, that the assignment
+    is stable, and that elements are spread across shards.
+    """
+    total = 4
+    elements = [
+        GitlabElement(
+            id=index,
+            type=element_type,
+            name=str(index),
+            full_path=str(index),
+        )
+        for index in range(1000)
+        for element_type in ("group", "project")
+    ]
+
+    shard_sizes = [0] * total
+
+    for element in elements:
+        owners = [
+            number
+            for number in range(total)
+            if is_element_in_shard(element, Shard(number=number, total=total))
+        ]
+
+        assert owners == [get_element_shard(element, total)]
+
+        shard_sizes[owners[0]] += 1
+
+    assert all(size > len(elements) / total / 2 for size in shard_sizes)
+
+    # The assignment must not depend on the process, unlike `hash`
+    assert get_element_shard(elements[0], total) == 0
+
+    assert all(is_element_in_shard(element, None) for element in elements)
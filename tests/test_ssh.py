@@ -0,0 +1,128 @@
+"""
+Unit tests for the ssh module.
+"""
+
+import os
+import subprocess
+
+import giphon.ssh
+from giphon.ssh import ssh_multiplexing
+
+
+def test_ssh_multiplexing(monkeypatch):
+    monkeypatch.delenv("GIT_SSH", raising=False)
+    monkeypatch.setenv("GIT_SSH_COMMAND", "ssh -i key")
+
+    stopped = []
+    monkeypatch.setattr(
+        giphon.ssh.subprocess,
+        "run",
+        lambda command, **_: stopped.append(command),
+    )
+
+    with ssh_multiplexing() as control_directory:
+        ssh_command = os.environ["GIT_SSH_COMMAND"]
+
+        assert ssh_command.startswith("ssh -i key -o ControlMaster=auto")
+        assert f"ControlPath={control_directory}/%C" in ssh_command
+
+        # Nested calls reuse the same masters
+        with ssh_multiplexing() as nested_control_directory:
+            assert nested_control_directory == control_directory
+            assert os.environ["GIT_SSH_COMMAND"] == ssh_command
+
+        # Stands for a master started by git
+        open(os.path.join(control_directory, "0123abcd"), "w").close()
+
+    assert os.environ["GIT_SSH_COMMAND"] == "ssh -i key"
+    assert not os.path.exists(control_directory)
+    assert len(stopped) == 1
+    assert stopped[0][-3:] == ["-O", "exit", "giphon"]
+
+
+def test_ssh_multiplexing_configured_command(monkeypatch, tmp_path):
+    """
+    Test that the SSH command set in the git configuration is kept, as
+    `GIT_SSH_COMMAND` overrides it.
+    """
+    monkeypatch.delenv("GIT_SSH", raising=False)
+    monkeypatch.delenv("GIT_SSH_COMMAND", raising=False)
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    monkeypatch.setenv("GIT_CONFIG_GLOBAL", str(tmp_path / "gitconfig"))
+    monkeypatch.setattr(giphon.ssh.subprocess, "run", lambda *_, **__: None)
+
+    (tmp_path / "gitconfig").write_text(
+        "[core]\n\tsshCommand = ssh -i key -J jump\n"
+    )
+
+    with ssh_multiplexing():
+        assert os.environ["GIT_SSH_COMMAND"].startswith(
+            "ssh -i key -J jump -o ControlMaster=auto"
+        )
+
+    assert "GIT_SSH_COMMAND" not in os.environ
+
+    (tmp_path / "gitconfig").write_text("")
+
+    with ssh_multiplexing():
+        assert os.environ["GIT_SSH_COMMAND"].startswith(
+            "ssh -o ControlMaster=auto"
+        )
+
+
+def test_ssh_multiplexing_overlapping(monkeypatch):
+    """
+    Test that runs overlapping without being nested, such as in several
+    threads, share the masters until the last one exits.
+    """
+    monkeypatch.delenv("GIT_SSH", raising=False)
+    monkeypatch.delenv("GIT_SSH_COMMAND", raising=False)
+    monkeypatch.setattr(giphon.ssh.subprocess, "run", lambda *_, **__: None)
+
+    first_run = ssh_multiplexing()
+    second_run = ssh_multiplexing()
+
+    control_directory = first_run.__enter__()
+    ssh_command = os.environ["GIT_SSH_COMMAND"]
+
+    assert second_run.__enter__() == control_directory
+
+    first_run.__exit__(None, None, None)
+
+    assert os.environ["GIT_SSH_COMMAND"] == ssh_command
+    assert os.path.isdir(control_directory)
+
+    second_run.__exit__(None, None, None)
+
+    assert "GIT_SSH_COMMAND" not in os.environ
+    assert not os.path.exists(control_directory)
+
+
+def test_ssh_multiplexing_disabled(monkeypatch):
+    monkeypatch.delenv("GIT_SSH_COMMAND", raising=False)
+
+    with ssh_multiplexing(enabled=False) as control_directory:
+        assert control_directory is None
+        assert "GIT_SSH_COMMAND" not in os.environ
+
+
+def test_ssh_multiplexing_master(monkeypatch, tmp_path):
+    """
+    Test that the generated command is accepted by ssh.
+    """
+    monkeypatch.delenv("GIT_SSH", raising=False)
+    monkeypatch.delenv("GIT_SSH_COMMAND", raising=False)
+
+    with ssh_multiplexing():
+        result = subprocess.run(
+            f"{os.environ['GIT_SSH_COMMAND']} -G localhost",
+            shell=True,
+            capture_output=True,
+            text=True,
+        )
+
+    if result.returncode == 127:
+        return  # ssh is not installed
+
+    assert "controlmaster auto" in result.stdout
+    assert "controlpersist 60" in result.stdout
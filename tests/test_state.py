@@ -0,0 +1,65 @@
+"""
+Unit tests for the state module.
+"""
+
+import contextlib
+from io import StringIO
+from pathlib import Path
+
+from giphon.state import (
+    PrunePolicy,
+    load_projects_state,
+    prune_projects,
+    save_projects_state,
+)
+
+from .utils import MockLogger
+
+
+def test_projects_state_round_trip(tmp_path):
+    assert load_projects_state(tmp_path) == {}
+
+    state = {1: Path("lorem/ipsum"), 2: Path("lorem/dolor")}
+
+    save_projects_state(tmp_path, state)
+
+    assert load_projects_state(tmp_path) == state
+
+
+def test_prune_projects(tmp_path):
+    """
+    Test that undiscovered projects of the namespace are reported or
+    deleted, and projects of other namespaces are left untouched.
+    """
+    for path in ("lorem/ipsum", "lorem/dolor", "amet/sit"):
+        (tmp_path / path).mkdir(parents=True)
+
+    def get_state():
+        return {
+            1: Path("lorem/ipsum"),
+            2: Path("lorem/dolor"),
+            3: Path("amet/sit"),
+        }
+
+    def prune(state, policy):
+        with contextlib.redirect_stdout(StringIO()):
+            return prune_projects(
+                output=tmp_path,
+                namespace=Path("lorem"),
+                state=state,
+                discovered_ids=[1],
+                policy=policy,
+                logger=MockLogger(),
+            )
+
+    state = get_state()
+
+    assert prune(state, PrunePolicy.off) == []
+    assert prune(state, PrunePolicy.report) == [Path("lorem/dolor")]
+    assert state == get_state()
+    assert (tmp_path / "lorem/dolor").is_dir()
+
+    assert prune(state, PrunePolicy.delete) == [Path("lorem/dolor")]
+    assert state == {1: Path("lorem/ipsum"), 3: Path("amet/sit")}
+    assert not (tmp_path / "lorem/dolor").exists()
+    assert (tmp_path / "amet/sit").is_dir()
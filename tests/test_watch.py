@@ -0,0 +1,324 @@
+"""
+Unit tests for the watch module.
+"""
+
+import json
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+import giphon.watch
+from giphon.gitlab import GitlabElement
+from giphon.report import ElementResult
+from giphon.state import load_projects_state, save_projects_state
+from giphon.watch import (
+    ACTIVITY_REFRESH_INTERVAL,
+    Watcher,
+    parse_push_event,
+    start_webhook_server,
+)
+
+from .utils import MockGitlab, MockLogger
+
+PUSH_EVENT = {
+    "object_kind": "push",
+    "project_id": 42,
+    "project": {
+        "name": "lorem",
+        "path_with_namespace": "group/subgroup/lorem",
+        "git_ssh_url": "git@toto.com:group/subgroup/lorem.git",
+        "git_http_url": "https://toto.com/group/subgroup/lorem.git",
+    },
+}
+
+
+def _get_watcher(
+    namespace: Path = Path("group"), output: Path = Path("output")
+) -> Watcher:
+    return Watcher(
+        gl=MockGitlab(url="https://toto", private_token="SECRET"),
+        namespace=namespace,
+        output=output,
+        gitlab_token="SECRET",
+        gitlab_url="https://toto",
+        gitlab_username="",
+        save_ci_variables=False,
+        clone_archived=False,
+        clone_through_ssh=True,
+        poll_interval=3600,
+        reconciliation_interval=86400,
+        verbose=False,
+        logger=MockLogger(),
+    )
+
+
+def _get_project(id: int, full_path: str) -> GitlabElement:
+    return GitlabElement(
+        id=id, type="project", name=full_path, full_path=full_path
+    )
+
+
+def test_parse_push_event():
+    assert parse_push_event(PUSH_EVENT) == GitlabElement(
+        id=42,
+        type="project",
+        name="lorem",
+        full_path="group/subgroup/lorem",
+        ssh_url_to_repo="git@toto.com:group/subgroup/lorem.git",
+        http_url_to_repo="https://toto.com/group/subgroup/lorem.git",
+    )
+
+    assert parse_push_event({"object_kind": "issue"}) is None
+
+
+def test_notify_push():
+    """
+    Test that only projects of the watched namespace are scheduled.
+    """
+    watcher = _get_watcher(Path("group"))
+
+    watcher.notify_push(_get_project(1, "group/lorem"))
+    watcher.notify_push(_get_project(2, "group-other/lorem"))
+    watcher.notify_push(_get_project(3, "other/lorem"))
+
+    assert watcher.pushed.qsize() == 1
+    assert watcher.woken.is_set()
+
+    instance_watcher = _get_watcher(Path("/"))
+
+    instance_watcher.notify_push(_get_project(3, "other/lorem"))
+
+    assert instance_watcher.pushed.qsize() == 1
+
+
+def _handle_element(handled):
+    def handle_element(element, **_):
+        handled.append(element.id)
+
+        return ElementResult(
+            type=element.type, full_path=element.full_path, action="fetched"
+        )
+
+    return handle_element
+
+
+def test_poll(monkeypatch):
+    """
+    Test that every poll covers the refresh interval of the last activity
+    dates before the previous poll, so that pushes to projects active shortly
+    before are not missed.
+    """
+    polled = []
+
+    def get_recently_active_projects(*, since, **_):
+        polled.append(since)
+        return iter([_get_project(1, "group/lorem")])
+
+    monkeypatch.setattr(
+        giphon.watch,
+        "get_recently_active_projects",
+        get_recently_active_projects,
+    )
+
+    watcher = _get_watcher()
+    active_since = watcher._active_since
+
+    assert list(watcher.poll()) == [1]
+    assert polled[0] == active_since - ACTIVITY_REFRESH_INTERVAL
+
+    active_since = watcher._active_since
+
+    assert list(watcher.poll()) == [1]
+    assert polled[1] == active_since - ACTIVITY_REFRESH_INTERVAL
+    assert polled[1] > polled[0]
+
+
+def test_run_once(monkeypatch, tmp_path):
+    """
+    Test that the first iteration runs a full siphon, and the following ones
+    only fetch the active and pushed projects, once each.
+    """
+    siphoned = []
+    handled = []
+
+    monkeypatch.setattr(
+        giphon.watch,
+        "siphon_targets",
+        lambda targets, **_: siphoned.append(targets),
+    )
+    monkeypatch.setattr(
+        giphon.watch, "handle_element", _handle_element(handled)
+    )
+    monkeypatch.setattr(
+        giphon.watch,
+        "get_recently_active_projects",
+        lambda **_: iter(
+            [_get_project(1, "group/lorem"), _get_project(2, "group/ipsum")]
+        ),
+    )
+
+    watcher = _get_watcher(output=tmp_path)
+
+    assert watcher.run_once() == -1
+    assert len(siphoned) == 1
+    assert siphoned[0][0].namespace == Path("group")
+    assert siphoned[0][0].fetch_repositories is True
+
+    watcher.notify_push(_get_project(2, "group/ipsum"))
+    watcher.notify_push(_get_project(3, "group/dolor"))
+
+    assert watcher.run_once() == 3
+    assert sorted(handled) == [1, 2, 3]
+
+    # The poll interval has not elapsed: only pushed projects are fetched
+    watcher.notify_push(_get_project(4, "group/amet"))
+
+    assert watcher.run_once() == 1
+    assert handled[-1] == 4
+    assert len(siphoned) == 1
+
+
+def test_run_once_renamed(monkeypatch, tmp_path):
+    """
+    Test that fetched projects are found at their previous path, and that
+    their new path is saved.
+    """
+    previous_paths = []
+
+    def handle_element(element, *, previous_path=None, **_):
+        previous_paths.append(previous_path)
+
+        return ElementResult(
+            type=element.type, full_path=element.full_path, action="moved"
+        )
+
+    monkeypatch.setattr(
+        giphon.watch, "siphon_targets", lambda targets, **_: None
+    )
+    monkeypatch.setattr(giphon.watch, "handle_element", handle_element)
+    monkeypatch.setattr(
+        giphon.watch, "get_recently_active_projects", lambda **_: iter([])
+    )
+
+    save_projects_state(tmp_path, {1: Path("group/old-lorem")})
+
+    watcher = _get_watcher(output=tmp_path)
+    watcher.run_once()
+
+    watcher.notify_push(_get_project(1, "group/lorem"))
+    watcher.notify_push(_get_project(2, "group/ipsum"))
+    watcher.run_once()
+
+    assert previous_paths == [Path("group/old-lorem"), None]
+    assert load_projects_state(tmp_path) == {
+        1: Path("group/lorem"),
+        2: Path("group/ipsum"),
+    }
+
+
+def test_run_once_errors(monkeypatch, tmp_path):
+    """
+    Test that a project failing to be fetched does not stop the others.
+    """
+    handled = []
+
+    def handle_element(element, **_):
+        if element.id == 1:
+            raise OSError("Unreachable")
+
+        handled.append(element.id)
+
+        return ElementResult(
+            type=element.type, full_path=element.full_path, action="fetched"
+        )
+
+    monkeypatch.setattr(
+        giphon.watch, "siphon_targets", lambda targets, **_: None
+    )
+    monkeypatch.setattr(giphon.watch, "handle_element", handle_element)
+    monkeypatch.setattr(
+        giphon.watch, "get_recently_active_projects", lambda **_: iter([])
+    )
+
+    watcher = _get_watcher(output=tmp_path)
+    watcher.run_once()
+
+    watcher.notify_push(_get_project(1, "group/lorem"))
+    watcher.notify_push(_get_project(2, "group/ipsum"))
+
+    assert watcher.run_once() == 2
+    assert handled == [2]
+    assert load_projects_state(tmp_path) == {2: Path("group/ipsum")}
+
+
+def test_run_errors(monkeypatch):
+    """
+    Test that failed iterations are run again, after growing delays, and
+    that a failed full siphon is run again.
+    """
+    siphoned = []
+    delays = []
+
+    def siphon_targets(targets, **_):
+        siphoned.append(targets)
+
+        if len(siphoned) < 3:
+            raise OSError("Unreachable")
+
+    def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(giphon.watch, "siphon_targets", siphon_targets)
+    monkeypatch.setattr(giphon.watch.time, "sleep", sleep)
+
+    watcher = _get_watcher()
+    watcher.poll_interval = 10
+
+    def stop(timeout):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(watcher.woken, "wait", stop)
+
+    with pytest.raises(KeyboardInterrupt):
+        watcher.run()
+
+    assert len(siphoned) == 3
+    assert delays == [20, 40]
+
+
+def test_webhook_server():
+    """
+    Test the webhook server, by posting push events to it.
+    """
+    watcher = _get_watcher()
+
+    server = start_webhook_server(
+        watcher, address="127.0.0.1", port=0, secret="hook-secret"
+    )
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    def post(token: str) -> int:
+        request = Request(
+            url,
+            data=json.dumps(PUSH_EVENT).encode(),
+            headers={"X-Gitlab-Token": token},
+            method="POST",
+        )
+
+        with urlopen(request) as response:
+            return int(response.status)
+
+    try:
+        with pytest.raises(HTTPError):
+            post("wrong-secret")
+
+        assert watcher.pushed.qsize() == 0
+
+        assert post("hook-secret") == 200
+        assert watcher.pushed.get_nowait().id == 42
+
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -4,6 +4,7 @@ Mocking utilities.
 
 from typing import Iterator
 
+import requests
 from gitlab.exceptions import GitlabListError
 
 
@@ -15,6 +16,9 @@ class MockLogger:
     def debug(self: "MockLogger", message, exc_info: bool = None) -> None:
         print(f"Would have debugged {message} with exc_info {exc_info}")
 
+    def info(self: "MockLogger", message, exc_info: bool = None) -> None:
+        print(f"Would have informed {message} with exc_info {exc_info}")
+
 
 # Git
 class MockRepository:
@@ -41,6 +45,7 @@ class MockGitlab:
         self.private_token = private_token
         self.groups = _MockGitlabGroupList()
         self.projects = _MockGitlabProjectList()
+        self.session = requests.Session()
 
 
 class _MockGitlabProjectList:
@@ -82,6 +87,10 @@ class MockGitlabProject:
     ):
         print(f"Entered initialize of {type(self)} with id {id}")
         self.id = id
+        self.name = id
+        self.path_with_namespace = f"namespace/{id}"
+        self.ssh_url_to_repo = f"git@toto.com:namespace/{id}.git"
+        self.http_url_to_repo = f"https://toto.com/namespace/{id}.git"
 
 
 class MockGitlabGroup:
@@ -95,6 +104,8 @@ class MockGitlabGroup:
     ):
         print(f"Entered initialize of {type(self)} with id {id}")
         self.id = id
+        self.name = id
+        self.full_path = id
         self.subgroups = _MockGitlabSubgroups(subgroups=subgroups)
         self.projects = _MockGitlabGroupProjects(projects=projects)
 